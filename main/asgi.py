@@ -2,6 +2,8 @@
 ASGI config for main project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The live availability stream (/api/availability-stream/) needs this entry
+point, e.g. ``uvicorn main.asgi:application``; under WSGI it answers 204.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -5,6 +5,8 @@ Django settings for main project.
 from pathlib import Path
 import os
 
+from partizan import database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -55,13 +57,30 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'main.wsgi.application'
 
+# Профиль базы из окружения (partizan.database): DB_PROFILE=sqlite включает
+# WAL и постоянные соединения, DB_PROFILE=postgres - PostgreSQL с пулом или
+# постоянными соединениями. Без DB_PROFILE - файл SQLite как при разработке.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database.from_environ(os.environ, BASE_DIR),
 }
 
+# Общий кеш воркеров: версии контента и сетки слотов должны совпадать во всех
+# процессах. Без REDIS_URL (разработка, тесты) - кеш в памяти процесса.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'partizan',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -86,7 +105,51 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')] 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Без манифеста collectstatic {% static %} отдает исходные имена только при
+# разработке (тесты включают флаг сами); в работе отсутствие манифеста - ошибка
+PARTIZAN_STATIC_MANIFEST_OPTIONAL = DEBUG
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    # collectstatic: хеши в именах, минификация, .gz/.br копии, пережатые картинки
+    'staticfiles': {
+        'BACKEND': 'partizan.staticfiles.OptimizedManifestStaticFilesStorage',
+    },
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Очередь приема заявок (partizan.spool): каталог, fsync каждой записи
+# и фоновый поток переноса в базу в каждом процессе
+PARTIZAN_SPOOL_DIR = BASE_DIR / 'spool'
+PARTIZAN_SPOOL_FSYNC = True
+PARTIZAN_SPOOL_WORKER = True
+
+# Уменьшенные копии фото (partizan.images) строит фоновый поток процесса;
+# False - сразу после сохранения, в том же потоке
+PARTIZAN_RENDITIONS_WORKER = True
+
+# Уведомления персонала о новых заявках (partizan.notifications). Каналы
+# включаются переменными окружения; без них уведомления не отправляются.
+PARTIZAN_NOTIFY_SINKS = []
+if os.environ.get('NOTIFY_EMAILS'):
+    PARTIZAN_NOTIFY_SINKS.append({
+        'BACKEND': 'partizan.notifications.SmtpSink',
+        'OPTIONS': {'recipients': os.environ['NOTIFY_EMAILS'].split(',')},
+    })
+if os.environ.get('NOTIFY_WEBHOOK_URL'):
+    PARTIZAN_NOTIFY_SINKS.append({
+        'BACKEND': 'partizan.notifications.WebhookSink',
+        'OPTIONS': {'url': os.environ['NOTIFY_WEBHOOK_URL']},
+    })
+if os.environ.get('NOTIFY_FILE'):
+    PARTIZAN_NOTIFY_SINKS.append({
+        'BACKEND': 'partizan.notifications.FileSink',
+        'OPTIONS': {'path': os.environ['NOTIFY_FILE']},
+    })
+PARTIZAN_NOTIFY_WORKER = True
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
@@ -1,13 +1,22 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from partizan.serving import serve_immutable, serve_static
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('partizan.urls')),
+    # Файлы по хешу содержимого (и их уменьшенные копии) никогда не меняются
+    re_path(
+        r'^%s(?P<path>(?:renditions/)?blobs/.*)$' % settings.MEDIA_URL.lstrip('/'),
+        serve_immutable,
+        {'document_root': settings.MEDIA_ROOT},
+    ),
+    # Собранная статика: сжатые .br/.gz копии и бессрочный кеш для имен с хешем
+    re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve_static),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
@@ -1,5 +1,19 @@
 from django.contrib import admin
+from django.db import transaction
+from django.urls import reverse
 from .models import *
+from . import content_cache, exports, page_cache, ratings
+
+class ExportMixin:
+    """Действия выгрузки выбранных (или всех отфильтрованных) строк с колонками list_display"""
+
+    def export_csv(self, request, queryset):
+        return exports.export_response(self, queryset, 'csv', request)
+    export_csv.short_description = "Выгрузить в CSV"
+
+    def export_xlsx(self, request, queryset):
+        return exports.export_response(self, queryset, 'xlsx', request)
+    export_xlsx.short_description = "Выгрузить в Excel (XLSX)"
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -10,6 +24,7 @@ class CategoryAdmin(admin.ModelAdmin):
 @admin.register(Holiday)
 class HolidayAdmin(admin.ModelAdmin):
     list_display = ('title', 'category', 'price', 'active', 'duration', 'min_age', 'max_age', 'max_children')
+    list_select_related = ('category',)
     list_filter = ('category', 'active')
     prepopulated_fields = {'slug': ('title',)}
     search_fields = ('title', 'description')
@@ -45,12 +60,18 @@ class ReviewAdmin(admin.ModelAdmin):
     actions = ['approve_reviews']
     
     def approve_reviews(self, request, queryset):
-        queryset.update(approved=True)
+        # Сводка оценок получает только отзывы, которые не были одобрены
+        ratings.approve_reviews(queryset)
+        # update() не шлет сигналы, поэтому кеш отзывов сбрасываем сами
+        transaction.on_commit(lambda: content_cache.invalidate(content_cache.REVIEWS))
+        transaction.on_commit(lambda: page_cache.purge(reverse('home')))
     approve_reviews.short_description = "Одобрить выбранные отзывы"
 
 @admin.register(QuickOrder)
 class QuickOrderAdmin(admin.ModelAdmin):
     list_display = ('holiday', 'phone', 'created_at', 'processed')
+    # Колонка и __str__ берут название праздника: подтягиваем его одним JOIN
+    list_select_related = ('holiday',)
     list_filter = ('processed', 'created_at')
     search_fields = ('phone', 'holiday__title')
     actions = ['mark_processed']
@@ -60,8 +81,9 @@ class QuickOrderAdmin(admin.ModelAdmin):
     mark_processed.short_description = "Пометить обработанными"
 
 @admin.register(FullOrder)
-class FullOrderAdmin(admin.ModelAdmin):
+class FullOrderAdmin(ExportMixin, admin.ModelAdmin):
     list_display = ('full_name', 'phone', 'holiday', 'selected_date', 'selected_time', 'children_count', 'age_of_children', 'created_at', 'processed')
+    list_select_related = ('holiday',)
     list_filter = ('processed', 'created_at', 'holiday', 'selected_date')
     search_fields = ('full_name', 'phone', 'holiday__title')
     readonly_fields = ('created_at',)
@@ -76,19 +98,64 @@ class FullOrderAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'processed')
         }),
     )
-    actions = ['mark_processed']
+    actions = ['mark_processed', 'export_csv', 'export_xlsx']
     
     def mark_processed(self, request, queryset):
         queryset.update(processed=True)
     mark_processed.short_description = "Пометить обработанными"
 
+@admin.register(Hall)
+class HallAdmin(admin.ModelAdmin):
+    list_display = ('number', 'name', 'active')
+    list_editable = ('active',)
+
+@admin.register(SlotTemplate)
+class SlotTemplateAdmin(admin.ModelAdmin):
+    list_display = ('weekday', 'duration_hours', 'open_hour', 'close_hour', 'step_hours', 'active')
+    list_filter = ('weekday', 'duration_hours', 'active')
+    list_editable = ('open_hour', 'close_hour', 'step_hours', 'active')
+
 @admin.register(TrainingRegistration)
-class TrainingRegistrationAdmin(admin.ModelAdmin):
+class TrainingRegistrationAdmin(ExportMixin, admin.ModelAdmin):
     list_display = ('parent_name', 'child_name', 'phone', 'age_group', 'visit_type', 'created_at', 'processed')
     list_filter = ('age_group', 'visit_type', 'processed', 'created_at')
     search_fields = ('parent_name', 'child_name', 'phone')
-    actions = ['mark_processed']
+    actions = ['mark_processed', 'export_csv', 'export_xlsx']
     
     def mark_processed(self, request, queryset):
         queryset.update(processed=True)
-    mark_processed.short_description = "Пометить обработанными"
\ No newline at end of file
+    mark_processed.short_description = "Пометить обработанными"
+
+class ArchiveAdmin(admin.ModelAdmin):
+    """Архив только просматривается: строки переносит команда archive_orders"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedQuickOrder)
+class ArchivedQuickOrderAdmin(ArchiveAdmin):
+    list_display = ('holiday', 'phone', 'created_at', 'processed', 'archived_at')
+    list_select_related = ('holiday',)
+    list_filter = ('processed', 'created_at')
+    search_fields = ('phone', 'holiday__title')
+
+@admin.register(ArchivedFullOrder)
+class ArchivedFullOrderAdmin(ExportMixin, ArchiveAdmin):
+    list_display = ('full_name', 'phone', 'holiday', 'selected_date', 'selected_time', 'children_count', 'age_of_children', 'created_at', 'processed')
+    list_select_related = ('holiday',)
+    list_filter = ('processed', 'created_at', 'holiday', 'selected_date')
+    search_fields = ('full_name', 'phone', 'holiday__title')
+    actions = ['export_csv', 'export_xlsx']
+
+@admin.register(ArchivedTrainingRegistration)
+class ArchivedTrainingRegistrationAdmin(ExportMixin, ArchiveAdmin):
+    list_display = ('parent_name', 'child_name', 'phone', 'age_group', 'visit_type', 'created_at', 'processed')
+    list_filter = ('age_group', 'visit_type', 'processed', 'created_at')
+    search_fields = ('parent_name', 'child_name', 'phone')
+    actions = ['export_csv', 'export_xlsx']
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class PartizanConfig(AppConfig):
     name = 'partizan'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,89 @@
+"""
+Перенос старых заявок из рабочих таблиц в архив.
+
+Рабочие таблицы читают бронирование, календарь и списки в админке, поэтому
+в них остаются только актуальные строки:
+
+    FullOrder            - праздники с сегодняшнего дня и дальше;
+    QuickOrder,
+    TrainingRegistration - необработанные и обработанные за последние
+                           PROCESSED_RETENTION_DAYS дней.
+
+Остальное переносится в Archived*-таблицы с теми же полями, исходным id
+и датой заявки. Каждая пачка - одна транзакция: копия (ignore_conflicts)
+и удаление из рабочей таблицы по id. Прерванный прогон ничего не теряет и
+не дублирует: следующий продолжит с оставшихся строк.
+"""
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedFullOrder, ArchivedQuickOrder, ArchivedTrainingRegistration, FullOrder, QuickOrder,
+    SlotOccupancy, TrainingRegistration,
+)
+
+# Сколько дней обработанная заявка остается в рабочей таблице
+PROCESSED_RETENTION_DAYS = 14
+BATCH_SIZE = 1000
+
+# Рабочая модель -> архивная
+ARCHIVES = {
+    FullOrder: ArchivedFullOrder,
+    QuickOrder: ArchivedQuickOrder,
+    TrainingRegistration: ArchivedTrainingRegistration,
+}
+
+
+def archivable(model, today=None):
+    """Строки рабочей таблицы, которые пора перенести"""
+    today = today or date.today()
+    if model is FullOrder:
+        return FullOrder.objects.filter(selected_date__lt=today)
+    cutoff = timezone.now() - timedelta(days=PROCESSED_RETENTION_DAYS)
+    return model.objects.filter(processed=True, created_at__lt=cutoff)
+
+
+def _copy_fields(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def archive_batch(model, today=None, batch_size=BATCH_SIZE):
+    """Переносит одну пачку (по возрастанию id), возвращает число строк"""
+    archive_model = ARCHIVES[model]
+    fields = _copy_fields(model)
+    with transaction.atomic():
+        rows = list(archivable(model, today).order_by('pk').values(*fields)[:batch_size])
+        if not rows:
+            return 0
+        # ignore_conflicts: строка могла попасть в архив в прерванном прогоне
+        archive_model.objects.bulk_create(
+            [archive_model(**row) for row in rows], ignore_conflicts=True
+        )
+        model.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def prune_occupancy(today=None):
+    """Занятость прошедших дней календарь не показывает"""
+    today = today or date.today()
+    deleted, _ = SlotOccupancy.objects.filter(date__lt=today).delete()
+    return deleted
+
+
+def run(today=None, batch_size=BATCH_SIZE, max_batches=None):
+    """Архивирует все модели, пока есть строки; {имя модели: перенесено}"""
+    today = today or date.today()
+    moved = {}
+    for model in ARCHIVES:
+        total = batches = 0
+        while max_batches is None or batches < max_batches:
+            count = archive_batch(model, today, batch_size)
+            if not count:
+                break
+            total += count
+            batches += 1
+        moved[model._meta.model_name] = total
+    prune_occupancy(today)
+    return moved
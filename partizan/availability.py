@@ -0,0 +1,122 @@
+"""
+Движок доступности залов.
+
+День хранится как битовая маска часов для каждого зала: бит N означает,
+что час N:00-N+1:00 занят. Интервал "13:00-17:00" превращается в маску
+битов 13..16, поэтому пересечение 2- и 4-часовых слотов проверяется
+одной операцией AND, сколько бы заявок ни было на день.
+"""
+from datetime import timedelta
+
+from . import schedule
+from .models import SlotOccupancy
+
+
+def parse_interval(time_slot):
+    """'13:00-17:00' -> (13, 17)"""
+    try:
+        start, end = time_slot.split('-')
+        start_hour = int(start.strip().split(':')[0])
+        end_hour = int(end.strip().split(':')[0])
+    except (AttributeError, ValueError):
+        raise ValueError(f'Некорректное время: {time_slot}')
+    if not 0 <= start_hour < end_hour <= 24:
+        raise ValueError(f'Некорректное время: {time_slot}')
+    return start_hour, end_hour
+
+
+def hours_mask(start_hour, end_hour):
+    """Маска часов [start_hour, end_hour)"""
+    return (1 << end_hour) - (1 << start_hour)
+
+
+def slot_mask(time_slot):
+    return hours_mask(*parse_interval(time_slot))
+
+
+class DayAvailability:
+    """Занятость залов за один день"""
+
+    def __init__(self, hall_numbers=None):
+        if hall_numbers is None:
+            hall_numbers = schedule.hall_numbers()
+        self.hall_numbers = tuple(hall_numbers)
+        self.masks = dict.fromkeys(self.hall_numbers, 0)
+
+    def book(self, hall_number, mask):
+        self.masks[hall_number] = self.masks.get(hall_number, 0) | mask
+
+    def is_hall_free(self, hall_number, mask):
+        return not self.masks.get(hall_number, 0) & mask
+
+    def free_halls(self, mask):
+        """Номера залов, свободных на весь интервал"""
+        return [hall for hall in self.hall_numbers if not self.masks[hall] & mask]
+
+    def is_free(self, mask):
+        """Свободен ли интервал хотя бы в одном зале"""
+        return any(not self.masks[hall] & mask for hall in self.hall_numbers)
+
+    def as_list(self):
+        return [self.masks[hall] for hall in self.hall_numbers]
+
+
+def build_days(rows, hall_numbers=None):
+    """Собирает {дата: DayAvailability} из строк (дата, время, зал)"""
+    if hall_numbers is None:
+        hall_numbers = schedule.hall_numbers()
+    days = {}
+    for slot_date, time_slot, hall_number in rows:
+        try:
+            mask = slot_mask(time_slot)
+        except ValueError:
+            continue
+        day = days.get(slot_date)
+        if day is None:
+            day = days[slot_date] = DayAvailability(hall_numbers)
+        day.book(hall_number, mask)
+    return days
+
+
+def load_days(start, end):
+    """Занятость залов по дням окна [start, end] из таблицы занятости"""
+    rows = SlotOccupancy.objects.filter(
+        date__gte=start, date__lte=end, bookings__gt=0
+    ).values_list('date', 'time_slot', 'hall_number')
+    return build_days(rows)
+
+
+def load_day(slot_date):
+    return load_days(slot_date, slot_date).get(slot_date) or DayAvailability()
+
+
+def find_slot(slot_date, duration_hours, time_slot):
+    """Слот сетки дня, совпадающий с временем заявки, или None"""
+    hours = parse_interval(time_slot)
+    for slot in schedule.slot_grid(slot_date, duration_hours):
+        if (slot['start'], slot['end']) == hours:
+            return slot
+    return None
+
+
+def calendar_slots(start, end, duration_hours):
+    """
+    Готовые к отрисовке слоты окна:
+    {'YYYY-MM-DD': [{'value', 'label', 'free_halls'}, ...]}
+    """
+    days = load_days(start, end)
+    empty_day = DayAvailability()
+    result = {}
+    slot_date = start
+    while slot_date <= end:
+        day = days.get(slot_date, empty_day)
+        result[slot_date.isoformat()] = [
+            {
+                'value': slot['value'],
+                'label': slot['label'],
+                'free_halls': len(day.free_halls(hours_mask(slot['start'], slot['end']))),
+            }
+            for slot in schedule.slot_grid(slot_date, duration_hours)
+        ]
+        slot_date += timedelta(days=1)
+    return result
@@ -0,0 +1,61 @@
+import random
+import time
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+
+from .availability import load_day, slot_mask
+from .models import FullOrder
+
+# Повторы транзакции, если SQLite вернул "database is locked"
+LOCK_RETRIES = 20
+LOCK_BACKOFF = 0.005
+
+
+def _is_lock_error(exc):
+    return 'locked' in str(exc).lower()
+
+
+def _lock_day(selected_date):
+    """
+    Сериализует бронирования одного дня.
+    SQLite и так допускает одного писателя, в PostgreSQL берем advisory lock,
+    иначе две транзакции могли бы занять пересекающиеся интервалы одного зала.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [selected_date.toordinal()])
+
+
+def _claim_free_hall(selected_date, selected_time, mask, fields):
+    """Одна транзакция: находим свободный зал и занимаем его"""
+    with transaction.atomic():
+        _lock_day(selected_date)
+        day = load_day(selected_date)
+        for hall_number in day.free_halls(mask):
+            try:
+                # Уникальный индекс (дата, время, зал) не даст занять зал дважды
+                with transaction.atomic():
+                    return FullOrder.objects.create(
+                        selected_date=selected_date,
+                        selected_time=selected_time,
+                        hall_number=hall_number,
+                        **fields
+                    )
+            except IntegrityError:
+                continue
+    return None
+
+
+def reserve_slot(selected_date, selected_time, **fields):
+    """
+    Бронирует свободный зал на слот и возвращает заявку.
+    Возвращает None, если все залы на это время заняты (с учетом пересечений).
+    """
+    mask = slot_mask(selected_time)
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return _claim_free_hall(selected_date, selected_time, mask, fields)
+        except OperationalError as e:
+            if not _is_lock_error(e) or attempt == LOCK_RETRIES - 1:
+                raise
+            time.sleep(LOCK_BACKOFF * (attempt + 1) * random.uniform(1, 2))
@@ -0,0 +1,68 @@
+"""
+Кеш публичного контента: выборки и отрендеренные фрагменты страниц.
+
+Содержимое разбито на группы (достижения, праздники, категории, отзывы),
+у каждой группы своя версия в кеше. Версии входят в ключи выборок и
+фрагментов шаблонов, а сигналы моделей повышают версию группы после
+сохранения или удаления. Старые ключи просто перестают читаться и
+вытесняются по таймауту, поэтому правка в админке видна сразу.
+"""
+import time
+
+from django.core.cache import cache
+
+ACHIEVEMENTS = 'achievements'
+HOLIDAYS = 'holidays'
+CATEGORIES = 'categories'
+REVIEWS = 'reviews'
+
+VERSION_KEY = 'partizan:content:{group}:version'
+QUERY_KEY = 'partizan:content:query:{name}:{versions}'
+
+# Контент меняется редко, а устаревшие ключи все равно отсекаются версией
+CONTENT_TIMEOUT = 24 * 60 * 60
+
+
+def _initial_version():
+    # Начинаем с текущего времени: после очистки кеша номер не повторит
+    # прежний, и копии в памяти процессов не примут старые данные за свежие
+    return int(time.time() * 1000)
+
+
+def version(group):
+    return cache.get_or_set(VERSION_KEY.format(group=group), _initial_version, None)
+
+
+def versions(*groups):
+    """Строка версий групп для ключей кеша через точку"""
+    keys = [VERSION_KEY.format(group=group) for group in groups]
+    found = cache.get_many(keys)
+    missing = {key: _initial_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return '.'.join(str(found[key]) for key in keys)
+
+
+def invalidate(*groups):
+    """Повышает версии групп после изменения контента"""
+    for group in groups:
+        key = VERSION_KEY.format(group=group)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def cached_query(name, groups, build, timeout=CONTENT_TIMEOUT):
+    """
+    Результат выборки build() списком из кеша.
+    name различает выборки (включая параметры фильтра), groups - от каких
+    групп контента выборка зависит.
+    """
+    key = QUERY_KEY.format(name=name, versions=versions(*groups))
+    result = cache.get(key)
+    if result is None:
+        result = list(build())
+        cache.set(key, result, timeout)
+    return result
@@ -1,6 +1,31 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import content_cache
 from .models import Category
 
+# Копия списка категорий в памяти процесса: (версия, список)
+_local = (None, [])
+
+
+def get_categories():
+    """
+    Категории для меню. Список лежит в общем кеше воркеров, а процесс держит
+    свою копию и сверяет ее с номером поколения, который сигналы Category
+    повышают после правки. Запрос в базу - только после изменения категорий.
+    """
+    global _local
+    version = content_cache.version(content_cache.CATEGORIES)
+    cached_version, categories = _local
+    if cached_version != version:
+        categories = content_cache.cached_query(
+            'categories', [content_cache.CATEGORIES], Category.objects.all
+        )
+        _local = (version, categories)
+    return categories
+
+
 def categories(request):
+    # Ленивое значение: шаблоны без меню категорий не делают ничего
     return {
-        'all_categories': Category.objects.all(),
-    }
\ No newline at end of file
+        'all_categories': SimpleLazyObject(get_categories),
+    }
@@ -0,0 +1,115 @@
+"""
+Профили settings.DATABASES, выбираются переменной окружения DB_PROFILE.
+
+    development (по умолчанию) - файл SQLite с настройками по умолчанию;
+    sqlite   - рабочий SQLite: WAL (читатели не ждут писателя),
+               synchronous=NORMAL, ожидание блокировки вместо ошибки,
+               mmap и большой кеш страниц; транзакции сразу берут блокировку
+               записи (BEGIN IMMEDIATE), постоянные соединения;
+    postgres - PostgreSQL: постоянные соединения с проверкой перед запросом
+               или пул psycopg (POSTGRES_POOL - размер пула).
+
+Файл SQLite - SQLITE_PATH (по умолчанию db.sqlite3 в корне проекта).
+PostgreSQL настраивается переменными POSTGRES_DB, POSTGRES_USER,
+POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT. Время жизни постоянного
+соединения - DB_CONN_MAX_AGE секунд.
+
+Модуль не импортирует модели: его читает settings.py.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+PROFILES = ('development', 'sqlite', 'postgres')
+
+# Выполняются на каждом новом соединении SQLite. journal_mode=WAL хранится в
+# самом файле, остальное действует только на соединение.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # В WAL при NORMAL сбой питания может потерять последние транзакции,
+    # но не испортить базу; fsync только на контрольных точках
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - размер в КиБ: 64 МиБ на соединение
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+# Сколько секунд ждать освобождения блокировки записи (busy timeout)
+SQLITE_TIMEOUT = 20
+CONN_MAX_AGE = 600
+
+
+def sqlite_init_command(pragmas=None):
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    return ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas.items())
+
+
+def development(path):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+    }
+
+
+def sqlite(path, conn_max_age=CONN_MAX_AGE):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': sqlite_init_command(),
+            'timeout': SQLITE_TIMEOUT,
+            # Бронирование читает день и пишет в одной транзакции: при DEFERRED
+            # повышение блокировки в WAL сразу падает с "database is locked",
+            # а IMMEDIATE ждет писателя в пределах timeout
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+
+
+def postgres(environ, conn_max_age=CONN_MAX_AGE):
+    if not environ.get('POSTGRES_DB'):
+        raise ImproperlyConfigured('DB_PROFILE=postgres требует POSTGRES_DB')
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': environ['POSTGRES_DB'],
+        'USER': environ.get('POSTGRES_USER', ''),
+        'PASSWORD': environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': environ.get('POSTGRES_HOST', ''),
+        'PORT': environ.get('POSTGRES_PORT', ''),
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    if environ.get('POSTGRES_POOL'):
+        # Пул сам держит и проверяет соединения; Django запрещает сочетать
+        # его с CONN_MAX_AGE
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError:
+            raise ImproperlyConfigured('POSTGRES_POOL требует пакет psycopg[pool]')
+        size = int(environ['POSTGRES_POOL'])
+        database['CONN_MAX_AGE'] = 0
+        database['CONN_HEALTH_CHECKS'] = False
+        database['OPTIONS']['pool'] = {
+            'min_size': max(1, size // 4),
+            'max_size': size,
+            # Соединение проверяется при выдаче из пула
+            'check': ConnectionPool.check_connection,
+        }
+    return database
+
+
+def from_environ(environ, base_dir):
+    """settings.DATABASES['default'] по переменным окружения"""
+    profile = environ.get('DB_PROFILE', 'development')
+    if profile not in PROFILES:
+        raise ImproperlyConfigured(
+            f"Неизвестный DB_PROFILE={profile!r}, допустимо: {', '.join(PROFILES)}"
+        )
+    conn_max_age = int(environ.get('DB_CONN_MAX_AGE', CONN_MAX_AGE))
+    path = environ.get('SQLITE_PATH') or base_dir / 'db.sqlite3'
+    if profile == 'sqlite':
+        return sqlite(path, conn_max_age)
+    if profile == 'postgres':
+        return postgres(environ, conn_max_age)
+    return development(path)
@@ -0,0 +1,168 @@
+"""
+Лента изменений занятости слотов для Server-Sent Events.
+
+На процесс приходится одна лента: все открытые календари подписываются на
+нее, а не опрашивают базу. Лента получает события из сигналов FullOrder
+(заявки этого процесса) и из единственного фонового опроса таблицы
+занятости, который замечает заявки, принятые другими воркерами.
+"""
+import asyncio
+import json
+import threading
+from datetime import date, timedelta
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from .models import SlotOccupancy
+from .occupancy import BOOKING_WINDOW_DAYS
+
+# Как часто единственный опрос базы ищет изменения других воркеров
+POLL_INTERVAL = 2.0
+# Предел паузы между опросами, пока база отвечает ошибкой
+POLL_BACKOFF_MAX = 60.0
+# Как часто слать пинг, чтобы прокси не закрывали простаивающее соединение
+HEARTBEAT_INTERVAL = 25.0
+# Сколько событий может накопиться у медленного подписчика
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+# Служебное событие: комментарий, не дающий прокси закрыть соединение
+PING = {'date': None}
+
+
+class ChangeFeed:
+    """Общая лента событий с fan-out по очередям подписчиков"""
+
+    def __init__(self, poll_interval=POLL_INTERVAL, heartbeat=HEARTBEAT_INTERVAL):
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self._subscribers = set()
+        self._loop = None
+        self._tasks = []
+        self._last_seen = None
+        # Когда этот процесс сам опубликовал изменение слота: опрос не
+        # повторяет такие события
+        self._published = {}
+        self._published_lock = threading.Lock()
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        """Регистрирует подписчика; вызывается из event loop"""
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if not self._tasks:
+            # Один таймер пинга и один опрос базы на всех подписчиков
+            if self.heartbeat:
+                self._tasks.append(self._loop.create_task(self._ping()))
+            if self.poll_interval:
+                self._tasks.append(self._loop.create_task(self._poll()))
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            for task in self._tasks:
+                task.cancel()
+            self._tasks = []
+
+    def publish(self, event):
+        """Публикует событие; можно вызывать из любого потока"""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._subscribers:
+            return
+        if event.get('date'):
+            with self._published_lock:
+                self._published[(event['date'], event['time_slot'])] = timezone.now()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._broadcast(event)
+        else:
+            loop.call_soon_threadsafe(self._broadcast, event)
+
+    def _broadcast(self, event):
+        for queue in tuple(self._subscribers):
+            if queue.full():
+                # Медленный клиент теряет самое старое событие, а не держит остальных
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _changes_since(self, since):
+        today = date.today()
+        rows = SlotOccupancy.objects.filter(
+            date__gte=today,
+            date__lte=today + timedelta(days=BOOKING_WINDOW_DAYS),
+            updated_at__gt=since,
+        ).values_list('date', 'time_slot', 'updated_at')
+        return list(rows)
+
+    async def _ping(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            self._broadcast(PING)
+
+    async def _poll(self):
+        # Новые подписчики и так загружают календарь целиком - прошлое не шлем
+        self._last_seen = timezone.now()
+        changes_since = sync_to_async(self._changes_since, thread_sensitive=False)
+        delay = self.poll_interval
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                rows = await changes_since(self._last_seen)
+            except Exception as e:
+                # Без сообщения сломанная лента выглядела бы как отсутствие заявок
+                print(f"Ошибка опроса занятости слотов: {e}")
+                delay = min(delay * 2, POLL_BACKOFF_MAX)
+                continue
+            delay = self.poll_interval
+            self._broadcast_changes(rows)
+
+    def _broadcast_changes(self, rows):
+        """Рассылает изменения из базы, кроме уже опубликованных этим процессом"""
+        with self._published_lock:
+            for slot_date, time_slot, updated_at in rows:
+                self._last_seen = max(self._last_seen, updated_at)
+                key = (slot_date.isoformat(), time_slot)
+                published = self._published.get(key)
+                if published is not None and updated_at <= published:
+                    continue
+                self._broadcast({'date': key[0], 'time_slot': time_slot})
+            # Отметки не позже last_seen уже ничего не отсеют
+            self._published = {
+                key: published for key, published in self._published.items() if published > self._last_seen
+            }
+
+
+feed = ChangeFeed()
+
+
+def publish_slot_change(slot_date, time_slot):
+    feed.publish({'date': slot_date.isoformat(), 'time_slot': time_slot})
+
+
+def format_event(event, name='occupancy'):
+    return f'event: {name}\ndata: {json.dumps(event)}\n\n'
+
+
+async def event_stream(start, end, change_feed=feed):
+    """SSE-поток изменений занятости для дат окна [start, end]"""
+    queue = change_feed.subscribe()
+    start_str, end_str = start.isoformat(), end.isoformat()
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            event = await queue.get()
+            if event is PING:
+                yield ': ping\n\n'
+            elif start_str <= event['date'] <= end_str:
+                yield format_event(event)
+    finally:
+        change_feed.unsubscribe(queue)
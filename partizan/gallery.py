@@ -0,0 +1,88 @@
+"""
+Галерея достижений: фильтры по месту и городу и постраничная выдача
+по ключу (keyset) вместо OFFSET.
+
+Порядок галереи (-date, order, id). Курсор - значения этих полей у
+последней показанной карточки, следующая страница начинается строго
+после нее, поэтому стоимость любой страницы одинакова.
+"""
+import hashlib
+from datetime import date
+
+from django.db.models import Q
+
+from . import content_cache
+from .models import Achievement
+
+PAGE_SIZE = 12
+GALLERY_ORDERING = ('-date', 'order', 'id')
+
+
+def encode_cursor(achievement):
+    return f'{achievement.date.isoformat()}_{achievement.order}_{achievement.pk}'
+
+
+def decode_cursor(value):
+    """Курсор 'ГГГГ-ММ-ДД_order_id' -> кортеж; None для пустого или битого"""
+    if not value:
+        return None
+    try:
+        day, order, pk = value.split('_')
+        return date.fromisoformat(day), int(order), int(pk)
+    except ValueError:
+        return None
+
+
+def parse_filters(params):
+    """Фильтры из GET: место - одно из PLACE_CHOICES, город - непустая строка"""
+    place = params.get('place', '')
+    place = int(place) if place.isdigit() and int(place) in dict(Achievement.PLACE_CHOICES) else None
+    city = params.get('city', '').strip() or None
+    return place, city
+
+
+def _filtered(place, city):
+    queryset = Achievement.objects.all()
+    if place is not None:
+        queryset = queryset.filter(place=place)
+    if city is not None:
+        queryset = queryset.filter(city=city)
+    return queryset
+
+
+def _after(cursor):
+    day, order, pk = cursor
+    return (
+        Q(date__lt=day)
+        | Q(date=day, order__gt=order)
+        | Q(date=day, order=order, id__gt=pk)
+    )
+
+
+def _build_page(place, city, cursor, size):
+    queryset = _filtered(place, city).order_by(*GALLERY_ORDERING)
+    if cursor is not None:
+        queryset = queryset.filter(_after(cursor))
+    return queryset[:size + 1]
+
+
+def achievements_page(place=None, city=None, cursor=None, size=PAGE_SIZE):
+    """Страница карточек и курсор следующей страницы (None, если это последняя)"""
+    params = f'{place}:{city}:{cursor}:{size}'
+    rows = content_cache.cached_query(
+        'gallery:' + hashlib.md5(params.encode()).hexdigest(),
+        [content_cache.ACHIEVEMENTS],
+        lambda: _build_page(place, city, cursor, size),
+    )
+    items = rows[:size]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > size else None
+    return items, next_cursor
+
+
+def cities():
+    """Города для фильтра, по алфавиту"""
+    return content_cache.cached_query(
+        'gallery:cities',
+        [content_cache.ACHIEVEMENTS],
+        lambda: Achievement.objects.order_by('city').values_list('city', flat=True).distinct(),
+    )
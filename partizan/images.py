@@ -0,0 +1,171 @@
+"""
+Уменьшенные копии (рендишены) фотографий праздников и достижений.
+
+Для каждого исходника в MEDIA_ROOT/renditions/ лежат копии нескольких
+ширин в WebP и JPEG: holidays/1.jpg -> renditions/holidays/1-320.webp и т.д.
+Шаблонный тег responsive_image собирает из них srcset.
+"""
+import hashlib
+import os
+import queue
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+RENDITIONS_DIR = 'renditions'
+READY_KEY = 'partizan:renditions:{digest}'
+# "Копий нет" помним недолго: их вот-вот построит фоновый поток
+MISSING_TTL = 60
+RENDITION_WIDTHS = (320, 640, 1024)
+
+# расширение -> (формат Pillow, параметры сохранения)
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def rendition_name(name, width, ext):
+    stem, _ = os.path.splitext(name)
+    return f'{RENDITIONS_DIR}/{stem}-{width}.{ext}'
+
+
+def rendition_names(name):
+    return [
+        rendition_name(name, width, ext)
+        for width in RENDITION_WIDTHS
+        for ext in RENDITION_FORMATS
+    ]
+
+
+def _ready_key(name):
+    return READY_KEY.format(digest=hashlib.md5(name.encode()).hexdigest())
+
+
+def has_renditions(name):
+    """
+    Проверяем по самой большой копии: она сохраняется последней. Ответ
+    кешируется, чтобы шаблон не обращался к хранилищу при каждом рендере.
+    """
+    key = _ready_key(name)
+    ready = cache.get(key)
+    if ready is None:
+        ready = default_storage.exists(rendition_name(name, RENDITION_WIDTHS[-1], 'jpg'))
+        cache.set(key, ready, None if ready else MISSING_TTL)
+    return ready
+
+
+def forget(name):
+    """Сбрасывает запомненный ответ has_renditions (копии удалены)"""
+    cache.delete(_ready_key(name))
+
+
+def _encode(image, ext):
+    image_format, params = RENDITION_FORMATS[ext]
+    buffer = BytesIO()
+    image.save(buffer, image_format, **params)
+    return buffer.getvalue()
+
+
+def generate_renditions(name, source_storage=default_storage, force=False):
+    """
+    Создает копии всех ширин и форматов для файла name; возвращает число новых файлов.
+    Копии всегда пишутся в default_storage: в хранилище по хешу они потеряли бы имена.
+    """
+    if not name or (not force and has_renditions(name)):
+        return 0
+
+    with source_storage.open(name, 'rb') as source:
+        original = Image.open(source)
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'L'):
+            original = original.convert('RGB')
+        original.load()
+
+    created = 0
+    for width in RENDITION_WIDTHS:
+        # Не увеличиваем маленькие исходники: копия просто остается исходного размера
+        image = original
+        if original.width > width:
+            height = round(original.height * width / original.width)
+            image = original.resize((width, height), Image.LANCZOS)
+        for ext in RENDITION_FORMATS:
+            target = rendition_name(name, width, ext)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, ContentFile(_encode(image, ext)))
+            created += 1
+    cache.set(_ready_key(name), True, None)
+    return created
+
+
+def delete_renditions(name):
+    for target in rendition_names(name):
+        if default_storage.exists(target):
+            default_storage.delete(target)
+    forget(name)
+
+
+def srcset(name, ext):
+    return ', '.join(
+        f'{default_storage.url(rendition_name(name, width, ext))} {width}w'
+        for width in RENDITION_WIDTHS
+    )
+
+
+class RenditionWorker:
+    """
+    Фоновый поток процесса, строящий копии после сохранения фото в админке:
+    Pillow не задерживает ответ на сохранение.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, name, storage):
+        if not settings.PARTIZAN_RENDITIONS_WORKER:
+            self._build(name, storage)
+            return
+        self._ensure_started()
+        self._queue.put((name, storage))
+
+    def wait(self):
+        """Ждет, пока будут построены все поставленные в очередь копии"""
+        self._queue.join()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # После fork очередь и поток родителя в дочернем процессе не работают
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='partizan-renditions', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            name, storage = self._queue.get()
+            try:
+                self._build(name, storage)
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _build(name, storage):
+        try:
+            generate_renditions(name, storage)
+        except Exception as e:
+            print(f"Не удалось создать копии {name}: {e}")
+
+
+worker = RenditionWorker()
@@ -0,0 +1,373 @@
+"""
+Нагрузочный прогон сайта по HTTP: смешанный трафик против запущенного сервера.
+
+Потоки-посетители открывают главную, списки праздников с ?age=, страницы
+праздников (популярные чаще), API доступности с If-None-Match, API галереи
+и отзывов и иногда оставляют быструю заявку. Отдельный поток периодически
+устраивает всплеск одновременных create_full_order на один популярный слот.
+
+Праздники и возрасты берутся из базы проекта, поэтому сервер должен работать
+с той же базой, заранее заполненной командой generate_data. Всплески создают
+настоящие заявки - прогон делается на копии базы, не на рабочей.
+
+Итог по каждому сценарию: число запросов, ошибки (исключения и HTTP 4xx/5xx),
+отказы (занятый слот - ожидаемый ответ success: false), пропускная
+способность и p50/p95/p99 задержки. Результат сохраняется в JSON вместе с
+коммитом, чтобы сравнивать прогоны.
+"""
+import http.client
+import json
+import math
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+from . import reviews
+from .models import Holiday
+
+# Сценарии посетителя и их веса
+SCENARIOS = {
+    'home': 20,
+    'holidays_by_age': 20,
+    'holiday_detail': 25,
+    'availability': 15,
+    'achievements_api': 5,
+    'reviews_api': 5,
+    'quick_order': 3,
+}
+BOOKING = 'create_full_order'
+
+REQUEST_TIMEOUT = 30.0
+HOLIDAYS_LIMIT = 100
+
+
+def percentile(values, q):
+    """Процентиль по ближайшему рангу; values отсортированы"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[rank - 1]
+
+
+def discover_targets(limit=HOLIDAYS_LIMIT):
+    """Активные праздники (id, slug, min_age, max_age) в порядке популярности - по id"""
+    return list(
+        Holiday.objects.filter(active=True).order_by('id')
+        .values_list('id', 'slug', 'min_age', 'max_age')[:limit]
+    )
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Recorder:
+    """Задержки и исходы запросов по сценариям; общий для всех потоков"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.rejected = defaultdict(int)
+
+    def record(self, name, elapsed, outcome):
+        with self._lock:
+            self.latencies[name].append(elapsed)
+            if outcome == 'error':
+                self.errors[name] += 1
+            elif outcome == 'rejected':
+                self.rejected[name] += 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            endpoints[name] = {
+                'requests': len(values),
+                'errors': self.errors[name],
+                'error_rate': round(self.errors[name] / len(values), 4),
+                'rejected': self.rejected[name],
+                'throughput_rps': round(len(values) / elapsed, 2),
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p95_ms': round(percentile(values, 95) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+                'max_ms': round(values[-1] * 1000, 2),
+            }
+        requests = sum(item['requests'] for item in endpoints.values())
+        errors = sum(item['errors'] for item in endpoints.values())
+        return {
+            'requests': requests,
+            'errors': errors,
+            'error_rate': round(errors / requests, 4) if requests else 0.0,
+            'throughput_rps': round(requests / elapsed, 2),
+        }, endpoints
+
+
+class Connection:
+    """
+    Соединение потока. По умолчанию новое на каждый запрос: runserver пишет
+    заголовки и тело отдельно, и на постоянном соединении задержанный ACK
+    добавляет ~40 мс к каждому ответу. keep_alive - для серверов с TCP_NODELAY.
+    """
+
+    def __init__(self, base_url, keep_alive=False):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.https = parts.scheme == 'https'
+        self.keep_alive = keep_alive
+        self._conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self._conn = cls(self.host, self.port, timeout=REQUEST_TIMEOUT)
+        try:
+            self._conn.request(method, path, body=body, headers=headers or {})
+            response = self._conn.getresponse()
+            result = response.status, response.read(), response.headers
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        if not self.keep_alive:
+            self.close()
+        return result
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _booking_outcome(status, body):
+    if status >= 400:
+        return 'error'
+    try:
+        return 'ok' if json.loads(body).get('success') else 'rejected'
+    except ValueError:
+        return 'error'
+
+
+def _timed(recorder, name, send, classify=None):
+    started = time.perf_counter()
+    try:
+        status, body, headers = send()
+    except (OSError, http.client.HTTPException):
+        recorder.record(name, time.perf_counter() - started, 'error')
+        return None
+    elapsed = time.perf_counter() - started
+    if classify is not None:
+        outcome = classify(status, body)
+    else:
+        outcome = 'error' if status >= 400 else 'ok'
+    recorder.record(name, elapsed, outcome)
+    return status, body, headers
+
+
+def _phone(rng):
+    return f'+7 9{rng.randrange(10, 100)} {rng.randrange(100, 1000)}-{rng.randrange(10, 100)}-{rng.randrange(10, 100)}'
+
+
+class Visitor(threading.Thread):
+    """Поток посетителя: случайные сценарии до окончания прогона"""
+
+    def __init__(self, base_url, targets, recorder, stop, seed, reviews_cursor=None, keep_alive=False):
+        super().__init__(daemon=True)
+        self.connection = Connection(base_url, keep_alive)
+        self.targets = targets
+        self.first_reviews_cursor = reviews_cursor
+        self.reviews_cursor = None
+        self.achievements_cursor = None
+        self.recorder = recorder
+        self.stop = stop
+        self.rng = random.Random(seed)
+        # Популярность праздников убывает как 1/ранг
+        self.target_weights = [1 / (rank + 1) for rank in range(len(targets))]
+        self.etags = {}
+
+    def pick_holiday(self):
+        return self.rng.choices(self.targets, self.target_weights)[0]
+
+    def run(self):
+        names, weights = list(SCENARIOS), list(SCENARIOS.values())
+        while not self.stop.is_set():
+            getattr(self, self.rng.choices(names, weights)[0])()
+
+    def get(self, name, path, headers=None):
+        return _timed(self.recorder, name, lambda: self.connection.request('GET', path, headers=headers))
+
+    def home(self):
+        self.get('home', '/')
+
+    def holidays_by_age(self):
+        _, _, min_age, max_age = self.pick_holiday()
+        self.get('holidays_by_age', '/holidays/?' + urlencode({'age': self.rng.randint(min_age, max_age)}))
+
+    def holiday_detail(self):
+        self.get('holiday_detail', f'/holiday/{self.pick_holiday()[1]}/')
+
+    def availability(self):
+        holiday_id = self.pick_holiday()[0]
+        # Как браузер: повторный запрос календаря с ETag получает 304
+        headers = {'If-None-Match': self.etags[holiday_id]} if holiday_id in self.etags else None
+        result = self.get('availability', f'/api/v2/availability/{holiday_id}/', headers)
+        if result and result[2].get('ETag'):
+            self.etags[holiday_id] = result[2]['ETag']
+
+    def follow(self, name, path, cursor):
+        """Следующая страница ленты по курсору, как при прокрутке; в конце - снова с начала"""
+        result = self.get(name, path + ('?' + urlencode({'cursor': cursor}) if cursor else ''))
+        if result is None or result[0] != 200:
+            return None
+        return json.loads(result[1]).get('next')
+
+    def achievements_api(self):
+        self.achievements_cursor = self.follow('achievements_api', '/api/achievements/', self.achievements_cursor)
+
+    def reviews_api(self):
+        # Первую страницу отзывов отдает главная, API - только следующие
+        if self.first_reviews_cursor is None:
+            return self.home()
+        self.reviews_cursor = (
+            self.follow('reviews_api', '/api/reviews/', self.reviews_cursor or self.first_reviews_cursor)
+        )
+
+    def quick_order(self):
+        body = urlencode({'holiday_id': self.pick_holiday()[0], 'phone': _phone(self.rng)})
+        _timed(self.recorder, 'quick_order', lambda: self.connection.request(
+            'POST', '/api/create-quick-order/', body,
+            {'Content-Type': 'application/x-www-form-urlencoded'},
+        ))
+
+
+def free_slots(connection, holiday_id):
+    """Свободные слоты праздника из API доступности: [(дата, время), ...]"""
+    status, body, _ = connection.request('GET', f'/api/v2/availability/{holiday_id}/')
+    if status != 200:
+        return []
+    slots = json.loads(body)['slots']
+    return [
+        (day, slot['value'])
+        for day, day_slots in sorted(slots.items())
+        for slot in day_slots if slot['free_halls'] > 0
+    ]
+
+
+class BookingBursts(threading.Thread):
+    """Всплески одновременных полных заявок на один из первых свободных слотов"""
+
+    def __init__(self, base_url, targets, recorder, stop, seed, size, interval):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.targets = targets[:3]
+        self.recorder = recorder
+        self.stop = stop
+        self.rng = random.Random(seed)
+        self.size = size
+        self.interval = interval
+        self.bursts = 0
+
+    def run(self):
+        connection = Connection(self.base_url)
+        while not self.stop.wait(self.interval):
+            holiday_id = self.rng.choice(self.targets)[0]
+            try:
+                slots = free_slots(connection, holiday_id)
+            except (OSError, http.client.HTTPException):
+                continue
+            if not slots:
+                continue
+            # Популярные слоты - ближайшие
+            selected_date, selected_time = self.rng.choice(slots[:5])
+            start = threading.Barrier(self.size)
+            threads = [
+                threading.Thread(target=self.book, args=(start, holiday_id, selected_date, selected_time))
+                for _ in range(self.size)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.bursts += 1
+
+    def book(self, start, holiday_id, selected_date, selected_time):
+        body = urlencode({
+            'holiday_id': holiday_id, 'full_name': 'Нагрузочный тест', 'phone': _phone(self.rng),
+            'children_count': 5, 'age_of_children': '7', 'selected_date': selected_date,
+            'selected_time': selected_time,
+        })
+        connection = Connection(self.base_url)
+        start.wait()
+        _timed(self.recorder, BOOKING, lambda: connection.request(
+            'POST', '/api/create-full-order/', body,
+            {'Content-Type': 'application/x-www-form-urlencoded'},
+        ), _booking_outcome)
+
+
+def run(base_url, duration=30.0, concurrency=16, seed=1, burst_size=20, burst_interval=5.0,
+        keep_alive=False, targets=None):
+    """Прогон на duration секунд; возвращает результат для JSON"""
+    targets = targets if targets is not None else discover_targets()
+    if not targets:
+        raise ValueError('В базе нет активных праздников - сначала заполните ее')
+
+    recorder = Recorder()
+    stop = threading.Event()
+    reviews_cursor = reviews.reviews_page()[1]
+    threads = [
+        Visitor(base_url, targets, recorder, stop, seed + index, reviews_cursor, keep_alive)
+        for index in range(concurrency)
+    ]
+    bursts = None
+    if burst_size:
+        bursts = BookingBursts(base_url, targets, recorder, stop, seed - 1, burst_size, burst_interval)
+        threads.append(bursts)
+
+    started_at = datetime.now().astimezone()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    stop.wait(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    totals, endpoints = recorder.summary(elapsed)
+    return {
+        'commit': current_commit(),
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'base_url': base_url,
+        'config': {
+            'duration': duration, 'concurrency': concurrency, 'seed': seed,
+            'burst_size': burst_size, 'burst_interval': burst_interval, 'keep_alive': keep_alive,
+            'holidays': len(targets),
+        },
+        'elapsed_seconds': round(elapsed, 3),
+        'bursts': bursts.bursts if bursts else 0,
+        'totals': totals,
+        'endpoints': endpoints,
+    }
+
+
+def compare(current, previous):
+    """Изменения p95 и пропускной способности относительно прошлого прогона, %"""
+    changes = {}
+    for name, item in current['endpoints'].items():
+        before = previous.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        changes[name] = {
+            key: round((item[key] - before[key]) / before[key] * 100, 1) if before[key] else None
+            for key in ('p95_ms', 'throughput_rps', 'error_rate')
+        }
+    return changes
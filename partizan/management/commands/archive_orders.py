@@ -0,0 +1,34 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from partizan import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит прошедшие заявки на праздники и давно обработанные заявки '
+        'в архивные таблицы. Пачка - одна транзакция, поэтому прерванный прогон '
+        'можно просто запустить снова.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE, help='Строк в пачке')
+        parser.add_argument('--max-batches', type=int, help='Не больше стольких пачек на таблицу')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать, что будет перенесено')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        today = date.today()
+
+        if options['dry_run']:
+            for model in archive.ARCHIVES:
+                count = archive.archivable(model, today).count()
+                self.stdout.write(f'{model._meta.verbose_name_plural}: {count} к переносу')
+            return
+
+        moved = archive.run(today, batch_size=options['batch_size'], max_batches=options['max_batches'])
+        for model in archive.ARCHIVES:
+            self.stdout.write(f"{model._meta.verbose_name_plural}: перенесено {moved[model._meta.model_name]}")
+        self.stdout.write(self.style.SUCCESS('Архивация завершена'))
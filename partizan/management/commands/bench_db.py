@@ -0,0 +1,132 @@
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from partizan import database, loadtest
+
+SERVER_START_TIMEOUT = 30.0
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает профили базы (partizan.database) на смешанном трафике и '
+        'всплесках бронирований: для каждого профиля поднимает runserver с '
+        'DB_PROFILE и гоняет bench_http. SQLite-профили работают на копиях '
+        'текущей базы, postgres - на базе из POSTGRES_* (всплески пишут в нее).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', default='development,sqlite',
+            help='Профили через запятую: ' + ', '.join(database.PROFILES),
+        )
+        parser.add_argument('--port', type=int, default=8765, help='Порт тестового сервера')
+        parser.add_argument('--duration', type=float, default=30.0, help='Длительность прогона, с')
+        parser.add_argument('--concurrency', type=int, default=16, help='Число потоков-посетителей')
+        parser.add_argument('--seed', type=int, default=1, help='Зерно случайного трафика')
+        parser.add_argument('--burst-size', type=int, default=20, help='Заявок во всплеске')
+        parser.add_argument('--burst-interval', type=float, default=5.0, help='Пауза между всплесками, с')
+        parser.add_argument('--output', help='Куда сохранить результаты всех профилей в JSON')
+
+    def handle(self, *args, **options):
+        profiles = [name.strip() for name in options['profiles'].split(',') if name.strip()]
+        unknown = set(profiles) - set(database.PROFILES)
+        if unknown:
+            raise CommandError(f"Неизвестные профили: {', '.join(sorted(unknown))}")
+        source = settings.DATABASES['default']
+        if any(name != 'postgres' for name in profiles) and source['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('SQLite-профили копируют текущую базу - запускайте с базой SQLite')
+
+        results = {}
+        with tempfile.TemporaryDirectory() as workdir:
+            for name in profiles:
+                env = dict(os.environ, DB_PROFILE=name)
+                if name != 'postgres':
+                    env['SQLITE_PATH'] = str(self.copy_database(source['NAME'], Path(workdir) / f'{name}.sqlite3'))
+                self.stderr.write(f'Профиль {name}...')
+                results[name] = self.run_profile(env, Path(workdir) / f'{name}.json', options)
+
+        baseline = results[profiles[0]]
+        self.report(profiles, results, baseline)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Результат сохранен в {options['output']}"))
+
+    def copy_database(self, source, target):
+        """Копия через backup API: согласованная даже при открытом WAL"""
+        with sqlite3.connect(source) as origin, sqlite3.connect(target) as copy:
+            origin.backup(copy)
+            # Профиль development должен видеть обычный журнал, а не WAL,
+            # оставшийся в исходном файле
+            copy.execute('PRAGMA journal_mode=DELETE')
+        return target
+
+    def run_profile(self, env, output, options):
+        manage = [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py')]
+        address = f"127.0.0.1:{options['port']}"
+        server = subprocess.Popen(
+            manage + ['runserver', '--noreload', address],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.wait_for_port(options['port'], server)
+            bench = subprocess.run(
+                manage + [
+                    'bench_http', '--base-url', f'http://{address}',
+                    '--duration', str(options['duration']),
+                    '--concurrency', str(options['concurrency']),
+                    '--seed', str(options['seed']),
+                    '--burst-size', str(options['burst_size']),
+                    '--burst-interval', str(options['burst_interval']),
+                    '--output', str(output),
+                ],
+                env=env, capture_output=True, text=True,
+            )
+            if bench.returncode:
+                raise CommandError(f'bench_http завершился с ошибкой:\n{bench.stderr}')
+        finally:
+            server.terminate()
+            server.wait()
+        with open(output, encoding='utf-8') as source:
+            return json.load(source)
+
+    def wait_for_port(self, port, server):
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Сервер не запустился - проверьте профиль командой check')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'Сервер не начал слушать порт {port} за {SERVER_START_TIMEOUT:.0f} с')
+
+    def report(self, profiles, results, baseline):
+        endpoints = list(baseline['endpoints'])
+        self.stdout.write(f"{'p95, мс / rps':<20}" + ''.join(f'{name:>20}' for name in profiles))
+        for endpoint in endpoints:
+            cells = []
+            for name in profiles:
+                item = results[name]['endpoints'].get(endpoint)
+                cells.append(f"{item['p95_ms']} / {item['throughput_rps']}" if item else '-')
+            self.stdout.write(f'{endpoint:<20}' + ''.join(f'{cell:>20}' for cell in cells))
+        self.stdout.write(
+            f"{'ошибки, %':<20}"
+            + ''.join(f"{results[name]['totals']['error_rate'] * 100:>20.2f}" for name in profiles)
+        )
+        for name in profiles[1:]:
+            changes = loadtest.compare(results[name], baseline)
+            booking = changes.get(loadtest.BOOKING)
+            if booking and booking['p95_ms'] is not None:
+                self.stdout.write(f"{name} против {profiles[0]}: бронирование p95 {booking['p95_ms']:+}%")
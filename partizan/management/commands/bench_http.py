@@ -0,0 +1,81 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from partizan import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон по HTTP против запущенного сервера: смешанный трафик '
+        'посетителей и всплески заявок на популярные слоты. Печатает p50/p95/p99, '
+        'пропускную способность и ошибки по сценариям, сохраняет JSON. '
+        'Всплески создают заявки - запускайте на копии базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Адрес сервера')
+        parser.add_argument('--duration', type=float, default=30.0, help='Длительность, с')
+        parser.add_argument('--concurrency', type=int, default=16, help='Число потоков-посетителей')
+        parser.add_argument('--seed', type=int, default=1, help='Зерно случайного трафика')
+        parser.add_argument('--burst-size', type=int, default=20, help='Заявок во всплеске; 0 - без всплесков')
+        parser.add_argument('--burst-interval', type=float, default=5.0, help='Пауза между всплесками, с')
+        parser.add_argument(
+            '--keep-alive', action='store_true',
+            help='Постоянные соединения (для серверов с TCP_NODELAY, не для runserver)',
+        )
+        parser.add_argument('--output', help='Куда сохранить результат в JSON')
+        parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+
+    def handle(self, *args, **options):
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as source:
+                    previous = json.load(source)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Не удалось прочитать {options["compare"]}: {e}')
+
+        try:
+            result = loadtest.run(
+                options['base_url'],
+                duration=options['duration'],
+                concurrency=options['concurrency'],
+                seed=options['seed'],
+                burst_size=options['burst_size'],
+                burst_interval=options['burst_interval'],
+                keep_alive=options['keep_alive'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        if previous is not None:
+            result['compared_to'] = previous.get('commit')
+            result['changes'] = loadtest.compare(result, previous)
+
+        self.report(result)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(result, output, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Результат сохранен в {options['output']}"))
+
+    def report(self, result):
+        self.stdout.write(
+            f"{'Сценарий':<20}{'запросов':>9}{'rps':>9}{'p50, мс':>10}{'p95, мс':>10}"
+            f"{'p99, мс':>10}{'ошибки':>8}{'отказы':>8}"
+        )
+        for name, item in result['endpoints'].items():
+            self.stdout.write(
+                f"{name:<20}{item['requests']:>9}{item['throughput_rps']:>9}{item['p50_ms']:>10}"
+                f"{item['p95_ms']:>10}{item['p99_ms']:>10}{item['errors']:>8}{item['rejected']:>8}"
+            )
+        totals = result['totals']
+        self.stdout.write(
+            f"Всего: {totals['requests']} запросов, {totals['throughput_rps']} rps, "
+            f"ошибок {totals['error_rate'] * 100:.2f}%, всплесков {result['bursts']}"
+        )
+        for name, change in result.get('changes', {}).items():
+            self.stdout.write(
+                f"  {name}: p95 {change['p95_ms']:+}%, rps {change['throughput_rps']:+}%"
+                if change['p95_ms'] is not None and change['throughput_rps'] is not None
+                else f"  {name}: нет базы для сравнения"
+            )
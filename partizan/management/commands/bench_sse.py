@@ -0,0 +1,86 @@
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from partizan.feed import ChangeFeed, event_stream
+from partizan.occupancy import booking_window
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк SSE-ленты: память на простаивающего подписчика и время '
+        'доставки события всем подписчикам в одном воркере. Считает только '
+        'стоимость ленты и генератора потока; накладные расходы ASGI-сервера '
+        'на соединение добавляются сверху.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=10000, help='Число подписчиков')
+        parser.add_argument('--events', type=int, default=20, help='Сколько событий разослать')
+        parser.add_argument(
+            '--memory-budget-mb', type=int, default=256,
+            help='Память воркера под подписчиков для оценки емкости',
+        )
+
+    def handle(self, *args, **options):
+        result = asyncio.run(self.run(options['subscribers'], options['events']))
+        per_subscriber = result['memory'] / options['subscribers']
+        capacity = int(options['memory_budget_mb'] * 1024 * 1024 / per_subscriber)
+        latencies = result['latencies']
+
+        self.stdout.write(f"Подписчиков:              {options['subscribers']}")
+        self.stdout.write(f"Подключение всех:         {result['subscribe_time'] * 1000:.1f} мс")
+        self.stdout.write(f"Память на подписчика:     {per_subscriber / 1024:.2f} КБ")
+        self.stdout.write(f"Рассылка события (p50):   {statistics.median(latencies) * 1000:.2f} мс")
+        self.stdout.write(f"Рассылка события (max):   {max(latencies) * 1000:.2f} мс")
+        self.stdout.write(self.style.SUCCESS(
+            f"Оценка: ~{capacity} простаивающих подписчиков на {options['memory_budget_mb']} МБ"
+        ))
+
+    async def run(self, subscribers, events):
+        change_feed = ChangeFeed(poll_interval=0, heartbeat=0)
+        start, end = booking_window()
+        event = {'date': start.isoformat(), 'time_slot': '13:00-15:00'}
+
+        received = 0
+        target = 0
+        all_received = asyncio.Event()
+
+        async def consume(stream):
+            nonlocal received
+            async for _chunk in stream:
+                received += 1
+                if received >= target:
+                    all_received.set()
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+
+        streams = [event_stream(start, end, change_feed) for _ in range(subscribers)]
+        for stream in streams:
+            await stream.__anext__()  # retry-заголовок, подписка оформлена
+        tasks = [asyncio.create_task(consume(stream)) for stream in streams]
+        await asyncio.sleep(0)
+
+        subscribe_time = time.perf_counter() - started
+        memory = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        latencies = []
+        for _ in range(events):
+            target = received + subscribers
+            all_received.clear()
+            sent = time.perf_counter()
+            change_feed.publish(event)
+            await all_received.wait()
+            latencies.append(time.perf_counter() - sent)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        return {'subscribe_time': subscribe_time, 'memory': memory, 'latencies': latencies}
@@ -0,0 +1,59 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from partizan.images import generate_renditions
+from partizan.models import Achievement, Holiday
+
+
+def _init_worker():
+    # При запуске через spawn дочернему процессу нужно заново настроить Django
+    import django
+    django.setup()
+
+
+def _build(name, force):
+    try:
+        storage = Holiday._meta.get_field('image').storage
+        return name, generate_renditions(name, storage, force=force), None
+    except OSError as e:
+        return name, 0, str(e)
+
+
+class Command(BaseCommand):
+    help = 'Создает уменьшенные WebP/JPEG копии для фото праздников и достижений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число процессов (по умолчанию по числу ядер)',
+        )
+        parser.add_argument('--force', action='store_true', help='Пересоздать существующие копии')
+
+    def handle(self, *args, **options):
+        names = set()
+        for model in (Holiday, Achievement):
+            names.update(
+                model.objects.exclude(image='').exclude(image__isnull=True)
+                .values_list('image', flat=True)
+            )
+        names = sorted(names)
+        # Соединения с базой не должны наследоваться дочерними процессами
+        connections.close_all()
+
+        created = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            futures = [pool.submit(_build, name, options['force']) for name in names]
+            for future in as_completed(futures):
+                name, count, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                else:
+                    created += count
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Исходников: {len(names)}, создано копий: {created}, ошибок: {failed}'
+        ))
@@ -0,0 +1,108 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from partizan.images import RENDITIONS_DIR, forget, generate_renditions, rendition_names
+from partizan.models import Achievement, Holiday
+from partizan.storage import BLOBS_DIR
+
+# (модель, каталог upload_to) полей с фото
+IMAGE_MODELS = (
+    (Holiday, 'holidays'),
+    (Achievement, 'achievements'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит фото праздников и достижений в хранилище по хешу, '
+        'удаляет дубликаты и файлы, на которые больше никто не ссылается'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет сделано')
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе N секунд (загрузки, которые еще не сохранены)',
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.cutoff = time.time() - options['min_age']
+        self.freed = 0
+
+        migrated = self.migrate_to_blobs()
+        referenced = self.referenced_names()
+        removed = self.remove_unreferenced(referenced)
+
+        prefix = '[dry-run] ' if self.dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}Перенесено записей: {migrated}, удалено файлов: {removed}, '
+            f'освобождено: {self.freed / 1024 / 1024:.1f} МБ'
+        ))
+
+    def migrate_to_blobs(self):
+        """Пересохраняет старые файлы через хранилище по хешу и переписывает ссылки"""
+        migrated = 0
+        for model, _ in IMAGE_MODELS:
+            storage = model._meta.get_field('image').storage
+            rows = (
+                model.objects.exclude(image='').exclude(image__isnull=True)
+                .exclude(image__startswith=f'{BLOBS_DIR}/')
+                .values_list('pk', 'image')
+            )
+            for pk, name in rows:
+                if not storage.exists(name):
+                    self.stderr.write(f'{model.__name__} #{pk}: файл {name} не найден')
+                    continue
+                if self.dry_run:
+                    self.stdout.write(f'{name} -> blob')
+                    migrated += 1
+                    continue
+                with storage.open(name, 'rb') as source:
+                    new_name = storage.save(name, source)
+                with transaction.atomic():
+                    # update() без сигналов: копии для нового имени строим ниже сами
+                    model.objects.filter(pk=pk).update(image=new_name)
+                generate_renditions(new_name, storage)
+                self.stdout.write(f'{name} -> {new_name}')
+                migrated += 1
+        return migrated
+
+    def referenced_names(self):
+        names = set()
+        for model, _ in IMAGE_MODELS:
+            names.update(
+                model.objects.exclude(image='').exclude(image__isnull=True)
+                .values_list('image', flat=True)
+            )
+        return names
+
+    def remove_unreferenced(self, referenced):
+        """Удаляет старые копии, blobs и рендишены, на которые нет ссылок"""
+        keep = set(referenced)
+        for name in referenced:
+            keep.update(rendition_names(name))
+
+        directories = [directory for _, directory in IMAGE_MODELS] + [BLOBS_DIR, RENDITIONS_DIR]
+        removed = 0
+        for directory in directories:
+            root = os.path.join(settings.MEDIA_ROOT, directory)
+            for dirpath, _, filenames in os.walk(root):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    name = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+                    if name in keep or os.path.getmtime(path) > self.cutoff:
+                        continue
+                    self.freed += os.path.getsize(path)
+                    removed += 1
+                    if self.dry_run:
+                        self.stdout.write(f'удалить {name}')
+                    else:
+                        os.remove(path)
+                        # Если тот же файл загрузят снова, копии придется строить заново
+                        forget(name)
+        return removed
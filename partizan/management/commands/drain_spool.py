@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from partizan.spool import DRAIN_INTERVAL, drain
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит очередь заявок (быстрые заявки, тренировки, отзывы) в базу. '
+        'Без --loop делает один проход - так же восстанавливаются сегменты после сбоя.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно')
+        parser.add_argument('--interval', type=float, default=DRAIN_INTERVAL, help='Пауза между проходами, с')
+        parser.add_argument('--batch-size', type=int, default=500, help='Размер пачки bulk_create')
+
+    def handle(self, *args, **options):
+        while True:
+            saved = drain(batch_size=options['batch_size'])
+            if saved:
+                self.stdout.write(f'Перенесено записей: {saved}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS('Очередь перенесена'))
@@ -0,0 +1,57 @@
+import sys
+from datetime import date
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+
+from partizan import exports
+from partizan.models import FullOrder, TrainingRegistration
+
+MODELS = {
+    'fullorder': FullOrder,
+    'trainingregistration': TrainingRegistration,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает заявки в CSV или XLSX с колонками списка в админке. '
+        'Строки читаются потоком, память не зависит от объема выгрузки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=MODELS, help='Что выгружать')
+        parser.add_argument('--format', choices=exports.CONTENT_TYPES, default='csv', help='Формат файла')
+        parser.add_argument('--output', help='Путь к файлу; по умолчанию - stdout')
+        parser.add_argument('--since', type=date.fromisoformat, help='Заявки с даты (ГГГГ-ММ-ДД)')
+        parser.add_argument('--until', type=date.fromisoformat, help='Заявки по дату включительно')
+        status = parser.add_mutually_exclusive_group()
+        status.add_argument('--processed', action='store_true', help='Только обработанные')
+        status.add_argument('--unprocessed', action='store_true', help='Только необработанные')
+
+    def handle(self, *args, **options):
+        model = MODELS[options['model']]
+        model_admin = admin.site.get_model_admin(model)
+
+        queryset = model.objects.order_by('-created_at', '-pk')
+        if options['since']:
+            queryset = queryset.filter(created_at__date__gte=options['since'])
+        if options['until']:
+            queryset = queryset.filter(created_at__date__lte=options['until'])
+        if options['processed'] or options['unprocessed']:
+            queryset = queryset.filter(processed=options['processed'])
+
+        chunks = exports.stream(model_admin, queryset, options['format'])
+        if options['output']:
+            try:
+                with open(options['output'], 'wb') as output:
+                    self._write(output, chunks)
+            except OSError as e:
+                raise CommandError(f'Не удалось записать {options["output"]}: {e}')
+            self.stderr.write(self.style.SUCCESS(f'Выгрузка сохранена в {options["output"]}'))
+        else:
+            self._write(sys.stdout.buffer, chunks)
+
+    def _write(self, output, chunks):
+        for chunk in chunks:
+            output.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
@@ -0,0 +1,343 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from partizan import ratings, schedule
+from partizan.images import generate_renditions
+from partizan.models import (
+    Achievement, Category, FullOrder, Holiday, QuickOrder, Review, TrainingRegistration,
+)
+from partizan.occupancy import BOOKING_WINDOW_DAYS, rebuild_occupancy
+
+# Сколько строк вставлять между коммитами
+TRANSACTION_ROWS = 100_000
+
+THEMES = ['Пираты', 'Супергерои', 'Принцессы', 'Ниндзя', 'Космос', 'Динозавры', 'Рыцари', 'Квест',
+          'Лазертаг', 'Футбол', 'Шоу пузырей', 'Химия', 'Единороги', 'Индейцы', 'Детективы', 'Гонки']
+STYLES = ['Праздник', 'Вечеринка', 'Шоу', 'Программа', 'Приключение', 'Турнир']
+CATEGORY_NAMES = ['Дни рождения', 'Выпускные', 'Новый год', 'Спортивные', 'Научные', 'Творческие',
+                  'Квесты', 'Для малышей', 'Для подростков', 'Семейные']
+CITIES = ['Москва', 'Санкт-Петербург', 'Казань', 'Тверь', 'Калуга', 'Рязань', 'Тула', 'Ярославль',
+          'Владимир', 'Нижний Новгород', 'Смоленск', 'Кострома']
+NAMES = ['Анна', 'Мария', 'Елена', 'Ольга', 'Наталья', 'Ирина', 'Сергей', 'Андрей', 'Дмитрий',
+         'Алексей', 'Игорь', 'Павел', 'Татьяна', 'Светлана', 'Михаил', 'Екатерина']
+SURNAMES = ['Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов', 'Михайлов',
+            'Новиков', 'Федоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семенов', 'Егоров']
+WORDS = ('дети аниматоры программа зал игры конкурсы подарки торт музыка костюмы ведущий '
+         'команда эстафета призы фото шоу танцы сюрприз друзья праздник').split()
+PLACEHOLDER_SIZE = (800, 600)
+
+
+def _sentence(rng, words=12):
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def _text(rng, sentences=3):
+    return ' '.join(_sentence(rng, rng.randint(6, 14)) for _ in range(sentences))
+
+
+def _phone(rng):
+    return f'+7 9{rng.randrange(10, 100)} {rng.randrange(100, 1000)}-{rng.randrange(10, 100)}-{rng.randrange(10, 100)}'
+
+
+def _moment(rng, start, end):
+    """Случайный момент между start и end (aware datetime)"""
+    return start + timedelta(seconds=rng.randrange(int((end - start).total_seconds()) or 1))
+
+
+@contextmanager
+def explicit_created_at(*models):
+    """auto_now_add перезаписал бы даты в bulk_create - на время генерации отключаем"""
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными для проверки масштабирования: праздники, '
+        'достижения, отзывы и заявки с правдоподобными датами и слотами, плюс набор '
+        'картинок-заглушек. Результат воспроизводим по --seed. Полные заявки занимают '
+        'слоты без пересечений, поэтому миллионы заявок уходят на годы в прошлое. '
+        'Данные добавляются к существующим; запускайте на отдельной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1, help='Зерно генератора')
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--holidays', type=int, default=10_000)
+        parser.add_argument('--achievements', type=int, default=3_000)
+        parser.add_argument('--reviews', type=int, default=5_000)
+        parser.add_argument('--full-orders', type=int, default=1_000_000)
+        parser.add_argument('--quick-orders', type=int, default=1_000_000)
+        parser.add_argument('--trainings', type=int, default=1_000_000)
+        parser.add_argument('--images', type=int, default=24, help='Сколько картинок-заглушек создать')
+        parser.add_argument('--batch-size', type=int, default=5_000, help='Размер пачки bulk_create')
+
+    def handle(self, *args, **options):
+        self.seed = options['seed']
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+
+        images = self.timed('Картинки', lambda: self.create_images(options['images']))
+        categories = self.timed('Категории', lambda: self.create_categories(options['categories']))
+        if options['holidays'] and not categories:
+            raise CommandError('Для праздников нужна хотя бы одна категория')
+        self.timed('Праздники', lambda: self.insert(
+            Holiday, self.holidays(options['holidays'], categories, images), options['holidays'],
+            ignore_conflicts=True,
+        ))
+        holidays = self.holiday_pools()
+        self.timed('Достижения', lambda: self.insert(
+            Achievement, self.achievements(options['achievements'], images), options['achievements'],
+        ))
+        with explicit_created_at(Review, FullOrder, QuickOrder, TrainingRegistration):
+            self.timed('Отзывы', lambda: self.insert(Review, self.reviews(options['reviews']), options['reviews']))
+            self.timed('Полные заявки', lambda: self.insert(
+                FullOrder, self.full_orders(options['full_orders'], holidays), options['full_orders'],
+                ignore_conflicts=True,
+            ))
+            self.timed('Быстрые заявки', lambda: self.insert(
+                QuickOrder, self.quick_orders(options['quick_orders'], holidays), options['quick_orders'],
+            ))
+            self.timed('Тренировки', lambda: self.insert(
+                TrainingRegistration, self.trainings(options['trainings']), options['trainings'],
+            ))
+
+        # Вставка шла в обход сигналов: пересчитываем производные таблицы и кеши
+        with transaction.atomic():
+            self.timed('Занятость слотов', rebuild_occupancy)
+        ratings.rebuild()
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS('Данные созданы'))
+
+    def timed(self, label, action):
+        started = time.perf_counter()
+        result = action()
+        elapsed = time.perf_counter() - started
+        count = result if isinstance(result, int) else len(result)
+        rate = f', {round(count / elapsed)} строк/с' if elapsed and count else ''
+        self.stdout.write(f'{label}: {count} за {elapsed:.1f} с{rate}')
+        return result
+
+    def rng(self, name):
+        """Свой поток случайных чисел на таблицу: изменение одного объема не меняет остальные"""
+        return random.Random(f'{self.seed}:{name}')
+
+    def insert(self, model, objects, total, ignore_conflicts=False):
+        """bulk_create пачками, коммит каждые TRANSACTION_ROWS строк; возвращает число вставленных"""
+        inserted = 0
+        before = model.objects.count() if ignore_conflicts else 0
+        objects = iter(objects)
+        while inserted < total:
+            chunk_rows = min(TRANSACTION_ROWS, total - inserted)
+            with transaction.atomic():
+                chunk = list(islice(objects, chunk_rows))
+                if not chunk:
+                    break
+                model.objects.bulk_create(chunk, batch_size=self.batch_size, ignore_conflicts=ignore_conflicts)
+            inserted += len(chunk)
+        if ignore_conflicts:
+            # Слоты, уже занятые прежними данными, пропускаются
+            return model.objects.count() - before
+        return inserted
+
+    def create_images(self, count):
+        """Картинки-заглушки: градиент с номером; хранилище по хешу не дублирует их при повторе"""
+        rng = self.rng('images')
+        storage = Holiday._meta.get_field('image').storage
+        names = []
+        for index in range(count):
+            top = tuple(rng.randrange(40, 220) for _ in range(3))
+            bottom = tuple(rng.randrange(40, 220) for _ in range(3))
+            image = Image.new('RGB', PLACEHOLDER_SIZE)
+            draw = ImageDraw.Draw(image)
+            width, height = PLACEHOLDER_SIZE
+            for y in range(height):
+                mix = y / height
+                draw.line(
+                    [(0, y), (width, y)],
+                    fill=tuple(round(a + (b - a) * mix) for a, b in zip(top, bottom)),
+                )
+            draw.text((24, 24), f'#{index + 1}', fill=(255, 255, 255))
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=80)
+            name = storage.save(f'placeholders/{index + 1}.jpg', ContentFile(buffer.getvalue()))
+            generate_renditions(name, storage)
+            names.append(name)
+        return names
+
+    def create_categories(self, count):
+        slugs = [f'gen-category-{index + 1}' for index in range(count)]
+        Category.objects.bulk_create([
+            Category(name=f'{CATEGORY_NAMES[index % len(CATEGORY_NAMES)]} {index + 1}', slug=slug)
+            for index, slug in enumerate(slugs)
+        ], ignore_conflicts=True)
+        return list(Category.objects.filter(slug__in=slugs).values_list('pk', flat=True))
+
+    def holiday_prefix(self):
+        return f'gen-{self.seed}-holiday-'
+
+    def holidays(self, count, categories, images):
+        rng = self.rng('holidays')
+        for index in range(count):
+            min_age = rng.randint(3, 12)
+            theme, style = rng.choice(THEMES), rng.choice(STYLES)
+            yield Holiday(
+                category_id=rng.choice(categories),
+                title=f'{style} «{theme}» №{index + 1}',
+                slug=f'{self.holiday_prefix()}{index + 1}',
+                image=rng.choice(images) if images else '',
+                duration=rng.choice(['2 часа', '2 часа', '4 часа']),
+                description=_text(rng, 4),
+                price=rng.randrange(5_000, 40_000, 500),
+                min_age=min_age,
+                max_age=min_age + rng.randint(2, 8),
+                max_children=rng.choice([8, 10, 12, 15, 20]),
+                active=rng.random() < 0.9,
+            )
+
+    def holiday_pools(self):
+        """id созданных праздников по длительности в часах - для заявок"""
+        pools = {2: [], 4: []}
+        holidays = Holiday.objects.filter(slug__startswith=self.holiday_prefix()).order_by('pk')
+        for pk, duration in holidays.values_list('pk', 'duration'):
+            pools[4 if '4' in duration else 2].append(pk)
+        return pools
+
+    def achievements(self, count, images):
+        rng = self.rng('achievements')
+        today = date.today()
+        places = [place for place, _ in Achievement.PLACE_CHOICES]
+        for index in range(count):
+            yield Achievement(
+                title=f'{rng.choice(["Турнир", "Первенство", "Кубок", "Чемпионат"])} {rng.choice(CITIES)} {index + 1}',
+                description=_text(rng, 2),
+                date=today - timedelta(days=rng.randrange(10 * 365)),
+                image=rng.choice(images) if images and rng.random() < 0.7 else None,
+                place=rng.choices(places, [30, 25, 20, 15, 10])[0],
+                city=rng.choice(CITIES),
+                competition_name=f'{rng.choice(["Открытый", "Городской", "Областной"])} турнир',
+                age_category=rng.choice(['до 10 лет', '10-12 лет', '13-16 лет', '17+']),
+                order=rng.randrange(10),
+            )
+
+    def reviews(self, count):
+        rng = self.rng('reviews')
+        start = self.now - timedelta(days=5 * 365)
+        for _ in range(count):
+            yield Review(
+                name=rng.choice(NAMES),
+                text=_text(rng, rng.randint(1, 4)),
+                rating=rng.choices([5, 4, 3, 2, 1], [60, 25, 8, 4, 3])[0],
+                created_at=_moment(rng, start, self.now),
+                approved=rng.random() < 0.8,
+            )
+
+    def full_orders(self, count, holidays):
+        """
+        Заявки по дням от конца окна бронирования назад: в каждом зале слоты
+        сетки этого дня без пересечений, прошлые дни заняты плотнее будущих.
+        """
+        rng = self.rng('full_orders')
+        config = schedule.get_config()
+        halls, grids = config['halls'], config['grids']
+        if count and not (halls and (holidays[2] or holidays[4])):
+            raise CommandError('Для полных заявок нужны залы, шаблоны слотов и праздники')
+        durations = [hours for hours in (2, 4) if holidays[hours]]
+        today = date.today()
+        day = today + timedelta(days=BOOKING_WINDOW_DAYS)
+        empty_days = 0
+        produced = 0
+        while produced < count:
+            busy = 0.7 if day < today else 0.3
+            day_orders = 0
+            for hall in halls:
+                hour = 0
+                while True:
+                    hours = rng.choice(durations)
+                    grid = grids.get((day.weekday(), hours), [])
+                    slot = next((s for s in grid if s['start'] >= hour), None)
+                    if slot is None:
+                        break
+                    hour = slot['end']
+                    if rng.random() > busy:
+                        continue
+                    created_at = timezone.make_aware(
+                        datetime.combine(day - timedelta(days=rng.randint(1, 30)), datetime.min.time())
+                    ) + timedelta(seconds=rng.randrange(86_400))
+                    yield FullOrder(
+                        holiday_id=rng.choice(holidays[hours]),
+                        full_name=f'{rng.choice(SURNAMES)} {rng.choice(NAMES)}',
+                        phone=_phone(rng),
+                        children_count=rng.randint(3, 20),
+                        age_of_children=str(rng.randint(3, 14)),
+                        notes=_sentence(rng, 6) if rng.random() < 0.3 else '',
+                        selected_date=day,
+                        selected_time=slot['value'],
+                        hall_number=hall,
+                        created_at=min(created_at, self.now),
+                        processed=day < today and rng.random() < 0.95,
+                    )
+                    produced += 1
+                    day_orders += 1
+                    if produced >= count:
+                        return
+            # Год без единого слота - значит, сетка пуста для всех дней недели
+            empty_days = 0 if day_orders else empty_days + 1
+            if empty_days > 365:
+                raise CommandError('В шаблонах слотов нет ни одного слота')
+            day -= timedelta(days=1)
+
+    def quick_orders(self, count, holidays):
+        rng = self.rng('quick_orders')
+        pool = holidays[2] + holidays[4]
+        if count and not pool:
+            raise CommandError('Для быстрых заявок нужны праздники')
+        start = self.now - timedelta(days=3 * 365)
+        processed_before = self.now - timedelta(days=7)
+        for _ in range(count):
+            created_at = _moment(rng, start, self.now)
+            yield QuickOrder(
+                holiday_id=rng.choice(pool),
+                phone=_phone(rng),
+                created_at=created_at,
+                processed=created_at < processed_before and rng.random() < 0.97,
+            )
+
+    def trainings(self, count):
+        rng = self.rng('trainings')
+        groups = [group for group, _ in TrainingRegistration.GROUP_CHOICES]
+        visits = [visit for visit, _ in TrainingRegistration.VISIT_CHOICES]
+        ages = {'under_13': (6, 12), '13_16': (13, 16), 'adult': (17, 40)}
+        start = self.now - timedelta(days=3 * 365)
+        processed_before = self.now - timedelta(days=7)
+        for _ in range(count):
+            group = rng.choice(groups)
+            created_at = _moment(rng, start, self.now)
+            yield TrainingRegistration(
+                parent_name=f'{rng.choice(NAMES)} {rng.choice(SURNAMES)}',
+                phone=_phone(rng),
+                child_name=rng.choice(NAMES),
+                child_age=rng.randint(*ages[group]),
+                age_group=group,
+                visit_type=rng.choices(visits, [60, 25, 15])[0],
+                created_at=created_at,
+                processed=created_at < processed_before and rng.random() < 0.97,
+            )
@@ -0,0 +1,22 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from partizan.occupancy import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает таблицу занятости слотов по заявкам на праздники'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать и прошедшие даты (по умолчанию только с сегодняшнего дня)',
+        )
+
+    def handle(self, *args, **options):
+        start = None if options['all'] else date.today()
+        with transaction.atomic():
+            total = rebuild_occupancy(start)
+        self.stdout.write(self.style.SUCCESS(f'Занятость пересчитана: {total} слотов'))
@@ -0,0 +1,22 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from partizan.spool import status
+
+
+class Command(BaseCommand):
+    help = 'Показывает глубину очереди заявок и задержку переноса в базу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Вывести в JSON')
+
+    def handle(self, *args, **options):
+        result = status()
+        if options['json']:
+            self.stdout.write(json.dumps(result))
+            return
+        self.stdout.write(f"В очереди записей:  {result['depth']}")
+        self.stdout.write(f"Файлов очереди:     {result['segments']}")
+        self.stdout.write(f"Задержка переноса:  {result['lag_seconds']:.1f} с")
+        self.stdout.write(f"Отложено (ошибки):  {result['rejected']}")
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:12
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_occupancy(apps, schema_editor):
+    FullOrder = apps.get_model('partizan', 'FullOrder')
+    SlotOccupancy = apps.get_model('partizan', 'SlotOccupancy')
+    rows = (
+        FullOrder.objects.values_list('selected_date', 'selected_time', 'hall_number')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    SlotOccupancy.objects.bulk_create([
+        SlotOccupancy(date=slot_date, time_slot=time_slot, hall_number=hall_number, bookings=total)
+        for slot_date, time_slot, hall_number, total in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partizan', '0009_delete_holidaydate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('time_slot', models.CharField(max_length=20, verbose_name='Время')),
+                ('hall_number', models.IntegerField(verbose_name='Номер зала')),
+                ('bookings', models.IntegerField(default=0, verbose_name='Количество заявок')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Изменено')),
+            ],
+            options={
+                'verbose_name': 'Занятость слота',
+                'verbose_name_plural': 'Занятость слотов',
+                'constraints': [models.UniqueConstraint(fields=('date', 'time_slot', 'hall_number'), name='slot_occupancy_unique_slot')],
+            },
+        ),
+        migrations.RunPython(fill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:40
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def separate_duplicate_halls(apps, schema_editor):
+    """Разводим по разным залам заявки, занявшие один зал на один слот"""
+    FullOrder = apps.get_model('partizan', 'FullOrder')
+    SlotOccupancy = apps.get_model('partizan', 'SlotOccupancy')
+    changed = False
+    seen = {}
+    for order in FullOrder.objects.order_by('selected_date', 'selected_time', 'created_at', 'id'):
+        key = (order.selected_date, order.selected_time)
+        halls = seen.setdefault(key, set())
+        if order.hall_number in halls:
+            order.hall_number = max(halls) + 1
+            order.save(update_fields=['hall_number'])
+            changed = True
+        halls.add(order.hall_number)
+
+    if changed:
+        # Исторические модели не шлют сигналы, поэтому занятость пересчитываем здесь
+        rows = (
+            FullOrder.objects.values_list('selected_date', 'selected_time', 'hall_number')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        SlotOccupancy.objects.all().delete()
+        SlotOccupancy.objects.bulk_create([
+            SlotOccupancy(date=slot_date, time_slot=time_slot, hall_number=hall_number, bookings=total)
+            for slot_date, time_slot, hall_number, total in rows
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partizan', '0010_slotoccupancy'),
+    ]
+
+    operations = [
+        migrations.RunPython(separate_duplicate_halls, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='fullorder',
+            constraint=models.UniqueConstraint(fields=('selected_date', 'selected_time', 'hall_number'), name='full_order_unique_hall_slot'),
+        ),
+    ]
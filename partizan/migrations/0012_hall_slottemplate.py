@@ -0,0 +1,64 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:05
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def create_default_schedule(apps, schema_editor):
+    """Два зала и прежний режим работы: Пн-Пт 9-21, Сб-Вс 10-22"""
+    Hall = apps.get_model('partizan', 'Hall')
+    SlotTemplate = apps.get_model('partizan', 'SlotTemplate')
+    Hall.objects.bulk_create([Hall(number=1), Hall(number=2)])
+    SlotTemplate.objects.bulk_create([
+        SlotTemplate(
+            weekday=weekday,
+            duration_hours=duration_hours,
+            open_hour=9 if weekday < 5 else 10,
+            close_hour=21 if weekday < 5 else 22,
+        )
+        for weekday in range(7)
+        for duration_hours in (2, 4)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partizan', '0011_fullorder_unique_hall_slot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(unique=True, verbose_name='Номер зала')),
+                ('name', models.CharField(blank=True, max_length=100, verbose_name='Название')),
+                ('active', models.BooleanField(default=True, verbose_name='Активный')),
+            ],
+            options={
+                'verbose_name': 'Зал',
+                'verbose_name_plural': 'Залы',
+                'ordering': ['number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SlotTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.IntegerField(choices=[(0, 'Понедельник'), (1, 'Вторник'), (2, 'Среда'), (3, 'Четверг'), (4, 'Пятница'), (5, 'Суббота'), (6, 'Воскресенье')], verbose_name='День недели')),
+                ('duration_hours', models.IntegerField(choices=[(2, '2 часа'), (4, '4 часа')], verbose_name='Длительность праздника')),
+                ('open_hour', models.IntegerField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(23)], verbose_name='Начало работы (час)')),
+                ('close_hour', models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(24)], verbose_name='Конец работы (час)')),
+                ('step_hours', models.IntegerField(blank=True, help_text='Пусто - слоты идут подряд, шаг равен длительности', null=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Шаг слотов (часов)')),
+                ('active', models.BooleanField(default=True, verbose_name='Активный')),
+            ],
+            options={
+                'verbose_name': 'Шаблон слотов',
+                'verbose_name_plural': 'Шаблоны слотов',
+                'ordering': ['weekday', 'duration_hours'],
+                'constraints': [models.UniqueConstraint(fields=('weekday', 'duration_hours'), name='slot_template_unique_weekday_duration')],
+            },
+        ),
+        migrations.RunPython(create_default_schedule, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:20
+
+import partizan.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partizan', '0012_hall_slottemplate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='achievement',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=partizan.storage.blob_storage, upload_to='achievements/', verbose_name='Фото'),
+        ),
+        migrations.AlterField(
+            model_name='holiday',
+            name='image',
+            field=models.ImageField(storage=partizan.storage.blob_storage, upload_to='holidays/', verbose_name='Фото'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partizan', '0013_blob_storage'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='quickorder',
+            options={'ordering': ['-created_at'], 'verbose_name': 'Быстрая заявка', 'verbose_name_plural': 'Быстрые заявки'},
+        ),
+        migrations.AddIndex(
+            model_name='fullorder',
+            index=models.Index(condition=models.Q(('processed', False)), fields=['-created_at'], name='fullorder_unprocessed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fullorder',
+            index=models.Index(fields=['-created_at'], name='fullorder_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='holiday',
+            index=models.Index(condition=models.Q(('active', True)), fields=['category', 'min_age', 'max_age'], name='holiday_active_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='holiday',
+            index=models.Index(condition=models.Q(('active', True)), fields=['min_age', 'max_age'], name='holiday_active_age_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quickorder',
+            index=models.Index(condition=models.Q(('processed', False)), fields=['-created_at'], name='quickorder_unprocessed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quickorder',
+            index=models.Index(fields=['-created_at'], name='quickorder_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('approved', True)), fields=['-created_at'], name='review_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trainingregistration',
+            index=models.Index(condition=models.Q(('processed', False)), fields=['-created_at'], name='training_unprocessed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trainingregistration',
+            index=models.Index(fields=['-created_at'], name='training_created_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partizan', '0014_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='achievement',
+            index=models.Index(fields=['-date', 'order', 'id'], name='achievement_gallery_idx'),
+        ),
+    ]
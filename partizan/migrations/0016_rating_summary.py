@@ -0,0 +1,51 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:05
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_summary(apps, schema_editor):
+    Review = apps.get_model('partizan', 'Review')
+    RatingSummary = apps.get_model('partizan', 'RatingSummary')
+    counts = dict(
+        Review.objects.filter(approved=True, rating__in=range(1, 6))
+        .values_list('rating')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    fields = {f'rating_{rating}': counts.get(rating, 0) for rating in range(1, 6)}
+    RatingSummary.objects.create(
+        pk=1,
+        count=sum(counts.values()),
+        total=sum(rating * n for rating, n in counts.items()),
+        **fields,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partizan', '0015_achievement_gallery_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество отзывов')),
+                ('total', models.IntegerField(default=0, verbose_name='Сумма оценок')),
+                ('rating_1', models.IntegerField(default=0, verbose_name='Оценок 1')),
+                ('rating_2', models.IntegerField(default=0, verbose_name='Оценок 2')),
+                ('rating_3', models.IntegerField(default=0, verbose_name='Оценок 3')),
+                ('rating_4', models.IntegerField(default=0, verbose_name='Оценок 4')),
+                ('rating_5', models.IntegerField(default=0, verbose_name='Оценок 5')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Изменено')),
+            ],
+            options={
+                'verbose_name': 'Сводка оценок',
+                'verbose_name_plural': 'Сводка оценок',
+            },
+        ),
+        migrations.RunPython(fill_summary, migrations.RunPython.noop),
+    ]
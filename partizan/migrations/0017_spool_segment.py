@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partizan', '0016_rating_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpoolSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Сегмент')),
+                ('records', models.IntegerField(default=0, verbose_name='Записей')),
+                ('drained_at', models.DateTimeField(auto_now_add=True, verbose_name='Перенесен')),
+            ],
+            options={
+                'verbose_name': 'Сегмент очереди',
+                'verbose_name_plural': 'Сегменты очереди',
+                'ordering': ['-drained_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partizan', '0017_spool_segment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTrainingRegistration',
+            fields=[
+                ('parent_name', models.CharField(max_length=200, verbose_name='Имя родителя')),
+                ('phone', models.CharField(max_length=20, verbose_name='Телефон')),
+                ('child_name', models.CharField(max_length=200, verbose_name='Имя ребенка')),
+                ('child_age', models.IntegerField(verbose_name='Возраст ребенка')),
+                ('age_group', models.CharField(choices=[('under_13', 'Дети до 13 лет'), ('13_16', 'Подростки 13-16 лет'), ('adult', 'Взрослые 17+')], max_length=20, verbose_name='Группа')),
+                ('visit_type', models.CharField(choices=[('trial', 'Пробное занятие (бесплатно)'), ('single', 'Разовое посещение (700 ₽)'), ('subscription', 'Абонемент 8 занятий (4 000 ₽)')], default='trial', max_length=20, verbose_name='Тип посещения')),
+                ('processed', models.BooleanField(default=False, verbose_name='Обработано')),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='Дата заявки')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Перенесено в архив')),
+            ],
+            options={
+                'verbose_name': 'Заявка на тренировку (архив)',
+                'verbose_name_plural': 'Архив: заявки на тренировки',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at'], name='archived_training_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedFullOrder',
+            fields=[
+                ('full_name', models.CharField(max_length=200, verbose_name='ФИО')),
+                ('phone', models.CharField(max_length=20, verbose_name='Телефон')),
+                ('children_count', models.IntegerField(verbose_name='Количество детей')),
+                ('age_of_children', models.CharField(max_length=200, verbose_name='Возраст детей')),
+                ('notes', models.TextField(blank=True, verbose_name='Примечания')),
+                ('selected_date', models.DateField(verbose_name='Выбранная дата')),
+                ('selected_time', models.CharField(max_length=20, verbose_name='Выбранное время')),
+                ('hall_number', models.IntegerField(default=1, verbose_name='Номер зала')),
+                ('processed', models.BooleanField(default=False, verbose_name='Обработано')),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='Дата заявки')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Перенесено в архив')),
+                ('holiday', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='partizan.holiday', verbose_name='Праздник')),
+            ],
+            options={
+                'verbose_name': 'Заявка на праздник (архив)',
+                'verbose_name_plural': 'Архив: заявки на праздники',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at'], name='archived_fullorder_idx'), models.Index(fields=['selected_date'], name='archived_fullorder_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedQuickOrder',
+            fields=[
+                ('phone', models.CharField(max_length=20, verbose_name='Телефон')),
+                ('processed', models.BooleanField(default=False, verbose_name='Обработано')),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='Дата')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Перенесено в архив')),
+                ('holiday', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='partizan.holiday', verbose_name='Праздник')),
+            ],
+            options={
+                'verbose_name': 'Быстрая заявка (архив)',
+                'verbose_name_plural': 'Архив: быстрые заявки',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at'], name='archived_quickorder_idx')],
+            },
+        ),
+    ]
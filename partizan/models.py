@@ -1,6 +1,9 @@
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .storage import blob_storage
+
 class Category(models.Model):
     """Категории праздников"""
     name = models.CharField(max_length=100, verbose_name="Название категории")
@@ -20,7 +23,7 @@ class Holiday(models.Model):
                                 related_name='holidays', verbose_name="Категория")
     title = models.CharField(max_length=200, verbose_name="Название праздника")
     slug = models.SlugField(max_length=200, unique=True, verbose_name="URL")
-    image = models.ImageField(upload_to='holidays/', verbose_name="Фото")
+    image = models.ImageField(upload_to='holidays/', storage=blob_storage, verbose_name="Фото")
     duration = models.CharField(max_length=50, verbose_name="Длительность")  # "2 часа" или "4 часа"
     description = models.TextField(verbose_name="Описание")
     price = models.IntegerField(verbose_name="Цена (₽)", default=0)
@@ -32,6 +35,16 @@ class Holiday(models.Model):
     class Meta:
         verbose_name = "Праздник"
         verbose_name_plural = "Праздники"
+        # Булевы фильтры Django пишет как WHERE "active", такой предикат
+        # обслуживает только частичный индекс с тем же условием
+        indexes = [
+            # HolidaysView: активные праздники категории по возрасту
+            models.Index(fields=['category', 'min_age', 'max_age'], condition=models.Q(active=True),
+                         name='holiday_active_category_idx'),
+            # HolidaysView без категории и главная
+            models.Index(fields=['min_age', 'max_age'], condition=models.Q(active=True),
+                         name='holiday_active_age_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -39,13 +52,17 @@ class Holiday(models.Model):
     def is_4_hours(self):
         """Проверяет, длится ли праздник 4 часа"""
         return '4' in self.duration
+    
+    def duration_hours(self):
+        """Длительность праздника в часах (для сетки слотов)"""
+        return 4 if self.is_4_hours() else 2
 
 class Achievement(models.Model):
     """Достижения в спорте"""
     title = models.CharField(max_length=200, verbose_name="Название достижения")
     description = models.TextField(verbose_name="Описание достижения") 
     date = models.DateField(verbose_name="Дата достижения")
-    image = models.ImageField(upload_to='achievements/', verbose_name="Фото", blank=True, null=True)
+    image = models.ImageField(upload_to='achievements/', storage=blob_storage, verbose_name="Фото", blank=True, null=True)
     
     PLACE_CHOICES = [
         (1, '1 место 🥇'),
@@ -87,6 +104,10 @@ class Achievement(models.Model):
         verbose_name = "Достижение"
         verbose_name_plural = "Достижения"
         ordering = ['-date', 'order']
+        indexes = [
+            # Курсор галереи (-date, order, id)
+            models.Index(fields=['-date', 'order', 'id'], name='achievement_gallery_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -126,25 +147,71 @@ class Review(models.Model):
         verbose_name = "Отзыв"
         verbose_name_plural = "Отзывы"
         ordering = ['-created_at']
+        indexes = [
+            # Одобренные отзывы на главной, новые сверху
+            models.Index(fields=['-created_at'], condition=models.Q(approved=True),
+                         name='review_approved_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.rating}/5"
 
-class QuickOrder(models.Model):
-    """Быстрая заявка (только телефон)"""
+class RatingSummary(models.Model):
+    """Сводка оценок одобренных отзывов; одна строка, меняется приращениями"""
+    count = models.IntegerField(default=0, verbose_name="Количество отзывов")
+    total = models.IntegerField(default=0, verbose_name="Сумма оценок")
+    rating_1 = models.IntegerField(default=0, verbose_name="Оценок 1")
+    rating_2 = models.IntegerField(default=0, verbose_name="Оценок 2")
+    rating_3 = models.IntegerField(default=0, verbose_name="Оценок 3")
+    rating_4 = models.IntegerField(default=0, verbose_name="Оценок 4")
+    rating_5 = models.IntegerField(default=0, verbose_name="Оценок 5")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Изменено")
+    
+    class Meta:
+        verbose_name = "Сводка оценок"
+        verbose_name_plural = "Сводка оценок"
+    
+    def __str__(self):
+        return f"{self.average} из {self.count} отзывов"
+    
+    @property
+    def average(self):
+        """Средняя оценка с одним знаком после запятой"""
+        return round(self.total / self.count, 1) if self.count else 0
+    
+    def histogram(self):
+        """Количество оценок по баллам: {5: ..., 4: ..., ..., 1: ...}"""
+        return {rating: getattr(self, f'rating_{rating}') for rating in range(5, 0, -1)}
+
+class QuickOrderBase(models.Model):
+    """Поля быстрой заявки: общие для рабочей таблицы и архива"""
     holiday = models.ForeignKey(Holiday, on_delete=models.CASCADE, verbose_name="Праздник")
     phone = models.CharField(max_length=20, verbose_name="Телефон")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата")
     processed = models.BooleanField(default=False, verbose_name="Обработано")
     
     class Meta:
-        verbose_name = "Быстрая заявка"
-        verbose_name_plural = "Быстрые заявки"
+        abstract = True
     
     def __str__(self):
         return f"{self.holiday.title} - {self.phone}"
 
-class FullOrder(models.Model):
+class QuickOrder(QuickOrderBase):
+    """Быстрая заявка (только телефон)"""
+    
+    class Meta:
+        verbose_name = "Быстрая заявка"
+        verbose_name_plural = "Быстрые заявки"
+        ordering = ['-created_at']
+        indexes = [
+            # Фильтры списка в админке
+            models.Index(fields=['-created_at'], condition=models.Q(processed=False),
+                         name='quickorder_unprocessed_idx'),
+            models.Index(fields=['-created_at'], name='quickorder_created_idx'),
+        ]
+
+class FullOrderBase(models.Model):
+    """Поля заявки на праздник: общие для рабочей таблицы и архива"""
     holiday = models.ForeignKey(Holiday, on_delete=models.CASCADE, verbose_name="Праздник")
     full_name = models.CharField(max_length=200, verbose_name="ФИО")
     phone = models.CharField(max_length=20, verbose_name="Телефон")
@@ -160,16 +227,147 @@ class FullOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата заявки")
     processed = models.BooleanField(default=False, verbose_name="Обработано")
     
+    class Meta:
+        abstract = True
+    
+    def __str__(self):
+        return f"{self.full_name} - {self.holiday.title} - {self.selected_date} {self.selected_time}"
+
+class FullOrder(FullOrderBase):
+    """Заявка на праздник (она же занятый слот)"""
+    
     class Meta:
         verbose_name = "Заявка на праздник"
         verbose_name_plural = "Заявки на праздники"
         ordering = ['-created_at']
-    
+        constraints = [
+            # Индекс ограничения обслуживает и поиск заявок слота по (дата, время)
+            models.UniqueConstraint(
+                fields=['selected_date', 'selected_time', 'hall_number'],
+                name='full_order_unique_hall_slot'
+            ),
+        ]
+        indexes = [
+            # Фильтры списка в админке
+            models.Index(fields=['-created_at'], condition=models.Q(processed=False),
+                         name='fullorder_unprocessed_idx'),
+            models.Index(fields=['-created_at'], name='fullorder_created_idx'),
+        ]
+
+class Hall(models.Model):
+    """Залы для праздников"""
+    number = models.PositiveIntegerField(unique=True, verbose_name="Номер зала")
+    name = models.CharField(max_length=100, verbose_name="Название", blank=True)
+    active = models.BooleanField(default=True, verbose_name="Активный")
+
+    class Meta:
+        verbose_name = "Зал"
+        verbose_name_plural = "Залы"
+        ordering = ['number']
+
     def __str__(self):
-        return f"{self.full_name} - {self.holiday.title} - {self.selected_date} {self.selected_time}"
+        return self.name or f"Зал {self.number}"
 
-class TrainingRegistration(models.Model):
-    """Заявки на тренировки"""
+class SlotTemplate(models.Model):
+    """Шаблон сетки слотов: режим работы для дня недели и длительности праздника"""
+    WEEKDAY_CHOICES = [
+        (0, 'Понедельник'),
+        (1, 'Вторник'),
+        (2, 'Среда'),
+        (3, 'Четверг'),
+        (4, 'Пятница'),
+        (5, 'Суббота'),
+        (6, 'Воскресенье'),
+    ]
+
+    DURATION_CHOICES = [
+        (2, '2 часа'),
+        (4, '4 часа'),
+    ]
+
+    weekday = models.IntegerField(choices=WEEKDAY_CHOICES, verbose_name="День недели")
+    duration_hours = models.IntegerField(choices=DURATION_CHOICES, verbose_name="Длительность праздника")
+    open_hour = models.IntegerField(
+        validators=[MinValueValidator(0), MaxValueValidator(23)],
+        verbose_name="Начало работы (час)"
+    )
+    close_hour = models.IntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(24)],
+        verbose_name="Конец работы (час)"
+    )
+    step_hours = models.IntegerField(
+        validators=[MinValueValidator(1)],
+        verbose_name="Шаг слотов (часов)",
+        blank=True,
+        null=True,
+        help_text="Пусто - слоты идут подряд, шаг равен длительности"
+    )
+    active = models.BooleanField(default=True, verbose_name="Активный")
+
+    class Meta:
+        verbose_name = "Шаблон слотов"
+        verbose_name_plural = "Шаблоны слотов"
+        ordering = ['weekday', 'duration_hours']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['weekday', 'duration_hours'],
+                name='slot_template_unique_weekday_duration'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_weekday_display()}, {self.get_duration_hours_display()}: {self.open_hour}:00-{self.close_hour}:00"
+
+    def clean(self):
+        if self.open_hour is not None and self.close_hour is not None and self.duration_hours:
+            if self.open_hour + self.duration_hours > self.close_hour:
+                raise ValidationError("В режим работы не помещается ни одного слота")
+
+    def slot_hours(self):
+        """Интервалы (начало, конец) слотов по шаблону"""
+        step = self.step_hours or self.duration_hours
+        return [
+            (start, start + self.duration_hours)
+            for start in range(self.open_hour, self.close_hour - self.duration_hours + 1, step)
+        ]
+
+class SlotOccupancy(models.Model):
+    """Занятость слота (дата, время, зал), поддерживается сигналами FullOrder"""
+    date = models.DateField(verbose_name="Дата")
+    time_slot = models.CharField(max_length=20, verbose_name="Время")
+    hall_number = models.IntegerField(verbose_name="Номер зала")
+    bookings = models.IntegerField(default=0, verbose_name="Количество заявок")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Изменено")
+
+    class Meta:
+        verbose_name = "Занятость слота"
+        verbose_name_plural = "Занятость слотов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'time_slot', 'hall_number'],
+                name='slot_occupancy_unique_slot'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.time_slot} зал {self.hall_number}: {self.bookings}"
+
+class SpoolSegment(models.Model):
+    """Журнал перенесенных в базу сегментов очереди заявок (см. partizan.spool)"""
+    name = models.CharField(max_length=100, unique=True, verbose_name="Сегмент")
+    records = models.IntegerField(default=0, verbose_name="Записей")
+    drained_at = models.DateTimeField(auto_now_add=True, verbose_name="Перенесен")
+
+    class Meta:
+        verbose_name = "Сегмент очереди"
+        verbose_name_plural = "Сегменты очереди"
+        ordering = ['-drained_at']
+
+    def __str__(self):
+        return f"{self.name}: {self.records}"
+
+class TrainingRegistrationBase(models.Model):
+    """Поля заявки на тренировку: общие для рабочей таблицы и архива"""
     GROUP_CHOICES = [
         ('under_13', 'Дети до 13 лет'),
         ('13_16', 'Подростки 13-16 лет'),
@@ -191,10 +389,66 @@ class TrainingRegistration(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата заявки")
     processed = models.BooleanField(default=False, verbose_name="Обработано")
     
+    class Meta:
+        abstract = True
+    
+    def __str__(self):
+        return f"{self.parent_name} - {self.child_name}"
+
+class TrainingRegistration(TrainingRegistrationBase):
+    """Заявки на тренировки"""
+    
     class Meta:
         verbose_name = "Заявка на тренировку"
         verbose_name_plural = "Заявки на тренировки"
         ordering = ['-created_at']
+        indexes = [
+            # Фильтры списка в админке
+            models.Index(fields=['-created_at'], condition=models.Q(processed=False),
+                         name='training_unprocessed_idx'),
+            models.Index(fields=['-created_at'], name='training_created_idx'),
+        ]
+
+
+# Архив (см. partizan.archive): те же поля, исходный id и дата заявки,
+# плюс время переноса. Записи только читаются в админке.
+
+class ArchivedQuickOrder(QuickOrderBase):
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID")
+    created_at = models.DateTimeField(verbose_name="Дата")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Перенесено в архив")
     
-    def __str__(self):
-        return f"{self.parent_name} - {self.child_name}"
\ No newline at end of file
+    class Meta:
+        verbose_name = "Быстрая заявка (архив)"
+        verbose_name_plural = "Архив: быстрые заявки"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='archived_quickorder_idx'),
+        ]
+
+class ArchivedFullOrder(FullOrderBase):
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID")
+    created_at = models.DateTimeField(verbose_name="Дата заявки")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Перенесено в архив")
+    
+    class Meta:
+        verbose_name = "Заявка на праздник (архив)"
+        verbose_name_plural = "Архив: заявки на праздники"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='archived_fullorder_idx'),
+            models.Index(fields=['selected_date'], name='archived_fullorder_date_idx'),
+        ]
+
+class ArchivedTrainingRegistration(TrainingRegistrationBase):
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID")
+    created_at = models.DateTimeField(verbose_name="Дата заявки")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Перенесено в архив")
+    
+    class Meta:
+        verbose_name = "Заявка на тренировку (архив)"
+        verbose_name_plural = "Архив: заявки на тренировки"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='archived_training_idx'),
+        ]
\ No newline at end of file
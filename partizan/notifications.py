@@ -0,0 +1,305 @@
+"""
+Уведомления персонала о новых заявках.
+
+Запрос только кладет (модель, id) в очередь процесса и сразу отвечает.
+Фоновый поток собирает всплеск заявок за COALESCE_SECONDS в одну пачку,
+одним запросом на модель читает их из базы и передает пачку каналам.
+У каждого канала (почта, вебхук, файл) свой поток и своя очередь: медленный
+или недоступный канал повторяет отправку с растущей паузой и не задерживает
+ни другие каналы, ни запросы. Пока канал ждет повтора, новые пачки
+присоединяются к неотправленной.
+
+Каналы задаются в settings.PARTIZAN_NOTIFY_SINKS, как бэкенды кеша:
+[{'BACKEND': 'partizan.notifications.FileSink', 'OPTIONS': {'path': ...}}].
+Пустой список отключает уведомления.
+"""
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import FullOrder, QuickOrder, TrainingRegistration
+
+# Какие заявки отправляются персоналу
+NOTIFY_MODELS = {
+    'quickorder': QuickOrder,
+    'fullorder': FullOrder,
+    'trainingregistration': TrainingRegistration,
+}
+
+# Сколько ждать остальные заявки всплеска после первой
+COALESCE_SECONDS = 2.0
+BATCH_SIZE = 50
+# Сколько событий может ждать в очереди процесса; лишние отбрасываются
+QUEUE_SIZE = 1000
+
+MAX_ATTEMPTS = 6
+RETRY_BACKOFF = 2.0
+MAX_BACKOFF = 60.0
+
+
+def _describe(model_name, obj):
+    if model_name == 'quickorder':
+        return 'Быстрая заявка', f'{obj.holiday.title}, тел. {obj.phone}'
+    if model_name == 'fullorder':
+        return 'Заявка на праздник', (
+            f'{obj.holiday.title}, {obj.selected_date:%d.%m.%Y} {obj.selected_time}, '
+            f'зал {obj.hall_number}: {obj.full_name}, тел. {obj.phone}, детей {obj.children_count}'
+        )
+    return 'Заявка на тренировку', (
+        f'{obj.get_age_group_display()}, {obj.get_visit_type_display()}: '
+        f'{obj.child_name} ({obj.child_age}), {obj.parent_name}, тел. {obj.phone}'
+    )
+
+
+def build_events(keys):
+    """События пачки по ключам (модель, id): один запрос на модель, удаленные пропускаются"""
+    ids = defaultdict(list)
+    for model_name, pk in keys:
+        ids[model_name].append(pk)
+
+    events = []
+    for model_name, pks in ids.items():
+        queryset = NOTIFY_MODELS[model_name].objects.filter(pk__in=pks)
+        if model_name != 'trainingregistration':
+            queryset = queryset.select_related('holiday')
+        for obj in queryset.order_by('created_at', 'pk'):
+            title, text = _describe(model_name, obj)
+            events.append({
+                'kind': model_name,
+                'id': obj.pk,
+                'title': title,
+                'text': text,
+                'admin_url': reverse(f'admin:partizan_{model_name}_change', args=[obj.pk]),
+                'created_at': obj.created_at,
+            })
+    events.sort(key=lambda event: event['created_at'])
+    return events
+
+
+def format_subject(events):
+    if len(events) == 1:
+        return f'Новая заявка: {events[0]["title"].lower()}'
+    return f'Новые заявки: {len(events)}'
+
+
+def format_body(events):
+    return '\n\n'.join(
+        f'{event["title"]} от {timezone.localtime(event["created_at"]):%d.%m.%Y %H:%M}\n'
+        f'{event["text"]}\n{event["admin_url"]}'
+        for event in events
+    )
+
+
+class SmtpSink:
+    """Письмо на адреса персонала через настроенный EMAIL_BACKEND"""
+
+    def __init__(self, recipients, from_email=None):
+        self.recipients = list(recipients)
+        self.from_email = from_email
+
+    def send(self, events):
+        send_mail(
+            format_subject(events), format_body(events), self.from_email, self.recipients,
+            fail_silently=False,
+        )
+
+
+class WebhookSink:
+    """POST пачки в JSON на адрес бота или интеграции"""
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, events):
+        data = json.dumps(
+            {'subject': format_subject(events), 'events': events},
+            cls=DjangoJSONEncoder, ensure_ascii=False,
+        ).encode('utf-8')
+        request = urllib.request.Request(
+            self.url, data=data, headers={'Content-Type': 'application/json'}, method='POST',
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class FileSink:
+    """Строка JSON на пачку в локальном файле"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, events):
+        line = json.dumps(
+            {'sent_at': timezone.now(), 'subject': format_subject(events), 'events': events},
+            cls=DjangoJSONEncoder, ensure_ascii=False,
+        )
+        with open(self.path, 'a', encoding='utf-8') as log:
+            log.write(line + '\n')
+
+
+class FakeSink:
+    """Канал для тестов и разработки: хранит пачки в памяти, может отказывать"""
+
+    def __init__(self, fail_times=0, delay=0.0):
+        self.fail_times = fail_times
+        self.delay = delay
+        self.attempts = 0
+        self.batches = []
+
+    def send(self, events):
+        self.attempts += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise OSError('Канал недоступен')
+        self.batches.append(list(events))
+
+
+def load_sinks(config=None):
+    config = settings.PARTIZAN_NOTIFY_SINKS if config is None else config
+    return [import_string(entry['BACKEND'])(**entry.get('OPTIONS', {})) for entry in config]
+
+
+def deliver(sink, events, attempts=MAX_ATTEMPTS, backoff=RETRY_BACKOFF, pending=None):
+    """
+    Отправляет пачку с повторами; True при успехе.
+    pending - очередь канала: пачки, пришедшие во время паузы, объединяются
+    с неотправленной, чтобы после восстановления ушло одно сообщение.
+    """
+    for attempt in range(attempts):
+        if pending is not None:
+            events = events + [event for batch in _drain(pending) for event in batch]
+        try:
+            sink.send(events)
+            return True
+        except Exception as e:
+            print(f"Не удалось отправить уведомление ({type(sink).__name__}): {e}")
+            if attempt + 1 < attempts:
+                time.sleep(min(backoff * 2 ** attempt, MAX_BACKOFF))
+    print(f"Уведомление о {len(events)} заявках отброшено ({type(sink).__name__})")
+    return False
+
+
+def _drain(source):
+    items = []
+    while True:
+        try:
+            items.append(source.get_nowait())
+        except queue.Empty:
+            return items
+
+
+class _SinkWorker:
+    """Поток одного канала со своей очередью пачек"""
+
+    def __init__(self, sink, backoff):
+        self.sink = sink
+        self.backoff = backoff
+        self.batches = queue.Queue()
+        threading.Thread(target=self._run, name='partizan-notify-sink', daemon=True).start()
+
+    def _run(self):
+        while True:
+            events = self.batches.get()
+            deliver(self.sink, events, backoff=self.backoff, pending=self.batches)
+
+
+class Dispatcher:
+    """Очередь событий процесса и поток, собирающий их в пачки"""
+
+    def __init__(self, sinks=None, coalesce=COALESCE_SECONDS, backoff=RETRY_BACKOFF):
+        self.coalesce = coalesce
+        self.backoff = backoff
+        self._events = queue.Queue(maxsize=QUEUE_SIZE)
+        # None - каналы из настроек при первом обращении
+        self._sinks = sinks
+        self._workers = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def sinks(self):
+        if self._sinks is None:
+            self._sinks = load_sinks()
+        return self._sinks
+
+    def notify(self, instance):
+        """Ставит новую заявку в очередь; не ждет ни базы, ни каналов"""
+        model_name = instance._meta.model_name
+        if model_name not in NOTIFY_MODELS or not self.sinks:
+            return
+        try:
+            self._events.put_nowait((model_name, instance.pk))
+        except queue.Full:
+            print(f"Очередь уведомлений переполнена, заявка {model_name} #{instance.pk} без уведомления")
+            return
+        if settings.PARTIZAN_NOTIFY_WORKER:
+            self._ensure_started()
+
+    def _collect(self, first):
+        """Ключи пачки без повторов: первое событие и все, что пришло за окно"""
+        keys = {first: None}
+        deadline = time.monotonic() + self.coalesce
+        while len(keys) < BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                keys[self._events.get(timeout=timeout)] = None
+            except queue.Empty:
+                break
+        return list(keys)
+
+    def flush(self):
+        """Синхронно отправляет все накопленное; для тестов и режима без потока"""
+        keys = list(dict.fromkeys(_drain(self._events)))
+        if not keys:
+            return []
+        events = build_events(keys)
+        if events:
+            for sink in self.sinks:
+                deliver(sink, events, backoff=self.backoff)
+        return events
+
+    def _ensure_started(self):
+        with self._lock:
+            # После fork потоков в дочернем процессе нет - запускаем заново
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._workers = [_SinkWorker(sink, self.backoff) for sink in self.sinks]
+            self._thread = threading.Thread(target=self._run, name='partizan-notify', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            keys = self._collect(self._events.get())
+            try:
+                events = build_events(keys)
+            except Exception as e:
+                print(f"Ошибка подготовки уведомлений: {e}")
+                continue
+            finally:
+                close_old_connections()
+            if events:
+                for worker in self._workers:
+                    worker.batches.put(events)
+
+
+dispatcher = Dispatcher()
+notify = dispatcher.notify
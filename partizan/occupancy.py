@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+from django.db.models import Count, Max, Sum
+
+from .models import FullOrder, SlotOccupancy
+
+# Сколько дней вперед показывает календарь бронирования
+BOOKING_WINDOW_DAYS = 14
+REBUILD_BATCH_SIZE = 5000
+
+
+def booking_window(start=None):
+    """Возвращает (первый, последний) день окна календаря"""
+    start = start or date.today()
+    return start, start + timedelta(days=BOOKING_WINDOW_DAYS)
+
+
+def refresh_slot(slot_date, time_slot):
+    """Пересчитывает занятость одного слота по таблице заявок"""
+    counts = dict(
+        FullOrder.objects.filter(selected_date=slot_date, selected_time=time_slot)
+        .values_list('hall_number')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    existing = SlotOccupancy.objects.filter(date=slot_date, time_slot=time_slot)
+    halls = set(counts) | set(existing.values_list('hall_number', flat=True))
+
+    # Нулевые строки не удаляем: их updated_at нужен, чтобы отследить отмену брони
+    for hall_number in halls:
+        SlotOccupancy.objects.update_or_create(
+            date=slot_date,
+            time_slot=time_slot,
+            hall_number=hall_number,
+            defaults={'bookings': counts.get(hall_number, 0)},
+        )
+
+
+def rebuild_occupancy(start=None):
+    """Полностью перестраивает таблицу занятости (начиная с даты start)"""
+    orders = FullOrder.objects.all()
+    occupancy = SlotOccupancy.objects.all()
+    if start:
+        orders = orders.filter(selected_date__gte=start)
+        occupancy = occupancy.filter(date__gte=start)
+
+    rows = (
+        orders.values_list('selected_date', 'selected_time', 'hall_number')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    occupancy.delete()
+    # Пачками по мере чтения: после generate_data слотов миллионы
+    total_slots = 0
+    batch = []
+    for slot_date, time_slot, hall_number, total in rows.iterator(chunk_size=REBUILD_BATCH_SIZE):
+        batch.append(SlotOccupancy(date=slot_date, time_slot=time_slot, hall_number=hall_number, bookings=total))
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            SlotOccupancy.objects.bulk_create(batch, batch_size=500)
+            total_slots += len(batch)
+            batch = []
+    SlotOccupancy.objects.bulk_create(batch, batch_size=500)
+    return total_slots + len(batch)
+
+
+def get_booked_slots(start=None, end=None):
+    """Занятость по датам окна: {'YYYY-MM-DD': {'13:00-15:00': 2, ...}}, сгруппированная в SQL"""
+    if start is None or end is None:
+        start, end = booking_window(start)
+
+    rows = (
+        SlotOccupancy.objects.filter(date__gte=start, date__lte=end, bookings__gt=0)
+        .values_list('date', 'time_slot')
+        .annotate(total=Sum('bookings'))
+        .order_by('date', 'time_slot')
+    )
+    booked = {}
+    for slot_date, time_slot, total in rows:
+        booked.setdefault(slot_date.isoformat(), {})[time_slot] = total
+    return booked
+
+
+def last_booking_change(start, end):
+    """Время последнего изменения занятости в окне (или None)"""
+    return SlotOccupancy.objects.filter(
+        date__gte=start, date__lte=end
+    ).aggregate(changed=Max('updated_at'))['changed']
@@ -0,0 +1,99 @@
+"""
+Кеш целых страниц для анонимных посетителей.
+
+Ключ страницы: путь, номер поколения этого пути, текущая дата и
+нормализованный параметр ?age=. Сброс точечный: purge(path) повышает
+поколение одного пути, и все его варианты по возрасту перестают читаться.
+Какие пути сбрасывать при изменении моделей, решают сигналы.
+
+Токен CSRF в сохраненной странице заменяется заглушкой и при выдаче
+подставляется заново для каждого посетителя. Дата в ключе нужна потому,
+что страница праздника несет окно бронирования; сама занятость в страницу
+не попадает - скрипт берет ее из API доступности.
+"""
+import re
+from datetime import date
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+GENERATION_KEY = 'partizan:page:{path}:generation'
+PAGE_KEY = 'partizan:page:{path}:{generation}:{day}:{age}'
+
+PAGE_TIMEOUT = 60 * 60
+
+CSRF_PLACEHOLDER = '__partizan_csrf_token__'
+_CSRF_INPUT = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def normalize_age(value):
+    """?age= влияет на выдачу только числом, остальное равно его отсутствию"""
+    if value and value.isdigit():
+        return str(int(value))
+    return ''
+
+
+def _generation(path):
+    return cache.get_or_set(GENERATION_KEY.format(path=path), 1, None)
+
+
+def page_key(path, age=''):
+    return PAGE_KEY.format(
+        path=path, generation=_generation(path), day=date.today().isoformat(), age=age,
+    )
+
+
+def purge(*paths):
+    """Сбрасывает кеш страниц по путям вместе со всеми вариантами ?age="""
+    for path in paths:
+        key = GENERATION_KEY.format(path=path)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 2, None)
+
+
+def _cacheable_request(request):
+    if request.method != 'GET' or request.user.is_authenticated:
+        return False
+    # Другие параметры запроса страницы не учитывают в ключе - такие запросы не кешируем
+    return set(request.GET) <= {'age'}
+
+
+def _build_response(content, content_type, request, state):
+    content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Page-Cache'] = state
+    return response
+
+
+def cache_anonymous_page(view):
+    """Отдает сохраненную страницу анонимным GET-запросам, иначе вызывает view"""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable_request(request):
+            return view(request, *args, **kwargs)
+
+        key = page_key(request.path, normalize_age(request.GET.get('age')))
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return _build_response(content, content_type, request, 'hit')
+
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        if response.status_code != 200 or response.streaming:
+            return response
+
+        content = response.content.decode(response.charset)
+        content = _CSRF_INPUT.sub(rf'\g<1>{CSRF_PLACEHOLDER}\g<2>', content)
+        content_type = response['Content-Type']
+        cache.set(key, (content, content_type), PAGE_TIMEOUT)
+        response['X-Page-Cache'] = 'miss'
+        return response
+
+    return wrapper
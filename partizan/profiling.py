@@ -0,0 +1,118 @@
+"""
+Профиль одного запроса в процессе: SQL, время базы, рендер шаблонов, память.
+
+    with profile() as result:
+        client.get('/holiday/pirates/')
+    result.query_count, result.db_ms, result.render_ms, result.peak_kb
+
+Запросы перехватываются execute_wrapper (BEGIN, SAVEPOINT и т.п. входят
+только во время базы), время рендера - обертка над Template.render
+(вложенные include не считаются дважды), память - пик tracemalloc за время
+блока. full_scans() проверяет план каждого SELECT и находит полные проходы
+по таблицам.
+"""
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.db import connection
+from django.template.base import Template
+
+# SCAN без USING ... INDEX - полный проход по таблице (план SQLite)
+FULL_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING)')
+# Управление транзакциями в число запросов не входит: в TestCase atomic()
+# дает SAVEPOINT вместо BEGIN, и бюджеты иначе зависели бы от обертки теста
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = []
+        self.db_ms = 0.0
+        self.render_ms = 0.0
+        self.total_ms = 0.0
+        self.peak_kb = 0.0
+        self._render_depth = 0
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    def as_dict(self):
+        return {
+            'queries': self.query_count,
+            'db_ms': round(self.db_ms, 2),
+            'render_ms': round(self.render_ms, 2),
+            'total_ms': round(self.total_ms, 2),
+            'peak_kb': round(self.peak_kb, 1),
+        }
+
+    def _execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - started) * 1000
+            if not sql.lstrip().upper().startswith(TRANSACTION_CONTROL):
+                self.queries.append((sql, params))
+
+
+@contextmanager
+def _timed_render(result):
+    original = Template.render
+
+    def render(template, context):
+        # Считаем только внешний рендер: include вызывает render изнутри
+        result._render_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(template, context)
+        finally:
+            result._render_depth -= 1
+            if not result._render_depth:
+                result.render_ms += (time.perf_counter() - started) * 1000
+
+    Template.render = render
+    try:
+        yield
+    finally:
+        Template.render = original
+
+
+@contextmanager
+def profile(trace_memory=True):
+    result = RequestProfile()
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    elif trace_memory:
+        tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(result._execute), _timed_render(result):
+            yield result
+    finally:
+        result.total_ms = (time.perf_counter() - started) * 1000
+        if trace_memory:
+            result.peak_kb = (tracemalloc.get_traced_memory()[1] - baseline) / 1024
+        if tracing:
+            tracemalloc.stop()
+
+
+def full_scans(queries, allowed=()):
+    """Таблицы, которые SELECT-ы проходят целиком (только SQLite); allowed - справочники"""
+    if connection.vendor != 'sqlite':
+        return []
+    scans = []
+    with connection.cursor() as cursor:
+        for sql, params in queries:
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params or ())
+            plan = '\n'.join(str(row[-1]) for row in cursor.fetchall())
+            scans.extend(
+                (table, sql) for table in FULL_SCAN.findall(plan) if table not in allowed
+            )
+    return scans
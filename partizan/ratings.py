@@ -0,0 +1,69 @@
+"""
+Сводка оценок отзывов без пересчета по всей таблице.
+
+Строка RatingSummary меняется приращениями через F(): сигналы Review
+учитывают создание, правку и удаление одобренных отзывов, а действие
+админки approve_reviews - массовое одобрение через update().
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import RatingSummary, Review
+
+SUMMARY_ID = 1
+RATINGS = range(1, 6)
+
+
+def apply_deltas(deltas):
+    """deltas: {оценка: изменение числа одобренных отзывов с этой оценкой}"""
+    # Оценки вне 1-5 в сводку не попадают (валидаторы формы их и так не пропустят)
+    deltas = {rating: delta for rating, delta in deltas.items() if delta and rating in RATINGS}
+    if not deltas:
+        return
+    updates = {
+        f'rating_{rating}': F(f'rating_{rating}') + delta
+        for rating, delta in deltas.items()
+    }
+    updates['count'] = F('count') + sum(deltas.values())
+    updates['total'] = F('total') + sum(rating * delta for rating, delta in deltas.items())
+    with transaction.atomic():
+        if not RatingSummary.objects.filter(pk=SUMMARY_ID).update(**updates):
+            # Строки еще нет: считаем ее целиком, изменение уже учтено в таблице
+            rebuild()
+
+
+def approve_reviews(queryset):
+    """Одобряет отзывы и добавляет в сводку только те, что не были одобрены"""
+    with transaction.atomic():
+        pending = queryset.select_for_update().filter(approved=False)
+        ids = list(pending.values_list('pk', flat=True))
+        deltas = dict(
+            Review.objects.filter(pk__in=ids)
+            .values_list('rating')
+            .annotate(n=Count('pk'))
+            .order_by()
+        )
+        updated = Review.objects.filter(pk__in=ids).update(approved=True)
+        apply_deltas(deltas)
+    return updated
+
+
+def rebuild():
+    """Пересчитывает сводку по таблице (миграция, восстановление после сбоя)"""
+    counts = Counter(dict(
+        Review.objects.filter(approved=True, rating__in=RATINGS)
+        .values_list('rating')
+        .annotate(n=Count('pk'))
+        .order_by()
+    ))
+    fields = {f'rating_{rating}': counts[rating] for rating in RATINGS}
+    fields['count'] = sum(counts.values())
+    fields['total'] = sum(rating * n for rating, n in counts.items())
+    RatingSummary.objects.update_or_create(pk=SUMMARY_ID, defaults=fields)
+
+
+def get_summary():
+    summary = RatingSummary.objects.filter(pk=SUMMARY_ID).first()
+    return summary or RatingSummary(pk=SUMMARY_ID)
@@ -0,0 +1,51 @@
+"""
+Одобренные отзывы страницами по ключу (-created_at, -id).
+
+Главная показывает первую страницу, остальные слайдер догружает через
+API по курсору последнего показанного отзыва.
+"""
+import hashlib
+from datetime import datetime
+
+from django.db.models import Q
+
+from . import content_cache
+from .models import Review
+
+PAGE_SIZE = 10
+
+
+def encode_cursor(review):
+    return f'{review.created_at.isoformat()}_{review.pk}'
+
+
+def decode_cursor(value):
+    """Курсор 'дата-время ISO_id' -> (datetime, id); None для пустого или битого"""
+    if not value:
+        return None
+    try:
+        created_at, pk = value.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except ValueError:
+        return None
+
+
+def _build_page(cursor, size):
+    queryset = Review.objects.filter(approved=True).order_by('-created_at', '-id')
+    if cursor is not None:
+        created_at, pk = cursor
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return queryset[:size + 1]
+
+
+def reviews_page(cursor=None, size=PAGE_SIZE):
+    """Страница отзывов и курсор следующей (None, если это последняя)"""
+    params = f'{cursor}:{size}'
+    rows = content_cache.cached_query(
+        'reviews:' + hashlib.md5(params.encode()).hexdigest(),
+        [content_cache.REVIEWS],
+        lambda: _build_page(cursor, size),
+    )
+    items = rows[:size]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > size else None
+    return items, next_cursor
@@ -0,0 +1,70 @@
+"""
+Конфигурация залов и сетки слотов.
+
+Сетка строится из моделей Hall и SlotTemplate один раз и хранится в кеше
+под версионированным ключом. Сигналы этих моделей повышают версию, так что
+сетка пересобирается только после изменения настроек в админке.
+"""
+from django.core.cache import cache
+
+from .models import Hall, SlotTemplate
+
+VERSION_KEY = 'partizan:schedule:version'
+CONFIG_KEY = 'partizan:schedule:config:{version}'
+
+
+def format_slot(start_hour, end_hour):
+    return f"{start_hour}:00-{end_hour}:00"
+
+
+def format_label(start_hour, end_hour):
+    return f"{start_hour}:00 - {end_hour}:00"
+
+
+def _build_config():
+    halls = tuple(Hall.objects.filter(active=True).values_list('number', flat=True))
+    grids = {}
+    for template in SlotTemplate.objects.filter(active=True):
+        grids[(template.weekday, template.duration_hours)] = [
+            {
+                'value': format_slot(start, end),
+                'label': format_label(start, end),
+                'start': start,
+                'end': end,
+            }
+            for start, end in template.slot_hours()
+        ]
+    return {'halls': halls, 'grids': grids}
+
+
+def version():
+    """Текущая версия настроек залов и слотов"""
+    return cache.get_or_set(VERSION_KEY, 1, None)
+
+
+def get_config():
+    """Залы и сетки слотов по (день недели, длительность) из кеша"""
+    key = CONFIG_KEY.format(version=version())
+    config = cache.get(key)
+    if config is None:
+        config = _build_config()
+        cache.set(key, config, None)
+    return config
+
+
+def invalidate():
+    """Сбрасывает сетку после изменения залов или шаблонов"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+def hall_numbers():
+    return get_config()['halls']
+
+
+def slot_grid(slot_date, duration_hours):
+    """Слоты дня для праздника заданной длительности"""
+    return get_config()['grids'].get((slot_date.weekday(), duration_hours), [])
+
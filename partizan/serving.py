@@ -0,0 +1,84 @@
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import serve
+
+# Год - максимум, который имеет смысл указывать в max-age
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def serve_immutable(request, path, document_root=None):
+    """Отдает файл, имя которого меняется вместе с содержимым, с бессрочным кешем"""
+    response = serve(request, path, document_root=document_root)
+    if response.status_code == 200:
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
+
+
+# Порядок предпочтения заранее сжатых копий статики
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+_HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+
+
+def _accepted_encodings(request):
+    """Кодировки из Accept-Encoding, кроме явно запрещенных через q=0"""
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.partition(';')
+        params = params.strip()
+        quality = 1.0
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve_static(request, path, document_root=None):
+    """
+    Отдает собранную статику, выбирая .br/.gz копию по Accept-Encoding.
+    Файлы с хешем в имени кешируются бессрочно, остальные браузер
+    перепроверяет по ETag/Last-Modified и получает 304 без тела.
+    """
+    document_root = document_root or settings.STATIC_ROOT
+    path = posixpath.normpath(path).lstrip('/')
+    fullpath = Path(safe_join(document_root, path))
+    if not fullpath.is_file():
+        raise Http404('Файл не найден')
+
+    content_type, _ = mimetypes.guess_type(str(fullpath))
+    encoding = None
+    accepted = _accepted_encodings(request)
+    for coding, suffix in PRECOMPRESSED_ENCODINGS:
+        variant = fullpath.with_name(fullpath.name + suffix)
+        if coding in accepted and variant.is_file():
+            fullpath, encoding = variant, coding
+            break
+
+    # Валидаторы своей копии: у .br и .gz разные байты, значит и ETag
+    stat = fullpath.stat()
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = FileResponse(fullpath.open('rb'), content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if _HASHED_NAME.search(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
@@ -0,0 +1,210 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.urls import reverse
+
+from . import content_cache, images, notifications, page_cache, ratings, schedule
+from .feed import publish_slot_change
+from .models import (
+    Achievement, Category, FullOrder, Hall, Holiday, QuickOrder, Review, SlotTemplate,
+    TrainingRegistration,
+)
+from .occupancy import refresh_slot
+
+
+@receiver(pre_save, sender=FullOrder)
+def remember_previous_slot(sender, instance, **kwargs):
+    """Запоминаем прежний слот, чтобы освободить его при редактировании заявки"""
+    instance._previous_slot = None
+    if instance.pk:
+        instance._previous_slot = (
+            FullOrder.objects.filter(pk=instance.pk)
+            .values_list('selected_date', 'selected_time')
+            .first()
+        )
+
+
+@receiver(post_save, sender=FullOrder)
+def update_occupancy_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.selected_date, instance.selected_time)
+    previous = getattr(instance, '_previous_slot', None)
+    if previous and previous != current:
+        refresh_slot(*previous)
+        transaction.on_commit(lambda: publish_slot_change(*previous))
+    refresh_slot(*current)
+    transaction.on_commit(lambda: publish_slot_change(*current))
+
+
+@receiver(post_delete, sender=FullOrder)
+def update_occupancy_on_delete(sender, instance, **kwargs):
+    # Прошедшие дни календарь не показывает, их занятость удаляет архивация
+    if instance.selected_date < date.today():
+        return
+    slot = (instance.selected_date, instance.selected_time)
+    refresh_slot(*slot)
+    transaction.on_commit(lambda: publish_slot_change(*slot))
+
+
+@receiver(post_save, sender=FullOrder)
+@receiver(post_save, sender=QuickOrder)
+@receiver(post_save, sender=TrainingRegistration)
+def notify_staff(sender, instance, created=False, raw=False, **kwargs):
+    """Новая заявка уходит персоналу из фонового потока, запрос ее не ждет"""
+    if raw or not created:
+        return
+    transaction.on_commit(lambda: notifications.notify(instance))
+
+
+@receiver(post_save, sender=Hall)
+@receiver(post_delete, sender=Hall)
+@receiver(post_save, sender=SlotTemplate)
+@receiver(post_delete, sender=SlotTemplate)
+def invalidate_schedule(sender, **kwargs):
+    """Пересобираем сетку слотов только после изменения настроек"""
+    transaction.on_commit(schedule.invalidate)
+
+
+# Какие группы кеша контента устаревают при изменении модели
+CONTENT_GROUPS = {
+    Achievement: (content_cache.ACHIEVEMENTS,),
+    Holiday: (content_cache.HOLIDAYS,),
+    # Название категории выводится в карточках праздников
+    Category: (content_cache.CATEGORIES, content_cache.HOLIDAYS),
+    Review: (content_cache.REVIEWS,),
+}
+
+
+@receiver(post_save, sender=Achievement)
+@receiver(post_delete, sender=Achievement)
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_content_cache(sender, **kwargs):
+    """Сбрасываем кеш страниц после правки контента в админке"""
+    groups = CONTENT_GROUPS[sender]
+    transaction.on_commit(lambda: content_cache.invalidate(*groups))
+
+
+def _holiday_pages(slug, category_slug):
+    """Страницы, на которых виден праздник"""
+    paths = [reverse('home'), reverse('holidays'), reverse('holiday_detail', args=[slug])]
+    if category_slug:
+        paths.append(reverse('holidays_by_category', args=[category_slug]))
+    return paths
+
+
+@receiver(pre_save, sender=Holiday)
+def remember_previous_holiday_pages(sender, instance, **kwargs):
+    """Запоминаем прежние slug и категорию: их страницы тоже нужно сбросить"""
+    instance._previous_pages = []
+    if instance.pk:
+        previous = (
+            Holiday.objects.filter(pk=instance.pk)
+            .values_list('slug', 'category__slug')
+            .first()
+        )
+        if previous:
+            instance._previous_pages = _holiday_pages(*previous)
+
+
+@receiver(pre_save, sender=Category)
+def remember_previous_category_slug(sender, instance, **kwargs):
+    instance._previous_slug = None
+    if instance.pk:
+        instance._previous_slug = (
+            Category.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def purge_holiday_pages(sender, instance, raw=False, **kwargs):
+    """Сбрасываем страницу праздника, его категорию и общие списки, но не весь сайт"""
+    if raw:
+        return
+    category_slug = (
+        Category.objects.filter(pk=instance.category_id).values_list('slug', flat=True).first()
+    )
+    paths = set(_holiday_pages(instance.slug, category_slug))
+    paths.update(getattr(instance, '_previous_pages', []))
+    transaction.on_commit(lambda: page_cache.purge(*paths))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def purge_category_pages(sender, instance, raw=False, **kwargs):
+    """Название категории видно в списке праздников и на страницах ее праздников"""
+    if raw:
+        return
+    paths = {reverse('holidays'), reverse('holidays_by_category', args=[instance.slug])}
+    previous_slug = getattr(instance, '_previous_slug', None)
+    if previous_slug:
+        paths.add(reverse('holidays_by_category', args=[previous_slug]))
+    if instance.pk:
+        for slug in Holiday.objects.filter(category_id=instance.pk).values_list('slug', flat=True):
+            paths.add(reverse('holiday_detail', args=[slug]))
+    transaction.on_commit(lambda: page_cache.purge(*paths))
+
+
+@receiver(post_save, sender=Achievement)
+@receiver(post_delete, sender=Achievement)
+def purge_achievement_pages(sender, raw=False, **kwargs):
+    if raw:
+        return
+    paths = (reverse('home'), reverse('achievements'))
+    transaction.on_commit(lambda: page_cache.purge(*paths))
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def purge_review_pages(sender, raw=False, **kwargs):
+    # Одобренные отзывы выводятся только на главной
+    if raw:
+        return
+    transaction.on_commit(lambda: page_cache.purge(reverse('home')))
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+    """Запоминаем, учтен ли отзыв в сводке до правки и с какой оценкой"""
+    instance._previous_rating = None
+    if instance.pk:
+        previous = Review.objects.filter(pk=instance.pk).values_list('approved', 'rating').first()
+        if previous and previous[0]:
+            instance._previous_rating = previous[1]
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = {}
+    previous = getattr(instance, '_previous_rating', None)
+    if previous is not None:
+        deltas[previous] = -1
+    if instance.approved:
+        deltas[instance.rating] = deltas.get(instance.rating, 0) + 1
+    ratings.apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    if instance.approved:
+        ratings.apply_deltas({instance.rating: -1})
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_save, sender=Achievement)
+def build_image_renditions(sender, instance, raw=False, **kwargs):
+    """Уменьшенные копии фото строит фоновый поток после сохранения в админке"""
+    if raw or not instance.image:
+        return
+    name, storage = instance.image.name, instance.image.storage
+    transaction.on_commit(lambda: images.worker.submit(name, storage))
@@ -0,0 +1,342 @@
+"""
+Очередь приема заявок с отложенной записью в базу (write-behind).
+
+Быстрые заявки, записи на тренировки и отзывы не ждут блокировки записи
+SQLite: запрос дописывает строку JSON в локальный файл incoming.jsonl и
+сразу отвечает. Фоновый поток (или команда drain_spool) переименовывает
+файл в сегмент draining-*.jsonl и переносит его в базу через bulk_create
+одной транзакцией.
+
+Восстановление после сбоя: в той же транзакции пишется строка SpoolSegment
+с именем сегмента. Если процесс упал после commit, но до удаления файла,
+сегмент при следующем проходе найдется в журнале и будет просто удален;
+если до commit - перенесется заново. Оборванная последняя строка файла
+откладывается в rejected/ вместе с другими нечитаемыми записями.
+
+Используются fcntl-блокировки, поэтому очередь работает только на Unix.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from . import notifications
+from .models import QuickOrder, Review, SpoolSegment, TrainingRegistration
+
+# Какие модели принимаются через очередь
+SPOOL_MODELS = {
+    'quickorder': QuickOrder,
+    'trainingregistration': TrainingRegistration,
+    'review': Review,
+}
+
+INCOMING_NAME = 'incoming.jsonl'
+SEGMENT_PREFIX = 'draining-'
+REJECTED_DIR = 'rejected'
+LOCK_NAME = 'drain.lock'
+
+BATCH_SIZE = 500
+DRAIN_INTERVAL = 1.0
+# Сколько хранить журнал перенесенных сегментов
+LEDGER_RETENTION = timedelta(days=7)
+
+
+def spool_dir():
+    directory = Path(settings.PARTIZAN_SPOOL_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def enqueue(model_name, fields):
+    """Дописывает запись в очередь; возвращает ее id"""
+    if model_name not in SPOOL_MODELS:
+        raise ValueError(f'Модель {model_name} не принимается через очередь')
+    record_id = uuid.uuid4().hex
+    line = json.dumps(
+        {'id': record_id, 'model': model_name, 'ts': time.time(), 'fields': fields},
+        cls=DjangoJSONEncoder, ensure_ascii=False,
+    ) + '\n'
+    _append(spool_dir() / INCOMING_NAME, line.encode('utf-8'))
+    worker.ensure_started()
+    return record_id
+
+
+def _append(path, data):
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            # Разделяемая блокировка: писатели не мешают друг другу, а перенос
+            # сегмента ждет, пока допишутся начатые строки
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(fd).st_ino:
+                # Файл успели переименовать в сегмент - пишем в новый incoming
+                continue
+            os.write(fd, data)
+            if settings.PARTIZAN_SPOOL_FSYNC:
+                os.fdatasync(fd)
+            return
+        finally:
+            os.close(fd)
+
+
+@contextmanager
+def _drain_lock(blocking=True):
+    """Один переносчик на каталог очереди, даже при нескольких воркерах"""
+    fd = os.open(spool_dir() / LOCK_NAME, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        os.close(fd)
+
+
+def _rotate(directory):
+    """Переименовывает incoming в новый сегмент и ждет незаконченные записи"""
+    incoming = directory / INCOMING_NAME
+    if not incoming.exists() or incoming.stat().st_size == 0:
+        return
+    segment = directory / f'{SEGMENT_PREFIX}{time.time_ns()}-{os.getpid()}.jsonl'
+    os.rename(incoming, segment)
+    fd = os.open(segment, os.O_RDONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    finally:
+        os.close(fd)
+
+
+def pending_segments(directory=None):
+    directory = directory or spool_dir()
+    return sorted(directory.glob(f'{SEGMENT_PREFIX}*.jsonl'))
+
+
+def _read_segment(path):
+    records, rejected = [], []
+    with open(path, 'rb') as segment:
+        for raw in segment:
+            try:
+                record = json.loads(raw)
+                if record['model'] not in SPOOL_MODELS or not isinstance(record['fields'], dict):
+                    raise ValueError(record.get('model'))
+            except (ValueError, KeyError, TypeError):
+                rejected.append(raw)
+                continue
+            records.append(record)
+    return records, rejected
+
+
+def _split_dangling(model, records):
+    """
+    Отделяет записи со ссылками на удаленные объекты (праздник удалили, пока
+    заявка ждала в очереди). SQLite проверяет внешние ключи только при commit,
+    и одна такая запись иначе откатила бы весь сегмент.
+    """
+    dangling = set()
+    for field in model._meta.concrete_fields:
+        if not field.is_relation:
+            continue
+        referenced = {record['fields'].get(field.attname) for record in records} - {None}
+        existing = set(
+            field.related_model._base_manager.filter(pk__in=referenced).values_list('pk', flat=True)
+        )
+        dangling.update(
+            index for index, record in enumerate(records)
+            if record['fields'].get(field.attname) not in existing | {None}
+        )
+    valid = [record for index, record in enumerate(records) if index not in dangling]
+    return valid, [records[index] for index in sorted(dangling)]
+
+
+def _submitted_at(record):
+    return datetime.fromtimestamp(record['ts'], tz=dt_timezone.utc)
+
+
+def _create(model, records, batch_size):
+    """
+    bulk_create с датой создания из очереди. auto_now_add поставил бы время
+    переноса, а после задержки переноса или восстановления после сбоя это
+    неверное время заявки - дату подачи (ts) записываем вторым запросом.
+    """
+    objects = model.objects.bulk_create(
+        [model(**record['fields']) for record in records], batch_size=batch_size,
+    )
+    for obj, record in zip(objects, records):
+        obj.created_at = _submitted_at(record)
+    model.objects.bulk_update(objects, ['created_at'], batch_size=batch_size)
+    return objects
+
+
+def _save_records(records, batch_size):
+    """bulk_create по моделям; при ошибке целостности - по одной записи"""
+    grouped = defaultdict(list)
+    for record in records:
+        grouped[record['model']].append(record)
+
+    saved, rejected = defaultdict(list), []
+    for model_name, model_records in grouped.items():
+        model = SPOOL_MODELS[model_name]
+        model_records, dangling = _split_dangling(model, model_records)
+        rejected.extend(dangling)
+        try:
+            with transaction.atomic():
+                objects = _create(model, model_records, batch_size)
+            saved[model_name].extend(objects)
+        except (IntegrityError, TypeError, ValueError):
+            for record in model_records:
+                try:
+                    with transaction.atomic():
+                        # bulk_create и для одной записи: сигналы не шлются ни в одной ветке
+                        saved[model_name].extend(_create(model, [record], batch_size))
+                except (IntegrityError, TypeError, ValueError):
+                    rejected.append(record)
+    return saved, rejected
+
+
+def _reject(directory, segment, lines):
+    """
+    Откладывает строки сегмента в rejected/ под его именем. Файл пишется
+    целиком и подменяется атомарно: если сегмент после сбоя переносится
+    заново, отложенные строки не задваиваются.
+    """
+    if not lines:
+        return
+    target = directory / REJECTED_DIR
+    target.mkdir(exist_ok=True)
+    partial = target / f'{segment.name}.partial'
+    with open(partial, 'wb') as rejected:
+        # У оборванной последней строки нет перевода строки - добавляем
+        rejected.writelines(line if line.endswith(b'\n') else line + b'\n' for line in lines)
+        if settings.PARTIZAN_SPOOL_FSYNC:
+            rejected.flush()
+            os.fsync(rejected.fileno())
+    os.replace(partial, target / segment.name)
+
+
+def drain_segment(segment, batch_size=BATCH_SIZE):
+    """Переносит один сегмент в базу; возвращает число сохраненных записей"""
+    directory = segment.parent
+    if SpoolSegment.objects.filter(name=segment.name).exists():
+        # Сегмент уже в базе, процесс упал до удаления файла
+        segment.unlink()
+        return 0
+
+    records, bad_lines = _read_segment(segment)
+    with transaction.atomic():
+        saved, rejected = _save_records(records, batch_size)
+        total = sum(len(objects) for objects in saved.values())
+        SpoolSegment.objects.create(name=segment.name, records=total)
+        # bulk_create не шлет post_save - уведомляем персонал сами
+        created = [obj for objects in saved.values() for obj in objects]
+        transaction.on_commit(lambda: [notifications.notify(obj) for obj in created])
+
+        # До commit: после него сегмент считается перенесенным и при сбое
+        # был бы просто удален вместе с неотложенными строками
+        bad_lines += [
+            (json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode('utf-8')
+            for record in rejected
+        ]
+        _reject(directory, segment, bad_lines)
+    segment.unlink()
+    return total
+
+
+def drain(batch_size=BATCH_SIZE, blocking=True):
+    """Переносит всю накопленную очередь; None, если переносит другой процесс"""
+    directory = spool_dir()
+    with _drain_lock(blocking) as locked:
+        if not locked:
+            return None
+        _rotate(directory)
+        total = 0
+        for segment in pending_segments(directory):
+            total += drain_segment(segment, batch_size)
+        SpoolSegment.objects.filter(drained_at__lt=timezone.now() - LEDGER_RETENTION).delete()
+        return total
+
+
+def _count_lines(path):
+    with open(path, 'rb') as spool_file:
+        return sum(chunk.count(b'\n') for chunk in iter(lambda: spool_file.read(1 << 16), b''))
+
+
+def _first_timestamp(path):
+    with open(path, 'rb') as spool_file:
+        for raw in spool_file:
+            try:
+                return json.loads(raw)['ts']
+            except (ValueError, KeyError, TypeError):
+                continue
+    return None
+
+
+def status():
+    """Глубина очереди, возраст самой старой записи и число отложенных строк"""
+    directory = spool_dir()
+    files = pending_segments(directory)
+    incoming = directory / INCOMING_NAME
+    if incoming.exists():
+        files.append(incoming)
+
+    depth = sum(_count_lines(path) for path in files)
+    oldest = next((ts for ts in map(_first_timestamp, files) if ts is not None), None)
+    rejected_dir = directory / REJECTED_DIR
+    rejected = sum(_count_lines(path) for path in rejected_dir.glob('*.jsonl')) if rejected_dir.exists() else 0
+    return {
+        'depth': depth,
+        'segments': len(files),
+        'lag_seconds': round(time.time() - oldest, 3) if oldest is not None else 0.0,
+        'rejected': rejected,
+    }
+
+
+class SpoolWorker:
+    """Фоновый поток процесса, периодически переносящий очередь в базу"""
+
+    def __init__(self, interval=DRAIN_INTERVAL):
+        self.interval = interval
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if not settings.PARTIZAN_SPOOL_WORKER:
+            return
+        with self._lock:
+            # После fork потока в дочернем процессе нет - запускаем заново
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='partizan-spool', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                drain(blocking=False)
+            except Exception as e:
+                print(f"Ошибка переноса очереди заявок: {e}")
+            finally:
+                close_old_connections()
+
+
+worker = SpoolWorker()
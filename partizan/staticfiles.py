@@ -0,0 +1,127 @@
+"""
+Хранилище статики для collectstatic: хеши в именах, минификация,
+заранее сжатые .gz/.br копии и пережатые картинки.
+
+brotli и rjsmin необязательны: без них не создаются .br-файлы и JS
+не минифицируется (gzip-копии и минификация CSS работают всегда).
+"""
+import gzip
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from PIL import Image
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+# Файлы, для которых имеет смысл хранить сжатые копии
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.xml', '.html', '.map')
+# Пережимаем только заметно тяжелые картинки
+RECOMPRESS_MIN_SIZE = 100 * 1024
+JPEG_QUALITY = 82
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACES = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+# После двоеточия пробел не значим ни в объявлениях, ни в псевдоклассах
+_CSS_COLON = re.compile(r':\s+')
+
+
+def minify_css(css):
+    """Убирает комментарии и лишние пробелы, не трогая значения свойств"""
+    css = _CSS_COMMENT.sub('', css)
+    css = _CSS_SPACES.sub(' ', css)
+    css = _CSS_PUNCTUATION.sub(r'\1', css)
+    css = _CSS_COLON.sub(':', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js):
+    if rjsmin is None:
+        return js
+    return rjsmin.jsmin(js)
+
+
+def recompress_image(data, extension):
+    """Пережимает JPEG/PNG; возвращает None, если выигрыша нет"""
+    try:
+        image = Image.open(BytesIO(data))
+        buffer = BytesIO()
+        if extension in ('.jpg', '.jpeg'):
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        else:
+            image.save(buffer, 'PNG', optimize=True)
+    except OSError:
+        return None
+    result = buffer.getvalue()
+    return result if len(result) < len(data) else None
+
+
+class OptimizedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage с минификацией и предварительным сжатием"""
+
+    def stored_name(self, name):
+        # Без collectstatic (разработка, тесты) манифеста нет - отдаем исходное
+        # имя. В работе пустой манифест - ошибка сборки, ее нельзя скрывать
+        if not self.hashed_files and settings.PARTIZAN_STATIC_MANIFEST_OPTIONAL:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        # Оптимизируем только файлы, записанные в этом прогоне: уже лежащие на
+        # диске с тем же хешем базовый класс не перезаписывает, и повторный
+        # проход добавил бы еще одно сжатие с потерями под прежним именем
+        written = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run=dry_run, **options):
+            if processed is True:
+                written.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in sorted(written):
+            self._optimize(hashed_name)
+
+    def _optimize(self, name):
+        lower = name.lower()
+        with self.open(name) as source:
+            data = source.read()
+
+        optimized = None
+        if lower.endswith('.css'):
+            optimized = minify_css(data.decode('utf-8')).encode('utf-8')
+        elif lower.endswith('.js'):
+            optimized = minify_js(data.decode('utf-8')).encode('utf-8')
+        elif lower.endswith(('.jpg', '.jpeg', '.png')) and len(data) >= RECOMPRESS_MIN_SIZE:
+            optimized = recompress_image(data, lower[lower.rfind('.'):])
+
+        if optimized is not None and len(optimized) < len(data):
+            self._replace(name, optimized)
+            data = optimized
+
+        if lower.endswith(COMPRESSIBLE_EXTENSIONS):
+            self._write_variant(name + '.gz', gzip.compress(data, compresslevel=9, mtime=0), len(data))
+            if brotli is not None:
+                self._write_variant(name + '.br', brotli.compress(data, quality=11), len(data))
+
+    def _replace(self, name, data):
+        self.delete(name)
+        self._save(name, ContentFile(data))
+
+    def _write_variant(self, name, data, original_size):
+        if self.exists(name):
+            self.delete(name)
+        # Сжатая копия нужна, только если она меньше исходника
+        if len(data) < original_size:
+            self._save(name, ContentFile(data))
@@ -0,0 +1,60 @@
+"""
+Хранилище загрузок с адресацией по содержимому.
+
+Файл сохраняется как blobs/<2 символа хеша>/<sha256><расширение>, поэтому
+повторная загрузка того же фото не создает копию: запись в базе просто
+ссылается на уже существующий blob. Содержимое по такому имени никогда
+не меняется, и его можно отдавать с бессрочным кешированием.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+BLOBS_DIR = 'blobs'
+
+
+def content_hash(content):
+    """SHA-256 файла Django (chunks() сам перематывает файл в начало)"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_name(digest, original_name):
+    ext = os.path.splitext(original_name)[1].lower()
+    return f'{BLOBS_DIR}/{digest[:2]}/{digest}{ext}'
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(f'{BLOBS_DIR}/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, который кладет файлы по хешу содержимого"""
+
+    def get_available_name(self, name, max_length=None):
+        # Имя все равно заменяется хешем в _save, суффиксы не нужны. Если blob
+        # появился между exists() и записью, FileSystemStorage._save просит
+        # новое имя в цикле - то же имя зациклило бы его, поэтому прерываем
+        if is_blob(name) and self.exists(name):
+            raise FileExistsError(name)
+        return name
+
+    def _save(self, name, content):
+        name = blob_name(content_hash(content), name)
+        if self.exists(name):
+            return name
+        try:
+            return super()._save(name, content)
+        except FileExistsError:
+            # Параллельная загрузка тех же байтов успела записать blob первой
+            if self.exists(name):
+                return name
+            raise
+
+
+def blob_storage():
+    """Хранилище для ImageField (вызываемый объект, чтобы в миграции попала ссылка, а не настройки)"""
+    return ContentAddressedStorage()
@@ -0,0 +1,33 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from partizan.images import RENDITION_WIDTHS, has_renditions, rendition_name, srcset
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 768px) 100vw, 400px'
+
+
+@register.simple_tag
+def responsive_image(image, alt='', css_class='', sizes=DEFAULT_SIZES, loading='lazy'):
+    """
+    <picture> с WebP и JPEG копиями разной ширины.
+    Пока копии не созданы, отдает обычный <img> с исходником.
+    """
+    if not image:
+        return ''
+    if not has_renditions(image.name):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}">',
+            image.url, alt, css_class, loading
+        )
+    fallback = default_storage.url(rendition_name(image.name, RENDITION_WIDTHS[1], 'jpg'))
+    return format_html(
+        '<picture class="responsive-picture">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" decoding="async">'
+        '</picture>',
+        srcset(image.name, 'webp'), sizes,
+        fallback, srcset(image.name, 'jpg'), sizes, alt, css_class, loading
+    )
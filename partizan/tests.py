@@ -0,0 +1,1503 @@
+import asyncio
+import gzip
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import date, timedelta
+from pathlib import Path
+from urllib.parse import urlencode
+from xml.etree import ElementTree
+from unittest import mock, skipUnless
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import OperationalError, connection, connections
+from django.db.utils import ConnectionHandler
+from django.db.models import Sum
+from django.http import Http404
+from django.template import Context, Template
+from django.test import (
+    Client, LiveServerTestCase, RequestFactory, TestCase, TransactionTestCase, override_settings,
+)
+from django.utils import timezone
+from PIL import Image, ImageFilter
+
+from . import (
+    archive, availability, database, exports, feed, gallery, images, loadtest, notifications,
+    occupancy, profiling, ratings, reviews, spool, storage, views,
+)
+from .context_processors import categories
+from .models import (
+    Achievement, ArchivedFullOrder, ArchivedQuickOrder, ArchivedTrainingRegistration, Category,
+    FullOrder, Holiday, QuickOrder, Review, SlotOccupancy, SpoolSegment, TrainingRegistration,
+)
+from .serving import serve_static
+from .staticfiles import OptimizedManifestStaticFilesStorage
+
+# Тесты не запускают collectstatic: {% static %} отдает исходные имена
+static_without_manifest = override_settings(PARTIZAN_STATIC_MANIFEST_OPTIONAL=True)
+
+
+def setUpModule():
+    static_without_manifest.enable()
+
+
+def tearDownModule():
+    static_without_manifest.disable()
+
+
+def next_weekday(weekday):
+    """Ближайшая будущая дата с заданным днем недели (0 - понедельник)"""
+    today = date.today()
+    return today + timedelta(days=(weekday - today.weekday()) % 7 or 7)
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    """Стресс-тест: сотни одновременных заявок на один слот"""
+    REQUESTS = 200
+    # Залы и шаблоны слотов создаются миграцией, их нужно восстанавливать
+    serialized_rollback = True
+
+    def setUp(self):
+        if connection.vendor == 'sqlite':
+            self.use_sqlite_profile()
+        cache.clear()
+        category = Category.objects.create(name='Дни рождения', slug='birthdays')
+        self.holiday = Holiday.objects.create(
+            category=category, title='Праздник', slug='holiday',
+            image='holidays/1.jpg', duration='2 часа', description='Описание',
+        )
+
+    def use_sqlite_profile(self):
+        """
+        Тестовая база SQLite в памяти работает в режиме общего кеша: блокировки
+        там потабличные и без ожидания, совсем не как в работе. Поэтому заявки
+        идут в файловую базу с рабочим профилем (WAL, BEGIN IMMEDIATE, busy
+        timeout): потоки открывают соединения по connections.settings, а
+        соединение тестовой базы в памяти этого потока пока отложено.
+        """
+        path = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'db.sqlite3'
+        profile = ConnectionHandler({'default': database.sqlite(str(path), conn_max_age=0)}).settings['default']
+        original, memory = connections.settings['default'], connections['default']
+        connections.settings['default'] = profile
+        connections['default'] = connections.create_connection('default')
+
+        def restore():
+            connections['default'].close()
+            connections.settings['default'] = original
+            connections['default'] = memory
+
+        self.addCleanup(restore)
+        # Залы и шаблоны слотов создаются миграцией
+        call_command('migrate', verbosity=0)
+
+    def post_order(self, start, results, index):
+        start.wait()
+        try:
+            response = Client().post('/api/create-full-order/', {
+                'full_name': f'Гость {index}',
+                'phone': f'+7 900 000-{index:04d}',
+                'children_count': 5,
+                'age_of_children': '7 лет',
+                'holiday_id': self.holiday.id,
+                'selected_date': self.slot_date.isoformat(),
+                'selected_time': '13:00-15:00',
+            })
+            results[index] = response.json()
+        finally:
+            connection.close()
+
+    def test_only_two_halls_are_booked(self):
+        self.slot_date = next_weekday(0)
+        results = [None] * self.REQUESTS
+        start = threading.Event()
+        threads = [
+            threading.Thread(target=self.post_order, args=(start, results, i))
+            for i in range(self.REQUESTS)
+        ]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+
+        booked = [result for result in results if result['success']]
+        rejected = [result['message'] for result in results if not result['success']]
+        self.assertEqual(len(booked), 2)
+        # Отказ только из-за занятого слота, а не из-за блокировки базы
+        self.assertEqual(rejected, ['Это время уже полностью занято'] * (self.REQUESTS - 2))
+
+        halls = FullOrder.objects.filter(
+            selected_date=self.slot_date, selected_time='13:00-15:00'
+        ).values_list('hall_number', flat=True)
+        self.assertEqual(sorted(halls), [1, 2])
+        self.assertEqual(
+            SlotOccupancy.objects.filter(date=self.slot_date, bookings__gt=0).count(), 2
+        )
+
+
+class AvailabilityTests(TestCase):
+    """Битовые маски занятости: пересечения интервалов и сетка слотов"""
+
+    def setUp(self):
+        cache.clear()
+        self.monday = next_weekday(0)
+
+    def test_parse_interval(self):
+        self.assertEqual(availability.parse_interval('13:00-17:00'), (13, 17))
+        for bad in ('17:00-13:00', '13:00', 'днем', '20:00-25:00'):
+            with self.subTest(bad), self.assertRaises(ValueError):
+                availability.parse_interval(bad)
+
+    def test_long_booking_blocks_every_overlapping_slot(self):
+        day = availability.DayAvailability((1, 2))
+        day.book(1, availability.slot_mask('13:00-17:00'))
+        for time_slot in ('13:00-15:00', '15:00-17:00', '14:00-16:00'):
+            with self.subTest(time_slot):
+                self.assertFalse(day.is_hall_free(1, availability.slot_mask(time_slot)))
+                self.assertEqual(day.free_halls(availability.slot_mask(time_slot)), [2])
+
+    def test_adjacent_intervals_do_not_conflict(self):
+        day = availability.DayAvailability((1,))
+        day.book(1, availability.slot_mask('13:00-17:00'))
+        self.assertTrue(day.is_hall_free(1, availability.slot_mask('11:00-13:00')))
+        self.assertTrue(day.is_hall_free(1, availability.slot_mask('17:00-19:00')))
+
+    def test_no_free_halls_when_all_are_taken(self):
+        day = availability.DayAvailability((1, 2))
+        day.book(1, availability.slot_mask('13:00-15:00'))
+        day.book(2, availability.slot_mask('9:00-13:00') | availability.slot_mask('13:00-17:00'))
+        mask = availability.slot_mask('13:00-15:00')
+        self.assertEqual(day.free_halls(mask), [])
+        self.assertFalse(day.is_free(mask))
+
+    def test_find_slot_accepts_only_template_intervals(self):
+        self.assertEqual(availability.find_slot(self.monday, 2, '13:00-15:00')['value'], '13:00-15:00')
+        self.assertIsNone(availability.find_slot(self.monday, 2, '12:00-14:00'))
+        self.assertIsNone(availability.find_slot(self.monday, 4, '13:00-15:00'))
+        self.assertIsNone(availability.find_slot(self.monday, 2, '7:00-9:00'))
+
+    def test_booking_rejects_slot_overlapping_long_holidays(self):
+        category = Category.objects.create(name='Дни рождения', slug='birthdays')
+        long_holiday, short_holiday = (
+            Holiday.objects.create(
+                category=category, title=f'Праздник {hours}', slug=f'holiday-{hours}',
+                image='', duration=f'{hours} часа', description='Описание',
+            )
+            for hours in (4, 2)
+        )
+
+        def book(holiday, time_slot):
+            return self.client.post('/api/create-full-order/', {
+                'full_name': 'Гость', 'phone': '+7 900 000-00-01', 'children_count': 5,
+                'age_of_children': '7', 'holiday_id': holiday.id,
+                'selected_date': self.monday.isoformat(), 'selected_time': time_slot,
+            }).json()
+
+        for _ in range(2):
+            self.assertTrue(book(long_holiday, '13:00-17:00')['success'])
+        rejected = book(short_holiday, '15:00-17:00')
+        self.assertEqual(rejected, {'success': False, 'message': 'Это время уже полностью занято'})
+        self.assertTrue(book(short_holiday, '11:00-13:00')['success'])
+        self.assertEqual(FullOrder.objects.count(), 3)
+
+
+class OccupancyTests(TestCase):
+    """Таблица занятости следует за заявками: создание, перенос, удаление, пересборка"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Дни рождения', slug='birthdays')
+        cls.holiday = Holiday.objects.create(
+            category=category, title='Пираты', slug='pirates', image='', duration='2 часа', description='Описание',
+        )
+        cls.day = next_weekday(0)
+
+    def order(self, time_slot='13:00-15:00', hall_number=1):
+        return FullOrder.objects.create(
+            holiday=self.holiday, full_name='Гость', phone='+7 900 000-00-01', children_count=5,
+            age_of_children='7', selected_date=self.day, selected_time=time_slot, hall_number=hall_number,
+        )
+
+    def occupancy(self):
+        return set(
+            SlotOccupancy.objects.filter(bookings__gt=0).values_list('date', 'time_slot', 'hall_number', 'bookings')
+        )
+
+    def test_create_counts_each_hall(self):
+        self.order(hall_number=1)
+        self.order(hall_number=2)
+        self.assertEqual(self.occupancy(), {
+            (self.day, '13:00-15:00', 1, 1), (self.day, '13:00-15:00', 2, 1),
+        })
+
+    def test_moving_an_order_frees_the_previous_slot(self):
+        order = self.order()
+        order.selected_time = '15:00-17:00'
+        order.save()
+        self.assertEqual(self.occupancy(), {(self.day, '15:00-17:00', 1, 1)})
+        # Строка прежнего слота остается с нулем: по ее updated_at видна отмена
+        self.assertTrue(SlotOccupancy.objects.filter(time_slot='13:00-15:00', bookings=0).exists())
+
+    def test_delete_frees_the_slot(self):
+        self.order().delete()
+        self.assertEqual(self.occupancy(), set())
+
+    def test_rebuild_matches_orders(self):
+        self.order(hall_number=1)
+        self.order('15:00-17:00', hall_number=2)
+        expected = self.occupancy()
+        SlotOccupancy.objects.all().delete()
+        SlotOccupancy.objects.create(date=self.day, time_slot='9:00-11:00', hall_number=1, bookings=3)
+        self.assertEqual(occupancy.rebuild_occupancy(), 2)
+        self.assertEqual(self.occupancy(), expected)
+
+
+class AvailabilityApiTests(TestCase):
+    """API доступности v2: условные запросы и проверка диапазона"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Дни рождения', slug='birthdays')
+        cls.holiday = Holiday.objects.create(
+            category=category, title='Пираты', slug='pirates', image='', duration='2 часа', description='Описание',
+        )
+        cls.url = f'/api/v2/availability/{cls.holiday.id}/'
+
+    def setUp(self):
+        cache.clear()
+
+    def book(self):
+        FullOrder.objects.create(
+            holiday=self.holiday, full_name='Гость', phone='+7 900 000-00-01', children_count=5,
+            age_of_children='7', selected_date=next_weekday(0), selected_time='13:00-15:00',
+        )
+
+    def test_etag_and_last_modified(self):
+        self.book()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(response.json()['booked'], {next_weekday(0).isoformat(): {'13:00-15:00': 1}})
+
+        by_etag = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(by_etag.status_code, 304)
+        by_date = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(by_date.status_code, 304)
+
+    def test_new_booking_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.book()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_invalid_ranges(self):
+        start = date.today()
+        cases = {
+            'bad format': {'start': '01.01.2030'},
+            'end before start': {'start': start.isoformat(), 'end': (start - timedelta(days=1)).isoformat()},
+            'too long': {
+                'start': start.isoformat(),
+                'end': (start + timedelta(days=views.MAX_AVAILABILITY_DAYS + 1)).isoformat(),
+            },
+        }
+        for name, params in cases.items():
+            with self.subTest(name):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+
+
+class ChangeFeedTests(TestCase):
+    """Лента SSE: фильтр по окну, без повторов своих событий, ошибки опроса видны"""
+
+    def test_stream_sends_events_of_its_window(self):
+        day = next_weekday(0)
+
+        async def scenario():
+            change_feed = feed.ChangeFeed(poll_interval=0, heartbeat=0)
+            stream = feed.event_stream(day, day, change_feed)
+            first = await anext(stream)
+            received = asyncio.ensure_future(anext(stream))
+            await asyncio.sleep(0)
+            change_feed.publish({'date': (day + timedelta(days=1)).isoformat(), 'time_slot': '9:00-11:00'})
+            change_feed.publish({'date': day.isoformat(), 'time_slot': '13:00-15:00'})
+            event = await received
+            await stream.aclose()
+            return first, event, change_feed.subscriber_count
+
+        first, event, subscribers = asyncio.run(scenario())
+        self.assertEqual(first, 'retry: 5000\n\n')
+        self.assertEqual(event, feed.format_event({'date': day.isoformat(), 'time_slot': '13:00-15:00'}))
+        self.assertEqual(subscribers, 0)
+
+    def poll(self, change_feed, changes, rounds, publish=()):
+        """Несколько циклов опроса с подмененным запросом; события подписчика"""
+        async def scenario():
+            queue = change_feed.subscribe()
+            for event in publish:
+                change_feed.publish(event)
+            await asyncio.sleep(change_feed.poll_interval * rounds)
+            change_feed.unsubscribe(queue)
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+        with mock.patch.object(change_feed, '_changes_since', side_effect=changes):
+            return asyncio.run(scenario())
+
+    def test_poll_skips_changes_this_process_published(self):
+        day = next_weekday(0)
+        change_feed = feed.ChangeFeed(poll_interval=0.05, heartbeat=0)
+        local = {'date': day.isoformat(), 'time_slot': '13:00-15:00'}
+        remote = {'date': day.isoformat(), 'time_slot': '15:00-17:00'}
+
+        published = timezone.now()
+        rounds = iter([
+            # Строка своей заявки записана до публикации, чужой - после
+            [(day, '13:00-15:00', published - timedelta(milliseconds=5)),
+             (day, '15:00-17:00', published + timedelta(milliseconds=5))],
+        ])
+
+        with mock.patch.object(feed.timezone, 'now', return_value=published):
+            events = self.poll(change_feed, lambda since: next(rounds, []), rounds=2.5, publish=[local])
+        self.assertEqual(events, [local, remote])
+
+    def test_poll_errors_are_reported_and_backed_off(self):
+        change_feed = feed.ChangeFeed(poll_interval=20, heartbeat=0)
+        delays = []
+
+        async def sleep(delay):
+            delays.append(delay)
+            if len(delays) > 4:
+                raise asyncio.CancelledError
+
+        with mock.patch.object(change_feed, '_changes_since', side_effect=OperationalError('no such table')), \
+                mock.patch.object(feed.asyncio, 'sleep', sleep), mock.patch('builtins.print') as report:
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(change_feed._poll())
+        self.assertEqual(delays, [20, 40, feed.POLL_BACKOFF_MAX, feed.POLL_BACKOFF_MAX, feed.POLL_BACKOFF_MAX])
+        self.assertEqual(report.call_count, 4)
+        self.assertIn('no such table', report.call_args.args[0])
+
+    def test_stream_is_not_served_under_wsgi(self):
+        self.assertEqual(self.client.get('/api/availability-stream/').status_code, 204)
+
+
+class ContentCacheTests(TestCase):
+    """Публичные страницы берут контент из кеша, а правки сбрасывают его"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Дни рождения', slug='birthdays')
+        self.holiday = Holiday.objects.create(
+            category=self.category, title='Пираты', slug='pirates',
+            image='', duration='2 часа', description='Описание',
+        )
+
+    def test_cached_pages_skip_content_queries(self):
+        for url in ('/', '/holidays/', '/achievements/'):
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                self.client.get(url)
+
+    def test_holiday_edit_is_visible_immediately(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get('/holidays/')
+            self.holiday.title = 'Супергерои'
+            self.holiday.save()
+        self.assertContains(self.client.get('/holidays/'), 'Супергерои')
+
+    def test_category_rename_refreshes_holiday_cards(self):
+        self.client.get('/holidays/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Выпускные'
+            self.category.save()
+        self.assertContains(self.client.get('/holidays/'), 'Выпускные')
+
+    def test_review_and_achievement_changes_reach_home_page(self):
+        self.client.get('/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(name='Анна', text='Отлично', rating=5, approved=True)
+            Achievement.objects.create(
+                title='Кубок города', description='Финал', date=date.today(),
+                place=1, city='Ульяновск',
+            )
+        response = self.client.get('/')
+        self.assertContains(response, 'Анна')
+        self.assertContains(response, 'Кубок города')
+
+
+class CategoriesContextProcessorTests(TestCase):
+    """Меню категорий берется из памяти процесса и обновляется после правки"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Дни рождения', slug='birthdays')
+
+    def test_lazy_and_cached(self):
+        with self.assertNumQueries(0):
+            context = categories(RequestFactory().get('/'))
+        self.assertEqual([c.name for c in context['all_categories']], ['Дни рождения'])
+        with self.assertNumQueries(0):
+            list(categories(RequestFactory().get('/'))['all_categories'])
+
+    def test_generation_bump_reloads(self):
+        list(categories(RequestFactory().get('/'))['all_categories'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Выпускные', slug='graduation')
+        names = [c.name for c in categories(RequestFactory().get('/'))['all_categories']]
+        self.assertEqual(sorted(names), ['Выпускные', 'Дни рождения'])
+
+
+class PageCacheTests(TestCase):
+    """Кеш страниц для анонимов и точечный сброс по сигналам"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Дни рождения', slug='birthdays')
+        self.holiday = Holiday.objects.create(
+            category=self.category, title='Пираты', slug='pirates',
+            image='', duration='2 часа', description='Описание',
+        )
+
+    def test_age_parameter_is_normalized(self):
+        self.assertEqual(self.client.get('/holidays/?age=7')['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get('/holidays/?age=07')['X-Page-Cache'], 'hit')
+        self.assertEqual(self.client.get('/holidays/?age=8')['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get('/holidays/?age=abc')['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get('/holidays/')['X-Page-Cache'], 'hit')
+
+    def test_holiday_edit_purges_only_its_pages(self):
+        pages = ['/holiday/pirates/', '/holidays/category/birthdays/', '/achievements/']
+        for url in pages:
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.holiday.title = 'Супергерои'
+            self.holiday.save()
+        detail = self.client.get('/holiday/pirates/')
+        self.assertEqual(detail['X-Page-Cache'], 'miss')
+        self.assertContains(detail, 'Супергерои')
+        self.assertEqual(self.client.get('/holidays/category/birthdays/')['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get('/achievements/')['X-Page-Cache'], 'hit')
+
+    def test_cached_page_gets_fresh_csrf_token(self):
+        self.client.get('/holiday/pirates/')
+        other = Client()
+        response = other.get('/holiday/pirates/')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertNotContains(response, 'partizan_csrf_token')
+        self.assertIn('csrftoken', response.cookies)
+
+
+class StaticFilesTests(TestCase):
+    """collectstatic: минификация, сжатые копии, пережатие картинок; отдача .br/.gz"""
+
+    def setUp(self):
+        root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.source, self.static_root = root / 'source', root / 'collected'
+        (self.source / 'css').mkdir(parents=True)
+        (self.source / 'css' / 'site.css').write_text('/* шапка */\nbody {\n  color: red;\n}\n' * 40)
+        rng = random.Random(1)
+        # Размытый шум: и после пережатия тяжелее RECOMPRESS_MIN_SIZE, а каждый
+        # повторный проход JPEG еще немного уменьшал бы файл
+        noise = Image.frombytes('RGB', (800, 800), rng.randbytes(800 * 800 * 3))
+        noise.filter(ImageFilter.GaussianBlur(1)).save(self.source / 'photo.jpg', 'JPEG', quality=100)
+        self.enterContext(override_settings(
+            STATICFILES_DIRS=[self.source], STATIC_ROOT=self.static_root,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        ))
+
+    def collect(self):
+        """Собирает статику, возвращает {исходное имя: собранный файл}"""
+        call_command('collectstatic', interactive=False, verbosity=0)
+        manifest = json.loads((self.static_root / 'staticfiles.json').read_text())['paths']
+        return {name: self.static_root / hashed for name, hashed in manifest.items()}
+
+    def test_collectstatic_optimizes_once(self):
+        collected = self.collect()
+        photo, css = collected['photo.jpg'].read_bytes(), collected['css/site.css'].read_bytes()
+        self.assertLess(len(photo), (self.source / 'photo.jpg').stat().st_size)
+        self.assertTrue(css.startswith(b'body{color:red}'))
+        gz = collected['css/site.css'].with_name(collected['css/site.css'].name + '.gz')
+        self.assertEqual(gzip.decompress(gz.read_bytes()), css)
+        # Повторный прогон не пережимает файлы, уже собранные под тем же хешем
+        self.assertEqual(self.collect(), collected)
+        self.assertEqual(collected['photo.jpg'].read_bytes(), photo)
+        self.assertEqual(collected['css/site.css'].read_bytes(), css)
+
+    def test_missing_manifest_fails_outside_development(self):
+        storage = OptimizedManifestStaticFilesStorage(location=self.static_root)
+        self.assertEqual(storage.stored_name('css/site.css'), 'css/site.css')
+        with override_settings(PARTIZAN_STATIC_MANIFEST_OPTIONAL=False):
+            with self.assertRaises(ValueError):
+                storage.stored_name('css/site.css')
+
+    def test_precompressed_variant_follows_accept_encoding(self):
+        self.static_root.mkdir()
+        (self.static_root / 'app.0123456789ab.js').write_bytes(b'plain')
+        (self.static_root / 'app.0123456789ab.js.gz').write_bytes(b'gzip')
+        (self.static_root / 'app.0123456789ab.js.br').write_bytes(b'brotli')
+        (self.static_root / 'app.js').write_bytes(b'plain')
+        factory = RequestFactory()
+        cases = [
+            ('gzip, deflate, br', 'br', b'brotli'),
+            ('gzip', 'gzip', b'gzip'),
+            ('br;q=0, gzip;q=0.5', 'gzip', b'gzip'),
+            ('', None, b'plain'),
+        ]
+        for accept, encoding, body in cases:
+            with self.subTest(accept):
+                response = serve_static(
+                    factory.get('/static/app.0123456789ab.js', HTTP_ACCEPT_ENCODING=accept),
+                    'app.0123456789ab.js',
+                )
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertEqual(b''.join(response.streaming_content), body)
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                self.assertIn('immutable', response['Cache-Control'])
+        response = serve_static(factory.get('/static/app.js'), 'app.js')
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertRaises(Http404):
+            serve_static(factory.get('/static/missing.js'), 'missing.js')
+
+    def test_serve_static_revalidates_with_304(self):
+        self.static_root.mkdir()
+        (self.static_root / 'app.js').write_bytes(b'plain')
+        (self.static_root / 'app.js.gz').write_bytes(b'gzip')
+        factory = RequestFactory()
+        response = serve_static(factory.get('/static/app.js', HTTP_ACCEPT_ENCODING='gzip'), 'app.js')
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertNotEqual(serve_static(factory.get('/static/app.js'), 'app.js')['ETag'], etag)
+
+        for headers in ({'HTTP_IF_NONE_MATCH': etag}, {'HTTP_IF_MODIFIED_SINCE': last_modified}):
+            with self.subTest(headers):
+                request = factory.get('/static/app.js', HTTP_ACCEPT_ENCODING='gzip', **headers)
+                response = serve_static(request, 'app.js')
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response['ETag'], etag)
+                self.assertIn('no-cache', response['Cache-Control'])
+        # Другой ETag - файл изменился, отдаем заново
+        request = factory.get('/static/app.js', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH='"old"')
+        self.assertEqual(b''.join(serve_static(request, 'app.js').streaming_content), b'gzip')
+
+
+class ImageRenditionTests(TestCase):
+    """Уменьшенные копии фото: размеры, тег шаблона и построение вне запроса"""
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        self.category = Category.objects.create(name='Дни рождения', slug='birthdays')
+
+    def upload(self, width=1200, height=800):
+        buffer = io.BytesIO()
+        Image.new('RGB', (width, height), (200, 80, 40)).save(buffer, 'JPEG')
+        return ContentFile(buffer.getvalue(), name='photo.jpg')
+
+    def holiday(self, image):
+        holiday = Holiday(
+            category=self.category, title='Пираты', slug='pirates', duration='2 часа', description='Описание',
+        )
+        holiday.image.save('photo.jpg', image, save=False)
+        holiday.save()
+        return holiday
+
+    def render(self, image):
+        template = Template('{% load partizan_images %}{% responsive_image image alt="Пираты" %}')
+        return template.render(Context({'image': image}))
+
+    def test_renditions_have_every_width_and_format(self):
+        storage = Holiday._meta.get_field('image').storage
+        name = storage.save('holidays/photo.jpg', self.upload())
+        self.assertEqual(images.generate_renditions(name, storage), 6)
+        self.assertEqual(images.generate_renditions(name, storage), 0)
+        for width in images.RENDITION_WIDTHS:
+            for ext in images.RENDITION_FORMATS:
+                with default_storage.open(images.rendition_name(name, width, ext)) as rendition:
+                    self.assertEqual(Image.open(rendition).size, (width, round(800 * width / 1200)))
+
+        small = storage.save('holidays/small.jpg', self.upload(200, 100))
+        images.generate_renditions(small, storage)
+        with default_storage.open(images.rendition_name(small, 1024, 'jpg')) as rendition:
+            self.assertEqual(Image.open(rendition).size, (200, 100))
+
+    def test_tag_falls_back_to_original_until_renditions_exist(self):
+        with self.captureOnCommitCallbacks():
+            holiday = self.holiday(self.upload())
+        html = self.render(holiday.image)
+        self.assertTrue(html.startswith('<img src="/media/blobs/'))
+
+        images.generate_renditions(holiday.image.name, holiday.image.storage)
+        html = self.render(holiday.image)
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('-320.webp 320w', html)
+        # Повторный рендер берет ответ из кеша, а не из хранилища
+        with mock.patch.object(images.default_storage, 'exists') as exists:
+            self.render(holiday.image)
+        exists.assert_not_called()
+
+    @override_settings(PARTIZAN_RENDITIONS_WORKER=True)
+    def test_saving_a_photo_builds_renditions_in_background(self):
+        threads = []
+        build = images.generate_renditions
+
+        def record(name, storage):
+            threads.append(threading.current_thread().name)
+            return build(name, storage)
+
+        with mock.patch.object(images, 'generate_renditions', side_effect=record):
+            with self.captureOnCommitCallbacks(execute=True):
+                holiday = self.holiday(self.upload())
+            images.worker.wait()
+        self.assertEqual(threads, ['partizan-renditions'])
+        self.assertTrue(images.has_renditions(holiday.image.name))
+
+
+class MediaDedupeTests(TestCase):
+    """Хранилище по хешу и команда dedupe_media: перенос записей и сборка мусора"""
+
+    def setUp(self):
+        cache.clear()
+        self.media = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(MEDIA_ROOT=self.media))
+        self.storage = Holiday._meta.get_field('image').storage
+        self.category = Category.objects.create(name='Дни рождения', slug='birthdays')
+
+    def photo(self, color):
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), color).save(buffer, 'JPEG')
+        return buffer.getvalue()
+
+    def legacy_file(self, name, data, age=7200):
+        path = self.media / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        past = time.time() - age
+        os.utime(path, (past, past))
+        return path
+
+    def holiday(self, image, slug='pirates'):
+        return Holiday.objects.create(
+            category=self.category, title=slug, slug=slug, image=image, duration='2 часа', description='Описание',
+        )
+
+    def dedupe(self, *args):
+        output = io.StringIO()
+        call_command('dedupe_media', *args, stdout=output, stderr=io.StringIO())
+        return output.getvalue()
+
+    def test_same_bytes_share_one_blob(self):
+        first = self.storage.save('holidays/a.jpg', ContentFile(self.photo('red')))
+        second = self.storage.save('achievements/b.JPG', ContentFile(self.photo('red')))
+        other = self.storage.save('holidays/c.jpg', ContentFile(self.photo('blue')))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(first.startswith('blobs/') and first.endswith('.jpg'))
+        self.assertEqual(len(list((self.media / 'blobs').rglob('*.jpg'))), 2)
+
+    def test_concurrent_upload_of_same_bytes_reuses_blob(self):
+        data = self.photo('red')
+        name = self.storage.save('holidays/a.jpg', ContentFile(data))
+        exists = self.storage.exists
+        checks = iter([False])
+        saved = []
+        # Вторая загрузка проверила exists() до того, как первая записала blob
+        with mock.patch.object(self.storage, 'exists', side_effect=lambda path: next(checks, exists(path))):
+            thread = threading.Thread(
+                target=lambda: saved.append(self.storage.save('holidays/b.jpg', ContentFile(data))), daemon=True,
+            )
+            thread.start()
+            thread.join(timeout=5)
+        self.assertFalse(thread.is_alive(), 'Сохранение зациклилось')
+        self.assertEqual(saved, [name])
+        self.assertEqual((self.media / name).read_bytes(), data)
+
+    def test_rows_move_to_blobs_and_duplicates_are_removed(self):
+        data = self.photo('red')
+        self.legacy_file('holidays/one.jpg', data)
+        self.legacy_file('holidays/copy.jpg', data)
+        first, second = self.holiday('holidays/one.jpg'), self.holiday('holidays/copy.jpg', slug='copy')
+
+        self.dedupe('--min-age', '0')
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertTrue(storage.is_blob(first.image.name))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(first.image.read(), data)
+        self.assertFalse((self.media / 'holidays').exists() and any((self.media / 'holidays').iterdir()))
+        self.assertTrue(images.has_renditions(first.image.name))
+
+    def test_dry_run_changes_nothing(self):
+        legacy = self.legacy_file('holidays/one.jpg', self.photo('red'))
+        orphan = self.legacy_file('achievements/orphan.jpg', self.photo('blue'))
+        holiday = self.holiday('holidays/one.jpg')
+
+        output = self.dedupe('--dry-run', '--min-age', '0')
+        self.assertIn('удалить achievements/orphan.jpg', output)
+        holiday.refresh_from_db()
+        self.assertEqual(holiday.image.name, 'holidays/one.jpg')
+        self.assertTrue(legacy.exists() and orphan.exists())
+        self.assertFalse((self.media / 'blobs').exists())
+
+    def test_gc_keeps_young_and_referenced_files(self):
+        referenced = self.storage.save('holidays/kept.jpg', ContentFile(self.photo('red')))
+        images.generate_renditions(referenced, self.storage)
+        self.holiday(referenced)
+        kept = [self.media / referenced] + [self.media / name for name in images.rendition_names(referenced)]
+        young = self.legacy_file('achievements/young.jpg', self.photo('green'), age=10)
+        old = self.legacy_file('achievements/old.jpg', self.photo('blue'))
+        # Даже очень старые файлы с живыми ссылками не трогаем
+        for path in kept:
+            os.utime(path, (0, 0))
+
+        self.dedupe()
+        self.assertTrue(young.exists())
+        self.assertFalse(old.exists())
+        self.dedupe('--min-age', '0')
+        self.assertFalse(young.exists())
+        for path in kept:
+            self.assertTrue(path.exists(), path)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Проверяется план запросов SQLite')
+class QueryPlanTests(TestCase):
+    """Горячие запросы должны идти по индексам даже на большой базе"""
+    ROWS = 20000
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = Category.objects.bulk_create(
+            Category(name=f'Категория {i}', slug=f'category-{i}') for i in range(20)
+        )
+        holidays = Holiday.objects.bulk_create(
+            Holiday(
+                category=categories[i % 20], title=f'Праздник {i}', slug=f'holiday-{i}',
+                image='', duration='2 часа', description='Описание',
+                min_age=i % 10, max_age=i % 10 + 5, active=i % 7 != 0,
+            )
+            for i in range(2000)
+        )
+        cls.category = categories[3]
+        start = date.today()
+        times = ['10:00-12:00', '12:00-14:00', '14:00-16:00', '16:00-18:00', '18:00-20:00']
+        FullOrder.objects.bulk_create((
+            FullOrder(
+                holiday=holidays[i % 2000], full_name=f'Гость {i}', phone='+7 900 000-00-00',
+                children_count=5, age_of_children='7 лет',
+                selected_date=start + timedelta(days=i // 10), selected_time=times[i // 2 % 5],
+                hall_number=i % 2 + 1, processed=i % 10 != 0,
+            )
+            for i in range(cls.ROWS)
+        ), batch_size=1000)
+        QuickOrder.objects.bulk_create((
+            QuickOrder(holiday=holidays[i % 2000], phone='+7 900 000-00-00', processed=i % 10 != 0)
+            for i in range(cls.ROWS)
+        ), batch_size=1000)
+        TrainingRegistration.objects.bulk_create((
+            TrainingRegistration(
+                parent_name='Родитель', phone='+7 900 000-00-00', child_name='Ребенок',
+                child_age=10, age_group='under_13', processed=i % 10 != 0,
+            )
+            for i in range(cls.ROWS)
+        ), batch_size=1000)
+        Review.objects.bulk_create((
+            Review(name='Гость', text='Отзыв', rating=5, approved=i % 2 == 0)
+            for i in range(cls.ROWS)
+        ), batch_size=1000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def hot_queries(self):
+        today = date.today()
+        week_ago = timezone.now() - timedelta(days=7)
+        return {
+            'слот в пути бронирования': FullOrder.objects.filter(
+                selected_date=today, selected_time='12:00-14:00'),
+            'занятость окна': SlotOccupancy.objects.filter(
+                date__gte=today, date__lte=today + timedelta(days=14), bookings__gt=0),
+            'праздники категории по возрасту': Holiday.objects.filter(
+                active=True, category=self.category, min_age__lte=7, max_age__gte=7),
+            'праздники по возрасту': Holiday.objects.filter(
+                active=True, min_age__lte=7, max_age__gte=7),
+            'отзывы на главной': Review.objects.filter(approved=True)[:20],
+            'необработанные полные заявки': FullOrder.objects.filter(processed=False)[:100],
+            'необработанные быстрые заявки': QuickOrder.objects.filter(processed=False)[:100],
+            'необработанные записи на тренировки': TrainingRegistration.objects.filter(processed=False)[:100],
+            'полные заявки за неделю': FullOrder.objects.filter(created_at__gte=week_ago),
+            'быстрые заявки за неделю': QuickOrder.objects.filter(created_at__gte=week_ago),
+            'записи на тренировки за неделю': TrainingRegistration.objects.filter(created_at__gte=week_ago),
+        }
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertIsNone(profiling.FULL_SCAN.search(plan), f'Полный проход таблицы:\n{plan}')
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Профиль страниц, API и списков админки в процессе: запросы, время базы и
+    рендера, пик памяти. Бюджет - (запросов, мс базы, мс рендера, КБ); число
+    запросов не должно расти с числом строк, время и память - с большим
+    запасом, чтобы ловить порядок, а не шум.
+    """
+    # Холодный запрос (кеши сброшены): (мс базы, мс рендера, КБ)
+    PAGE = (100, 400, 4096)
+    API = (100, 200, 2048)
+    FORM = (50, 50, 1024)
+    CHANGELIST = (100, 600, 8192)
+    PUBLIC_BUDGETS = {
+        '/': (4, *PAGE),
+        '/holidays/': (2, *PAGE),
+        '/holidays/?age=7': (4, *PAGE),
+        '/holidays/category/category-0/': (3, *PAGE),
+        '/holiday/holiday-0/': (1, 20, 200, 2048),
+        '/achievements/': (2, *PAGE),
+        '/trainings/': (4, *PAGE),
+        '/about/': (4, *PAGE),
+        '/api/achievements/': (6, *API),
+        '/api/reviews/?{reviews_cursor}': (6, *API),
+        # Холодный API доступности читает еще залы и шаблоны слотов (потом они в кеше)
+        '/api/get-available-dates/{holiday}/': (6, *API),
+        '/api/v2/availability/{holiday}/': (6, *API),
+        '/api/availability-stream/': (0, *API),
+    }
+    FORM_BUDGETS = {
+        '/api/create-quick-order/': (1, *FORM),
+        '/api/create-review/': (0, *FORM),
+        '/api/register-training/': (0, *FORM),
+        '/api/create-full-order/': (9, *FORM),
+    }
+    ADMIN_BUDGETS = {
+        'category': (5, *CHANGELIST),
+        'holiday': (6, *CHANGELIST),
+        'achievement': (6, *CHANGELIST),
+        'review': (6, *CHANGELIST),
+        'quickorder': (5, *CHANGELIST),
+        'fullorder': (6, *CHANGELIST),
+        'hall': (6, *CHANGELIST),
+        'slottemplate': (6, *CHANGELIST),
+        'trainingregistration': (5, *CHANGELIST),
+        'archivedquickorder': (6, *CHANGELIST),
+        'archivedfullorder': (6, *CHANGELIST),
+        'archivedtrainingregistration': (6, *CHANGELIST),
+    }
+    # Справочники из нескольких строк читаются целиком
+    SMALL_TABLES = ('partizan_hall', 'partizan_slottemplate')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = [
+            Category.objects.create(name=f'Категория {i}', slug=f'category-{i}') for i in range(3)
+        ]
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.add_rows(0, 5)
+        # Больше страницы отзывов: у API есть курсор следующей
+        Review.objects.bulk_create(
+            Review(name=f'Гость {i}', text='Отлично', rating=5, approved=True) for i in range(15)
+        )
+        ratings.rebuild()
+
+    @classmethod
+    def add_rows(cls, start, count):
+        for i in range(start, start + count):
+            holiday = Holiday.objects.create(
+                category=cls.categories[i % 3], title=f'Праздник {i}', slug=f'holiday-{i}',
+                image='', duration='2 часа', description='Описание',
+            )
+            Achievement.objects.create(
+                title=f'Достижение {i}', description='Финал', date=date.today(), place=1, city='Ульяновск',
+            )
+            Review.objects.create(name=f'Гость {i}', text='Отлично', rating=5, approved=True)
+            QuickOrder.objects.create(holiday=holiday, phone='+7 900 000-00-00')
+            FullOrder.objects.create(
+                holiday=holiday, full_name=f'Гость {i}', phone='+7 900 000-00-00',
+                children_count=5, age_of_children='7 лет',
+                selected_date=date.today() + timedelta(days=i), selected_time='12:00-14:00',
+            )
+            TrainingRegistration.objects.create(
+                parent_name='Родитель', phone='+7 900 000-00-00', child_name='Ребенок',
+                child_age=10, age_group='under_13',
+            )
+
+    def setUp(self):
+        spool_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(PARTIZAN_SPOOL_DIR=Path(spool_dir), PARTIZAN_SPOOL_WORKER=False))
+        self.slot_date = next_weekday(0)
+
+    def url(self, url):
+        return url.format(
+            holiday=Holiday.objects.get(slug='holiday-0').id,
+            reviews_cursor=urlencode({'cursor': reviews.reviews_page()[1]}),
+        )
+
+    def form(self, url):
+        holiday = Holiday.objects.get(slug='holiday-0').id
+        return {
+            '/api/create-quick-order/': {'holiday_id': holiday, 'phone': '+7 900 000-00-01'},
+            '/api/create-review/': {'name': 'Анна', 'text': 'Отлично', 'rating': 5},
+            '/api/register-training/': {
+                'parent_name': 'Родитель', 'phone': '+7 900 000-00-02', 'child_name': 'Ребенок',
+                'age': '10', 'age_group': 'under_13',
+            },
+            '/api/create-full-order/': {
+                'full_name': 'Гость', 'phone': '+7 900 000-00-03', 'children_count': 5,
+                'age_of_children': '7 лет', 'holiday_id': holiday,
+                'selected_date': self.slot_date.isoformat(), 'selected_time': '13:00-15:00',
+            },
+        }[url]
+
+    def measure(self, name, data=None):
+        url = self.url(name)
+        cache.clear()
+        with profiling.profile() as result:
+            response = self.client.get(url) if data is None else self.client.post(url, data)
+        self.assertLess(response.status_code, 400, url)
+        return result
+
+    def assert_within(self, name, result, budget):
+        queries, db_ms, render_ms, peak_kb = budget
+        report = f'{name}: {result.as_dict()}'
+        self.assertLessEqual(result.query_count, queries, report)
+        self.assertLessEqual(result.db_ms, db_ms, report)
+        self.assertLessEqual(result.render_ms, render_ms, report)
+        self.assertLessEqual(result.peak_kb, peak_kb, report)
+
+    def assert_budget(self, budgets, url_for):
+        results = {name: self.measure(url_for(name)) for name in budgets}
+        # Вдвое больше строк не должно давать ни одного лишнего запроса
+        self.add_rows(5, 5)
+        for name, budget in budgets.items():
+            with self.subTest(name):
+                self.assert_within(name, results[name], budget)
+                result = self.measure(url_for(name))
+                self.assert_within(name, result, budget)
+                self.assertEqual(result.query_count, results[name].query_count, result.as_dict())
+
+    def test_public_views(self):
+        self.assert_budget(self.PUBLIC_BUDGETS, lambda url: url)
+
+    def test_forms(self):
+        for url, budget in self.FORM_BUDGETS.items():
+            with self.subTest(url):
+                self.assert_within(url, self.measure(url, self.form(url)), budget)
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin)
+        self.assert_budget(self.ADMIN_BUDGETS, lambda model: f'/admin/partizan/{model}/')
+
+    def test_booking_path_hard_budget(self):
+        """Бронирование: ровно столько запросов и ни одного полного прохода по таблицам заявок"""
+        url = '/api/create-full-order/'
+        result = self.measure(url, self.form(url))
+        self.assertTrue(FullOrder.objects.filter(selected_date=self.slot_date).exists())
+        self.assert_within(url, result, self.FORM_BUDGETS[url])
+        self.assertEqual(result.query_count, self.FORM_BUDGETS[url][0], result.as_dict())
+        self.assertEqual(profiling.full_scans(result.queries, self.SMALL_TABLES), [])
+
+    def test_holiday_detail_hard_budget(self):
+        url = '/holiday/holiday-0/'
+        result = self.measure(url)
+        self.assert_within(url, result, self.PUBLIC_BUDGETS[url])
+        self.assertEqual(result.query_count, self.PUBLIC_BUDGETS[url][0], result.as_dict())
+        self.assertEqual(profiling.full_scans(result.queries, self.SMALL_TABLES), [])
+
+
+class AchievementGalleryTests(TestCase):
+    """Галерея достижений: фильтры на сервере и страницы по курсору"""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        for i in range(30):
+            Achievement.objects.create(
+                title=f'Достижение {i}', description='Финал', date=today - timedelta(days=i // 3),
+                order=i % 3, place=i % 2 + 1, city='Ульяновск' if i % 3 else 'Самара',
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, **filters):
+        response = self.client.get('/achievements/', filters)
+        titles = re.findall(r'achievement-title">([^<]+)<', response.content.decode())
+        cursor = response.context['next_cursor']
+        while cursor:
+            data = self.client.get('/api/achievements/', {**filters, 'cursor': cursor}).json()
+            titles += re.findall(r'achievement-title">([^<]+)<', data['html'])
+            cursor = data['next']
+        return titles
+
+    def expected(self, **filters):
+        queryset = Achievement.objects.filter(**filters).order_by('-date', 'order', 'id')
+        return list(queryset.values_list('title', flat=True))
+
+    def test_first_render_is_one_page(self):
+        response = self.client.get('/achievements/')
+        self.assertEqual(len(response.context['achievements']), gallery.PAGE_SIZE)
+        self.assertIsNotNone(response.context['next_cursor'])
+
+    def test_pages_cover_gallery_in_order(self):
+        self.assertEqual(self.walk(), self.expected())
+
+    def test_filters_apply_to_every_page(self):
+        self.assertEqual(self.walk(place=1, city='Ульяновск'), self.expected(place=1, city='Ульяновск'))
+
+    def test_bad_cursor(self):
+        self.assertEqual(self.client.get('/api/achievements/', {'cursor': 'abc'}).status_code, 400)
+
+
+class RatingSummaryTests(TestCase):
+    """Сводка оценок меняется приращениями и совпадает с пересчетом"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+        self.reviews = [
+            Review.objects.create(name=f'Гость {i}', text='Отзыв', rating=rating)
+            for i, rating in enumerate([5, 5, 4, 3, 5])
+        ]
+
+    def approve(self, reviews):
+        self.client.post('/admin/partizan/review/', {
+            'action': 'approve_reviews',
+            '_selected_action': [review.pk for review in reviews],
+        })
+
+    def assert_summary(self, histogram):
+        summary = ratings.get_summary()
+        self.assertEqual(summary.histogram(), {**{r: 0 for r in range(5, 0, -1)}, **histogram})
+        self.assertEqual(summary.count, sum(histogram.values()))
+        ratings.rebuild()
+        self.assertEqual(ratings.get_summary().histogram(), summary.histogram())
+
+    def test_approve_counts_each_review_once(self):
+        self.approve(self.reviews[:3])
+        self.assert_summary({5: 2, 4: 1})
+        self.approve(self.reviews)
+        self.assert_summary({5: 3, 4: 1, 3: 1})
+        self.assertEqual(ratings.get_summary().average, 4.4)
+
+    def test_delete_and_edit(self):
+        self.approve(self.reviews)
+        for review in self.reviews:
+            review.refresh_from_db()
+        self.reviews[0].delete()
+        self.reviews[2].rating = 1
+        self.reviews[2].save()
+        self.reviews[3].approved = False
+        self.reviews[3].save()
+        self.assert_summary({5: 2, 1: 1})
+
+    def test_home_page_shows_recent_slice_and_api_pages_the_rest(self):
+        Review.objects.bulk_create(
+            Review(name=f'Автор {i}', text='Отзыв', rating=5, approved=True) for i in range(25)
+        )
+        response = self.client.get('/')
+        self.assertEqual(len(response.context['reviews']), reviews.PAGE_SIZE)
+        names = [review.name for review in response.context['reviews']]
+        cursor = response.context['reviews_next']
+        while cursor:
+            data = self.client.get('/api/reviews/', {'cursor': cursor}).json()
+            names += re.findall(r'home-review-name">([^<]+)<', data['html'])
+            cursor = data['next']
+        self.assertEqual(sorted(names), sorted(f'Автор {i}' for i in range(25)))
+
+
+class SpoolTests(TestCase):
+    """Очередь приема заявок: ответ без записи в базу, перенос и восстановление"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        override = override_settings(
+            PARTIZAN_SPOOL_DIR=self.directory, PARTIZAN_SPOOL_WORKER=False, PARTIZAN_SPOOL_FSYNC=False,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        category = Category.objects.create(name='Дни рождения', slug='birthdays')
+        self.holiday = Holiday.objects.create(
+            category=category, title='Пираты', slug='pirates', image='', duration='2 часа', description='Описание',
+        )
+
+    def post_forms(self):
+        self.client.post('/api/create-quick-order/', {'holiday_id': self.holiday.id, 'phone': '+7 900 000-00-01'})
+        self.client.post('/api/register-training/', {
+            'parent_name': 'Родитель', 'phone': '+7 900 000-00-02', 'child_name': 'Ребенок',
+            'age': '10', 'age_group': 'under_13',
+        })
+        self.client.post('/api/create-review/', {'name': 'Анна', 'text': 'Отлично', 'rating': 5})
+
+    def test_forms_are_spooled_then_drained(self):
+        self.post_forms()
+        self.assertFalse(QuickOrder.objects.exists())
+        self.assertEqual(spool.status()['depth'], 3)
+
+        self.assertEqual(spool.drain(), 3)
+        self.assertEqual(QuickOrder.objects.get().phone, '+7 900 000-00-01')
+        self.assertEqual(TrainingRegistration.objects.get().child_age, 10)
+        self.assertEqual(Review.objects.get().rating, 5)
+        self.assertEqual(spool.status(), {'depth': 0, 'segments': 0, 'lag_seconds': 0.0, 'rejected': 0})
+
+    def test_committed_segment_is_not_drained_twice(self):
+        self.post_forms()
+        spool.drain()
+        # Сбой после commit: файл сегмента остался на диске
+        segment = self.directory / 'draining-1-1.jsonl'
+        segment.write_text(json.dumps({
+            'id': 'x', 'model': 'quickorder', 'ts': 0,
+            'fields': {'holiday_id': self.holiday.id, 'phone': '+7 900 000-00-09'},
+        }) + '\n')
+        SpoolSegment.objects.create(name=segment.name, records=1)
+        self.assertEqual(spool.drain(), 0)
+        self.assertFalse(segment.exists())
+        self.assertEqual(QuickOrder.objects.count(), 1)
+
+    def test_torn_and_invalid_records_are_set_aside(self):
+        spool.enqueue('quickorder', {'holiday_id': self.holiday.id, 'phone': '+7 900 000-00-01'})
+        spool.enqueue('quickorder', {'holiday_id': 999999, 'phone': '+7 900 000-00-02'})
+        with open(self.directory / spool.INCOMING_NAME, 'a') as incoming:
+            incoming.write('{"id": "torn", "model": "quickor')
+        self.assertEqual(spool.drain(), 1)
+        self.assertEqual(QuickOrder.objects.get().phone, '+7 900 000-00-01')
+        self.assertEqual(spool.status()['rejected'], 2)
+
+    def test_created_at_is_submission_time(self):
+        submitted = timezone.now() - timedelta(hours=3)
+        with mock.patch.object(spool.time, 'time', return_value=submitted.timestamp()):
+            self.post_forms()
+        spool.drain()
+        for model in (QuickOrder, TrainingRegistration, Review):
+            with self.subTest(model.__name__):
+                self.assertEqual(model.objects.get().created_at, submitted)
+
+    def test_rejected_lines_are_kept_if_writing_them_fails(self):
+        spool.enqueue('quickorder', {'holiday_id': self.holiday.id, 'phone': '+7 900 000-00-01'})
+        with open(self.directory / spool.INCOMING_NAME, 'a') as incoming:
+            incoming.write('не json\n')
+        # Сбой при записи отложенных строк откатывает и перенос сегмента
+        with mock.patch.object(spool, '_reject', side_effect=OSError('Нет места')):
+            with self.assertRaises(OSError):
+                spool.drain()
+        self.assertFalse(SpoolSegment.objects.exists())
+        self.assertEqual(spool.drain(), 1)
+        self.assertEqual(QuickOrder.objects.count(), 1)
+        self.assertEqual(spool.status()['rejected'], 1)
+
+
+@override_settings(PARTIZAN_NOTIFY_WORKER=False, PARTIZAN_SPOOL_WORKER=False, PARTIZAN_SPOOL_FSYNC=False)
+class NotificationTests(TestCase):
+    """Уведомления персонала: вне запроса, пачками, с повторами"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(PARTIZAN_SPOOL_DIR=Path(directory.name))
+        override.enable()
+        self.addCleanup(override.disable)
+        category = Category.objects.create(name='Дни рождения', slug='birthdays')
+        self.holiday = Holiday.objects.create(
+            category=category, title='Пираты', slug='pirates', image='', duration='2 часа', description='Описание',
+        )
+
+    def use_sinks(self, *sinks):
+        dispatcher = notifications.Dispatcher(sinks=list(sinks), backoff=0)
+        patcher = mock.patch.object(notifications, 'notify', dispatcher.notify)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return dispatcher
+
+    def create_orders(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            FullOrder.objects.create(
+                holiday=self.holiday, full_name='Иванов', phone='+7 900 000-00-01', children_count=5,
+                age_of_children='7', selected_date=date.today(), selected_time='12:00',
+            )
+        self.client.post('/api/create-quick-order/', {'holiday_id': self.holiday.id, 'phone': '+7 900 000-00-02'})
+        self.client.post('/api/register-training/', {
+            'parent_name': 'Родитель', 'phone': '+7 900 000-00-03', 'child_name': 'Ребенок',
+            'age': '10', 'age_group': 'under_13',
+        })
+        # Заявки из очереди приема уведомляются после переноса в базу
+        with self.captureOnCommitCallbacks(execute=True):
+            spool.drain()
+
+    def test_burst_is_sent_as_one_batch_outside_the_request(self):
+        sink = notifications.FakeSink()
+        dispatcher = self.use_sinks(sink)
+        self.create_orders()
+        self.assertEqual(sink.attempts, 0)
+
+        dispatcher.flush()
+        self.assertEqual(len(sink.batches), 1)
+        self.assertEqual(
+            sorted(event['kind'] for event in sink.batches[0]),
+            ['fullorder', 'quickorder', 'trainingregistration'],
+        )
+        self.assertEqual(notifications.format_subject(sink.batches[0]), 'Новые заявки: 3')
+
+    def test_failing_sink_is_retried_without_affecting_others(self):
+        flaky, healthy = notifications.FakeSink(fail_times=2), notifications.FakeSink()
+        dispatcher = self.use_sinks(flaky, healthy)
+        self.create_orders()
+        dispatcher.flush()
+        self.assertEqual(flaky.attempts, 3)
+        self.assertEqual(len(flaky.batches[0]), 3)
+        self.assertEqual(healthy.attempts, 1)
+
+    def test_file_sink_writes_a_line_per_batch(self):
+        path = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'notifications.jsonl'
+        dispatcher = self.use_sinks(notifications.FileSink(path))
+        self.create_orders()
+        dispatcher.flush()
+        [line] = path.read_text(encoding='utf-8').splitlines()
+        self.assertEqual(len(json.loads(line)['events']), 3)
+
+
+class ExportTests(TestCase):
+    """Выгрузка заявок: колонки list_display, поток и постоянное число запросов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Дни рождения', slug='birthdays')
+        holiday = Holiday.objects.create(
+            category=category, title='Пираты', slug='pirates', image='', duration='2 часа', description='Описание',
+        )
+        for i in range(5):
+            FullOrder.objects.create(
+                holiday=holiday, full_name=f'Иванов {i}', phone='+7 900 000-00-01', children_count=i + 1,
+                age_of_children='7', selected_date=date(2030, 1, 1), selected_time=f'1{i}:00',
+            )
+        TrainingRegistration.objects.create(
+            parent_name='Родитель', phone='+7 900 000-00-02', child_name='Ребенок', child_age=10,
+            age_group='under_13', visit_type='single',
+        )
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def test_admin_action_streams_filtered_changelist_as_csv(self):
+        self.client.force_login(self.admin)
+        response = self.client.post('/admin/partizan/fullorder/', {
+            'action': 'export_csv', 'select_across': '1', 'index': '0',
+            '_selected_action': FullOrder.objects.values_list('pk', flat=True)[:1],
+        })
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(lines[0].split(';')[:3], ['ФИО', 'Телефон', 'Праздник'])
+        self.assertIn('Пираты;01.01.2030;14:00;5;7;', lines[1])
+        self.assertTrue(lines[1].endswith(';Нет'))
+
+    def test_rows_are_read_with_one_query(self):
+        model_admin = admin.site.get_model_admin(FullOrder)
+        with self.assertNumQueries(1):
+            data = b''.join(exports.stream(model_admin, FullOrder.objects.all(), 'xlsx'))
+        with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+            self.assertIsNone(workbook.testzip())
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(sheet.count('<row>'), 6)
+        self.assertIn('<c t="n"><v>5</v></c>', sheet)
+
+    def test_xlsx_drops_characters_illegal_in_xml(self):
+        data = b''.join(exports.xlsx_stream(['Примечания'], [['строка\x0bвторая\x00 <&>']]))
+        with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+            sheet = ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+        cells = [cell.text for cell in sheet.iter('{http://schemas.openxmlformats.org/spreadsheetml/2006/main}t')]
+        self.assertEqual(cells, ['Примечания', 'строкавторая <&>'])
+
+    def test_command_exports_choice_labels(self):
+        path = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'training.csv'
+        call_command('export_orders', 'trainingregistration', '--unprocessed', '--output', str(path), stderr=io.StringIO())
+        header, row = path.read_text(encoding='utf-8-sig').splitlines()
+        self.assertEqual(row.split(';')[3:5], ['Дети до 13 лет', 'Разовое посещение (700 ₽)'])
+
+
+class LoadTestHarnessTests(LiveServerTestCase):
+    """Короткий прогон нагрузочного теста против тестового сервера"""
+    serialized_rollback = True
+
+    @classmethod
+    def setUpClass(cls):
+        # Запросы сервера могут пережить тест: очередь заявок - во временном
+        # каталоге до остановки сервера, а не в spool/ проекта
+        spool_dir = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(PARTIZAN_SPOOL_DIR=Path(spool_dir), PARTIZAN_SPOOL_WORKER=False))
+        super().setUpClass()
+
+    def setUp(self):
+        category = Category.objects.create(name='Дни рождения', slug='birthdays')
+        for i in range(3):
+            Holiday.objects.create(
+                category=category, title=f'Праздник {i}', slug=f'holiday-{i}', image='',
+                duration='2 часа', description='Описание',
+            )
+
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile([7], 95), 7)
+
+    def test_mixed_traffic_is_reported_per_endpoint(self):
+        result = loadtest.run(self.live_server_url, duration=1.0, concurrency=2, burst_size=0)
+        self.assertEqual(result['totals']['errors'], 0, result['endpoints'])
+        self.assertGreater(result['totals']['requests'], 0)
+        for item in result['endpoints'].values():
+            self.assertLessEqual(item['p50_ms'], item['p95_ms'])
+            self.assertLessEqual(item['p95_ms'], item['p99_ms'])
+        json.dumps(result)
+
+
+class GenerateDataTests(TestCase):
+    """Синтетические данные: объемы, даты, производные таблицы и воспроизводимость"""
+
+    def setUp(self):
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+
+    def generate(self):
+        call_command(
+            'generate_data', '--seed', '7', '--categories', '2', '--holidays', '20', '--achievements', '10',
+            '--reviews', '15', '--full-orders', '60', '--quick-orders', '40', '--trainings', '30', '--images', '2',
+            stdout=io.StringIO(),
+        )
+        return (
+            list(Holiday.objects.order_by('pk').values_list('title', 'image', 'duration')),
+            list(FullOrder.objects.order_by('pk').values_list('selected_date', 'selected_time', 'hall_number', 'phone')),
+            list(QuickOrder.objects.order_by('pk').values_list('phone', flat=True)),
+        )
+
+    def test_counts_dates_and_derived_tables(self):
+        self.generate()
+        self.assertEqual(Holiday.objects.count(), 20)
+        self.assertEqual(FullOrder.objects.count(), 60)
+        self.assertEqual(TrainingRegistration.objects.count(), 30)
+        self.assertEqual(SlotOccupancy.objects.aggregate(total=Sum('bookings'))['total'], 60)
+        self.assertEqual(ratings.get_summary().count, Review.objects.filter(approved=True).count())
+        # Даты заявок заданы генератором, а не auto_now_add
+        self.assertLess(QuickOrder.objects.earliest('created_at').created_at, timezone.now() - timedelta(days=30))
+
+    def test_same_seed_gives_same_data(self):
+        first = self.generate()
+        Holiday.objects.all().delete()
+        self.assertEqual(self.generate(), first)
+
+
+class ArchiveTests(TestCase):
+    """Перенос старых заявок в архив: критерии, пачки, повторный запуск и админка"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Дни рождения', slug='birthdays')
+        cls.holiday = Holiday.objects.create(
+            category=category, title='Пираты', slug='pirates', image='', duration='2 часа', description='Описание',
+        )
+        today = date.today()
+        for i, days in enumerate((-3, -2, -1, 0, 5)):
+            FullOrder.objects.create(
+                holiday=cls.holiday, full_name=f'Гость {i}', phone='+7 900 000-00-01', children_count=5,
+                age_of_children='7', selected_date=today + timedelta(days=days), selected_time='13:00-15:00',
+            )
+        old = timezone.now() - timedelta(days=archive.PROCESSED_RETENTION_DAYS + 1)
+        for processed in (True, False):
+            order = QuickOrder.objects.create(holiday=cls.holiday, phone='+7 900 000-00-02', processed=processed)
+            QuickOrder.objects.filter(pk=order.pk).update(created_at=old)
+        QuickOrder.objects.create(holiday=cls.holiday, phone='+7 900 000-00-03', processed=True)
+        registration = TrainingRegistration.objects.create(
+            parent_name='Родитель', phone='+7 900 000-00-04', child_name='Ребенок', child_age=10,
+            age_group='under_13', visit_type='single', processed=True,
+        )
+        TrainingRegistration.objects.filter(pk=registration.pk).update(created_at=old)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def test_moves_only_old_rows_and_keeps_ids(self):
+        past = list(FullOrder.objects.filter(selected_date__lt=date.today()).values_list('pk', 'created_at'))
+        call_command('archive_orders', '--batch-size', '2', stdout=io.StringIO())
+
+        self.assertEqual(FullOrder.objects.count(), 2)
+        self.assertEqual(sorted(ArchivedFullOrder.objects.values_list('pk', 'created_at')), sorted(past))
+        self.assertEqual(QuickOrder.objects.count(), 2)
+        self.assertEqual(ArchivedQuickOrder.objects.get().processed, True)
+        self.assertEqual(TrainingRegistration.objects.count(), 0)
+        self.assertEqual(ArchivedTrainingRegistration.objects.get().child_name, 'Ребенок')
+        self.assertFalse(SlotOccupancy.objects.filter(date__lt=date.today()).exists())
+        self.assertTrue(SlotOccupancy.objects.filter(date=date.today(), bookings=1).exists())
+
+    def test_interrupted_run_resumes(self):
+        self.assertEqual(archive.run(batch_size=1, max_batches=1)['fullorder'], 1)
+        # Копия строки уже в архиве, но рабочая таблица осталась (сбой до delete)
+        order = FullOrder.objects.filter(selected_date__lt=date.today()).earliest('pk')
+        ArchivedFullOrder.objects.create(**{
+            field.attname: getattr(order, field.attname) for field in FullOrder._meta.concrete_fields
+        })
+        archive.run(batch_size=1)
+        self.assertEqual(ArchivedFullOrder.objects.count(), 3)
+        self.assertFalse(archive.archivable(FullOrder).exists())
+
+    def test_dry_run_changes_nothing(self):
+        output = io.StringIO()
+        call_command('archive_orders', '--dry-run', stdout=output)
+        self.assertIn('3 к переносу', output.getvalue())
+        self.assertFalse(ArchivedFullOrder.objects.exists())
+
+    def test_archive_is_read_only_in_admin(self):
+        archive.run()
+        self.client.force_login(self.admin)
+        response = self.client.get('/admin/partizan/archivedfullorder/')
+        self.assertContains(response, 'Гость 0')
+        self.assertNotContains(response, 'archivedfullorder/add/')
+        order = ArchivedFullOrder.objects.earliest('pk')
+        response = self.client.post(f'/admin/partizan/archivedfullorder/{order.pk}/change/', {'full_name': 'Другой'})
+        self.assertEqual(response.status_code, 403)
+
+
+class DatabaseProfileTests(TestCase):
+    """Профили базы из окружения: настройки и PRAGMA на новом соединении"""
+
+    def test_profiles_from_environ(self):
+        base_dir = Path('/srv/partizan')
+        self.assertEqual(database.from_environ({}, base_dir), {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': base_dir / 'db.sqlite3',
+        })
+        production = database.from_environ({'DB_PROFILE': 'postgres', 'POSTGRES_DB': 'partizan'}, base_dir)
+        self.assertEqual(production['CONN_MAX_AGE'], database.CONN_MAX_AGE)
+        self.assertTrue(production['CONN_HEALTH_CHECKS'])
+        with self.assertRaises(ImproperlyConfigured):
+            database.from_environ({'DB_PROFILE': 'postgres'}, base_dir)
+        with self.assertRaises(ImproperlyConfigured):
+            database.from_environ({'DB_PROFILE': 'mysql'}, base_dir)
+
+    def test_sqlite_profile_tunes_each_connection(self):
+        path = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'db.sqlite3'
+        connections = ConnectionHandler({'default': database.from_environ(
+            {'DB_PROFILE': 'sqlite', 'SQLITE_PATH': str(path)}, None,
+        )})
+        tuned = connections['default']
+        try:
+            with tuned.cursor() as cursor:
+                pragmas = {
+                    name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size')
+                }
+        finally:
+            tuned.close()
+        self.assertEqual(pragmas, {
+            'journal_mode': 'wal', 'synchronous': 1,
+            'busy_timeout': database.SQLITE_TIMEOUT * 1000,
+            'cache_size': database.SQLITE_PRAGMAS['cache_size'],
+        })
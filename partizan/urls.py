@@ -1,15 +1,20 @@
 from django.urls import path
 from . import views
+from .page_cache import cache_anonymous_page
 
 urlpatterns = [
-    path('', views.HomeView.as_view(), name='home'),
-    path('achievements/', views.AchievementsView.as_view(), name='achievements'),
+    path('', cache_anonymous_page(views.HomeView.as_view()), name='home'),
+    path('achievements/', cache_anonymous_page(views.AchievementsView.as_view()), name='achievements'),
     path('trainings/', views.TrainingsView.as_view(), name='trainings'),
     path('about/', views.AboutView.as_view(), name='about'),
-    path('holidays/', views.HolidaysView.as_view(), name='holidays'),
-    path('holidays/category/<slug:category_slug>/', views.HolidaysView.as_view(), name='holidays_by_category'),
-    path('holiday/<slug:holiday_slug>/', views.HolidayDetailView.as_view(), name='holiday_detail'),
+    path('holidays/', cache_anonymous_page(views.HolidaysView.as_view()), name='holidays'),
+    path('holidays/category/<slug:category_slug>/', cache_anonymous_page(views.HolidaysView.as_view()), name='holidays_by_category'),
+    path('holiday/<slug:holiday_slug>/', cache_anonymous_page(views.HolidayDetailView.as_view()), name='holiday_detail'),
     path('api/get-available-dates/<int:holiday_id>/', views.get_available_dates, name='get_available_dates'),
+    path('api/v2/availability/<int:holiday_id>/', views.availability, name='availability'),
+    path('api/availability-stream/', views.availability_stream, name='availability_stream'),
+    path('api/achievements/', views.achievements_page, name='achievements_page'),
+    path('api/reviews/', views.reviews_page, name='reviews_page'),
     path('api/create-quick-order/', views.create_quick_order, name='create_quick_order'),
     path('api/create-full-order/', views.create_full_order, name='create_full_order'),
     path('api/create-review/', views.create_review, name='create_review'),
@@ -1,10 +1,14 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.generic import ListView, DetailView, TemplateView
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from datetime import date, timedelta, datetime
-import json
+import hashlib
 import traceback
 
 from .models import (
@@ -12,6 +16,12 @@ from .models import (
     QuickOrder, FullOrder, Review, TrainingRegistration
 )
 from .forms import QuickOrderForm, FullOrderForm, ReviewForm
+from .availability import calendar_slots, find_slot
+from .booking import reserve_slot
+from .context_processors import get_categories
+from . import content_cache, gallery, ratings, reviews, schedule, spool
+from .feed import event_stream
+from .occupancy import booking_window, get_booked_slots, last_booking_change
 
 class HomeView(TemplateView):
     """Главная страница"""
@@ -20,22 +30,73 @@ class HomeView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         try:
-            context['achievements'] = Achievement.objects.all()[:3]
-            context['holidays'] = Holiday.objects.filter(active=True)[:3]
-            context['reviews'] = Review.objects.filter(approved=True)
+            context['achievements'] = content_cache.cached_query(
+                'home_achievements', [content_cache.ACHIEVEMENTS],
+                lambda: Achievement.objects.all()[:3],
+            )
+            context['holidays'] = content_cache.cached_query(
+                'home_holidays', [content_cache.HOLIDAYS],
+                lambda: Holiday.objects.filter(active=True)[:3],
+            )
+            # Последние отзывы; остальные слайдер догружает через API
+            context['reviews'], context['reviews_next'] = reviews.reviews_page()
+            context['rating'] = ratings.get_summary()
+            # Версии для ключей фрагментов шаблона
+            context['achievements_version'] = content_cache.versions(content_cache.ACHIEVEMENTS)
+            context['holidays_version'] = content_cache.versions(content_cache.HOLIDAYS)
+            context['reviews_version'] = content_cache.versions(content_cache.REVIEWS)
         except Exception as e:
             print(f"Ошибка в HomeView: {e}")
             context['achievements'] = []
             context['holidays'] = []
             context['reviews'] = []
+            context['reviews_next'] = None
         return context
 
 class AchievementsView(ListView):
-    """Страница достижений"""
+    """Страница достижений: первая страница галереи, остальное догружает скрипт"""
     model = Achievement
     template_name = 'achievements.html'
     context_object_name = 'achievements'
-    ordering = ['-date']
+    
+    def get_queryset(self):
+        self.place, self.city = gallery.parse_filters(self.request.GET)
+        # Курсор в адресе - кнопка "Показать еще" без JavaScript
+        cursor = gallery.decode_cursor(self.request.GET.get('cursor'))
+        items, self.next_cursor = gallery.achievements_page(self.place, self.city, cursor)
+        return items
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['content_version'] = content_cache.versions(content_cache.ACHIEVEMENTS)
+        context['next_cursor'] = self.next_cursor
+        context['places'] = Achievement.PLACE_CHOICES
+        context['cities'] = gallery.cities()
+        context['selected_place'] = self.place
+        context['selected_city'] = self.city
+        context['filtered'] = self.place is not None or self.city is not None
+        return context
+
+def reviews_page(request):
+    """API следующей страницы отзывов для слайдера на главной"""
+    cursor = reviews.decode_cursor(request.GET.get('cursor'))
+    if cursor is None:
+        return JsonResponse({'success': False, 'message': 'Некорректный курсор'}, status=400)
+    
+    items, next_cursor = reviews.reviews_page(cursor)
+    html = render_to_string('partials/review_slides.html', {'reviews': items}, request)
+    return JsonResponse({'html': html, 'next': next_cursor})
+
+def achievements_page(request):
+    """API следующей страницы галереи: готовые карточки и курсор для бесконечной прокрутки"""
+    cursor = request.GET.get('cursor')
+    if cursor and gallery.decode_cursor(cursor) is None:
+        return JsonResponse({'success': False, 'message': 'Некорректный курсор'}, status=400)
+    
+    place, city = gallery.parse_filters(request.GET)
+    items, next_cursor = gallery.achievements_page(place, city, gallery.decode_cursor(cursor))
+    html = render_to_string('partials/achievement_cards.html', {'achievements': items}, request)
+    return JsonResponse({'html': html, 'next': next_cursor})
 
 class TrainingsView(TemplateView):
     """Страница тренировок"""
@@ -52,23 +113,32 @@ class HolidaysView(ListView):
     context_object_name = 'holidays'
     
     def get_queryset(self):
-        queryset = Holiday.objects.filter(active=True)
-        
         category_slug = self.kwargs.get('category_slug')
-        if category_slug:
-            category = get_object_or_404(Category, slug=category_slug)
-            queryset = queryset.filter(category=category)
-        
         age = self.request.GET.get('age')
-        if age and age.isdigit():
-            age = int(age)
-            queryset = queryset.filter(min_age__lte=age, max_age__gte=age)
+        age = int(age) if age and age.isdigit() else None
         
-        return queryset
+        def build():
+            queryset = Holiday.objects.filter(active=True).select_related('category')
+            if category_slug:
+                category = get_object_or_404(Category, slug=category_slug)
+                queryset = queryset.filter(category=category)
+            if age is not None:
+                queryset = queryset.filter(min_age__lte=age, max_age__gte=age)
+            return queryset
+        
+        # Несуществующая категория дает 404 до записи в кеш
+        return content_cache.cached_query(
+            f'holidays:{category_slug or "all"}:{age if age is not None else "any"}',
+            [content_cache.HOLIDAYS, content_cache.CATEGORIES],
+            build,
+        )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
+        context['categories'] = get_categories()
+        context['content_version'] = content_cache.versions(
+            content_cache.HOLIDAYS, content_cache.CATEGORIES
+        )
         
         age = self.request.GET.get('age')
         if age and age.isdigit():
@@ -81,6 +151,8 @@ class HolidayDetailView(DetailView):
     template_name = 'holiday_detail.html'
     context_object_name = 'holiday'
     slug_url_kwarg = 'holiday_slug'
+    # Название категории выводится на странице
+    queryset = Holiday.objects.select_related('category')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -88,27 +160,11 @@ class HolidayDetailView(DetailView):
         
         # Данные для календаря
         context['holiday_duration'] = holiday.duration
-        context['today'] = date.today().isoformat()
-        context['two_weeks'] = (date.today() + timedelta(days=14)).isoformat()
+        today, two_weeks = booking_window()
+        context['today'] = today.isoformat()
+        context['two_weeks'] = two_weeks.isoformat()
         
-        # Получаем все заявки (они же занятые слоты) на будущие даты
-        all_bookings = FullOrder.objects.filter(
-            selected_date__gte=date.today()
-        ).values('selected_date', 'selected_time')
-        
-        # Создаем словарь с информацией о доступности
-        availability = {}
-        
-        for booking in all_bookings:
-            date_str = booking['selected_date'].isoformat()
-            if date_str not in availability:
-                availability[date_str] = {}
-            
-            time_slot = booking['selected_time']
-            availability[date_str][time_slot] = availability[date_str].get(time_slot, 0) + 1
-        
-        # Добавляем информацию для JS
-        context['booked_slots_json'] = json.dumps(availability)
+        # Слоты календаря скрипт страницы загружает из API доступности
         context['quick_form'] = QuickOrderForm(initial={'holiday': holiday.id})
         context['full_form'] = FullOrderForm()
         
@@ -118,21 +174,91 @@ def get_available_dates(request, holiday_id):
     """API для получения доступных дат"""
     holiday = get_object_or_404(Holiday, id=holiday_id)
     
-    # Получаем все заявки для этого праздника (можно не фильтровать по празднику,
-    # так как слоты общие для всех, но оставим для совместимости)
-    bookings = FullOrder.objects.filter(
-        selected_date__gte=date.today()
-    ).values('selected_date', 'selected_time')
+    # Слоты общие для всех праздников, поэтому берем общую занятость окна
+    start, end = booking_window()
+    bookings = get_booked_slots(start, end)
     
     # Группируем по датам
     result = {}
-    for booking in bookings:
-        date_str = booking['selected_date'].isoformat()
-        if date_str not in result:
-            result[date_str] = []
-        result[date_str].append(booking['selected_time'])
+    for date_str, slots in bookings.items():
+        result[date_str] = []
+        for time_slot, count in slots.items():
+            result[date_str].extend([time_slot] * count)
     
-    return JsonResponse({'booked': result})
+    return JsonResponse({
+        'booked': result,
+        'slots': calendar_slots(start, end, holiday.duration_hours()),
+    })
+
+# Максимальная длина диапазона дат в API доступности
+MAX_AVAILABILITY_DAYS = 62
+
+def _parse_date_param(value, default):
+    if not value:
+        return default
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def availability(request, holiday_id):
+    """API доступности v2: счетчики заявок по датам диапазона с ETag/Last-Modified"""
+    holiday = get_object_or_404(Holiday.objects.only('id', 'duration'), id=holiday_id)
+    
+    default_start, default_end = booking_window()
+    try:
+        start = _parse_date_param(request.GET.get('start'), default_start)
+        end = _parse_date_param(request.GET.get('end'), default_end)
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Дата должна быть в формате ГГГГ-ММ-ДД'}, status=400)
+    
+    if end < start or (end - start).days > MAX_AVAILABILITY_DAYS:
+        return JsonResponse({'success': False, 'message': 'Некорректный диапазон дат'}, status=400)
+    
+    # Версия ответа: последнее изменение занятости в окне + настройки залов и слотов
+    changed = last_booking_change(start, end)
+    etag = hashlib.md5(
+        f'{holiday.id}:{holiday.duration}:{start}:{end}:{changed}:{schedule.version()}'.encode()
+    ).hexdigest()
+    last_modified = int(changed.timestamp()) if changed else None
+    
+    not_modified = get_conditional_response(request, etag=f'"{etag}"', last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+    
+    slots = calendar_slots(start, end, holiday.duration_hours())
+    free = {
+        date_str: sum(1 for slot in day_slots if slot['free_halls'] > 0)
+        for date_str, day_slots in slots.items()
+    }
+    response = JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'booked': get_booked_slots(start, end),
+        'free': free,
+        'slots': slots,
+    })
+    response['ETag'] = f'"{etag}"'
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+async def availability_stream(request):
+    """SSE-поток изменений занятости для окна календаря (нужен ASGI-сервер)"""
+    if not isinstance(request, ASGIRequest):
+        # Под WSGI бесконечный поток занял бы поток воркера; 204 останавливает EventSource
+        return HttpResponse(status=204)
+    
+    default_start, default_end = booking_window()
+    try:
+        start = _parse_date_param(request.GET.get('start'), default_start)
+        end = _parse_date_param(request.GET.get('end'), default_end)
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Дата должна быть в формате ГГГГ-ММ-ДД'}, status=400)
+    
+    response = StreamingHttpResponse(event_stream(start, end), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Отключаем буферизацию в nginx, иначе события придут пачкой
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 @csrf_exempt
 def create_quick_order(request):
@@ -150,12 +276,10 @@ def create_quick_order(request):
         if not holiday_id:
             return JsonResponse({'success': False, 'message': 'ID праздника обязателен'})
         
-        holiday = get_object_or_404(Holiday, id=holiday_id)
+        holiday = get_object_or_404(Holiday.objects.only('id'), id=holiday_id)
         
-        order = QuickOrder.objects.create(
-            holiday=holiday,
-            phone=phone
-        )
+        # Запись в базу делает фоновый перенос очереди, запрос не ждет блокировку SQLite
+        spool.enqueue('quickorder', {'holiday_id': holiday.id, 'phone': phone})
         
         return JsonResponse({'success': True, 'message': 'Заявка отправлена!'})
         
@@ -193,49 +317,30 @@ def create_full_order(request):
         holiday = get_object_or_404(Holiday, id=holiday_id)
         date_obj = datetime.strptime(selected_date, '%Y-%m-%d').date()
         
-        # Проверяем режим работы
-        weekday = date_obj.weekday()
-        start_hour = int(selected_time.split(':')[0])
-        
-        if weekday < 5:  # Пн-Пт
-            if start_hour < 9 or start_hour >= 21:
-                return JsonResponse({'success': False, 'message': 'Это время вне режима работы'})
-        else:  # Сб-Вс
-            if start_hour < 10 or start_hour >= 22:
-                return JsonResponse({'success': False, 'message': 'Это время вне режима работы'})
-        
-        # Проверяем доступность (максимум 2 заявки на слот)
-        existing_bookings = FullOrder.objects.filter(
-            selected_date=date_obj,
-            selected_time=selected_time
-        ).count()
-        
-        if existing_bookings >= 2:
-            return JsonResponse({'success': False, 'message': 'Это время уже полностью занято'})
+        # Проверяем, что время есть в сетке слотов дня (режим работы)
+        try:
+            slot = find_slot(date_obj, holiday.duration_hours(), selected_time)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'message': str(e)})
         
-        # Определяем номер свободного зала
-        hall_number = 1
-        if existing_bookings == 1:
-            # Если есть одна заявка, смотрим какой зал занят
-            first_booking = FullOrder.objects.filter(
-                selected_date=date_obj,
-                selected_time=selected_time
-            ).first()
-            hall_number = 2 if first_booking.hall_number == 1 else 1
+        if slot is None:
+            return JsonResponse({'success': False, 'message': 'Это время вне режима работы'})
         
-        # Создаем заявку (она же занятый слот)
-        order = FullOrder.objects.create(
+        # Атомарно занимаем свободный зал (она же занятый слот)
+        order = reserve_slot(
+            date_obj,
+            slot['value'],
             holiday=holiday,
             full_name=full_name,
             phone=phone,
             children_count=int(children_count),
             age_of_children=age_of_children,
-            notes=notes,
-            selected_date=date_obj,
-            selected_time=selected_time,
-            hall_number=hall_number
+            notes=notes
         )
         
+        if order is None:
+            return JsonResponse({'success': False, 'message': 'Это время уже полностью занято'})
+        
         return JsonResponse({'success': True, 'message': 'Зал успешно забронирован!'})
         
     except Exception as e:
@@ -247,7 +352,7 @@ def create_review(request):
     if request.method == 'POST':
         form = ReviewForm(request.POST)
         if form.is_valid():
-            form.save()
+            spool.enqueue('review', form.cleaned_data)
             return JsonResponse({'success': True, 'message': 'Отзыв отправлен!'})
         return JsonResponse({'success': False, 'errors': form.errors})
     return JsonResponse({'success': False, 'message': 'Метод не поддерживается'})
@@ -266,14 +371,14 @@ def register_training(request):
             if not all([parent_name, phone, child_name, age, age_group]):
                 return JsonResponse({'success': False, 'message': 'Заполните все поля'})
             
-            training_reg = TrainingRegistration.objects.create(
-                parent_name=parent_name,
-                phone=phone,
-                child_name=child_name,
-                child_age=int(age),
-                age_group=age_group,
-                visit_type=visit_type
-            )
+            spool.enqueue('trainingregistration', {
+                'parent_name': parent_name,
+                'phone': phone,
+                'child_name': child_name,
+                'child_age': int(age),
+                'age_group': age_group,
+                'visit_type': visit_type,
+            })
             
             return JsonResponse({'success': True, 'message': 'Заявка отправлена!'})
             
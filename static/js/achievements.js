@@ -0,0 +1,55 @@
+/* Бесконечная прокрутка галереи достижений.
+ * Сервер отдает первую страницу, следующие скрипт берет из /api/achievements/
+ * по курсору, когда блок "Показать еще" попадает в область видимости.
+ * Без JavaScript работает сама ссылка "Показать еще". */
+(function () {
+    function initAchievementsGallery() {
+        const more = document.getElementById('achievements-more');
+        const grid = document.getElementById('achievements-grid');
+        if (!more || !grid) return;
+
+        let cursor = more.dataset.cursor;
+        let loading = false;
+
+        async function loadNextPage() {
+            if (loading || !cursor) return;
+            loading = true;
+            const params = new URLSearchParams({ cursor });
+            if (more.dataset.place) params.set('place', more.dataset.place);
+            if (more.dataset.city) params.set('city', more.dataset.city);
+            try {
+                const response = await fetch(`${more.dataset.url}?${params}`);
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                const data = await response.json();
+                grid.insertAdjacentHTML('beforeend', data.html);
+                cursor = data.next;
+                if (!cursor) {
+                    observer && observer.disconnect();
+                    more.remove();
+                }
+            } catch (error) {
+                console.error('Ошибка загрузки достижений:', error);
+            } finally {
+                loading = false;
+            }
+        }
+
+        more.querySelector('a').addEventListener('click', (e) => {
+            e.preventDefault();
+            loadNextPage();
+        });
+
+        const observer = window.IntersectionObserver
+            ? new IntersectionObserver((entries) => {
+                if (entries.some(entry => entry.isIntersecting)) loadNextPage();
+            }, { rootMargin: '400px' })
+            : null;
+        if (observer) observer.observe(more);
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', initAchievementsGallery);
+    } else {
+        initAchievementsGallery();
+    }
+})();
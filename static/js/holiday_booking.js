@@ -0,0 +1,479 @@
+/* Календарь бронирования на странице праздника.
+ * Страница отдает только разметку; слоты скрипт берет из API доступности v2,
+ * который отвечает 304 по ETag, пока занятость не изменилась. */
+class HolidayBooking {
+    constructor(holidayId, holidayDuration, availabilityUrl, windowStart, windowEnd, maxChildren) {
+        this.holidayId = holidayId;
+        this.holidayDuration = holidayDuration;
+        this.availabilityUrl = availabilityUrl;
+        // Окно бронирования от сервера, чтобы календарь совпадал с API
+        this.windowStart = windowStart;
+        this.windowEnd = windowEnd;
+        // Слоты по датам из API: {value, label, free_halls}
+        this.slots = {};
+        this.maxChildren = maxChildren;
+        this.currentDate = new Date();
+        this.selectedDate = null;
+        this.selectedTimeSlot = null;
+        
+        this.init();
+    }
+    
+    async init() {
+        this.renderCalendar();
+        this.setupEventListeners();
+        this.setupFormHandlers();
+        this.subscribeToChanges();
+        await this.refreshSlots();
+        if (this.selectedDate) this.showTimeSlots(this.selectedDate);
+    }
+    
+    subscribeToChanges() {
+        // Живые обновления занятости: сервер присылает событие при каждой новой заявке
+        if (!window.EventSource) return;
+        const source = new EventSource('/api/availability-stream/');
+        source.addEventListener('occupancy', async () => {
+            await this.refreshSlots();
+            if (this.selectedDate) this.showTimeSlots(this.selectedDate);
+        });
+    }
+    
+    formatDate(date) {
+        // Форматируем дату в YYYY-MM-DD без учета часового пояса
+        const year = date.getFullYear();
+        const month = String(date.getMonth() + 1).padStart(2, '0');
+        const day = String(date.getDate()).padStart(2, '0');
+        return `${year}-${month}-${day}`;
+    }
+    
+    parseDate(dateStr) {
+        // Парсим строку YYYY-MM-DD в локальную дату
+        const [year, month, day] = dateStr.split('-').map(Number);
+        return new Date(year, month - 1, day);
+    }
+    
+    renderCalendar() {
+        const year = this.currentDate.getFullYear();
+        const month = this.currentDate.getMonth();
+        
+        const firstDay = new Date(year, month, 1);
+        const lastDay = new Date(year, month + 1, 0);
+        
+        let startingDay = firstDay.getDay();
+        if (startingDay === 0) startingDay = 7; // Воскресенье = 7
+        
+        let html = '';
+        
+        // Пустые ячейки для дней предыдущего месяца
+        for (let i = 1; i < startingDay; i++) {
+            html += '<div class="hol_calendar_day hol_empty"></div>';
+        }
+        
+        const [today, twoWeeksLater] = this.bookingWindow();
+        
+        for (let day = 1; day <= lastDay.getDate(); day++) {
+            // Создаем дату в локальном часовом поясе
+            const date = new Date(year, month, day);
+            date.setHours(0, 0, 0, 0);
+            const dateStr = this.formatDate(date);
+            
+            let classes = 'hol_calendar_day';
+            
+            // Проверяем доступность даты (не раньше сегодня и не позже 2 недель)
+            if (date < today || date > twoWeeksLater) {
+                classes += ' hol_disabled';
+            } else {
+                classes += ' hol_available';
+            }
+            
+            // Проверяем, является ли дата выбранной
+            if (this.selectedDate) {
+                const selectedDate = this.parseDate(this.selectedDate);
+                selectedDate.setHours(0, 0, 0, 0);
+                if (date.getTime() === selectedDate.getTime()) {
+                    classes += ' hol_selected';
+                }
+            }
+            
+            // Проверяем, является ли дата сегодняшней
+            if (date.getTime() === today.getTime()) {
+                classes += ' hol_today';
+            }
+            
+            html += `<div class="${classes}" data-date="${dateStr}">${day}</div>`;
+        }
+        
+        document.getElementById('calendar-days').innerHTML = html;
+        document.getElementById('current-month').textContent = 
+            this.getMonthName(month) + ' ' + year;
+            
+        this.updateNavButtons();
+    }
+    
+    bookingWindow() {
+        // Границы окна бронирования; без данных от сервера - две недели от сегодня
+        if (this.windowStart && this.windowEnd) {
+            return [this.parseDate(this.windowStart), this.parseDate(this.windowEnd)];
+        }
+        const today = new Date();
+        today.setHours(0, 0, 0, 0);
+        const twoWeeksLater = new Date(today);
+        twoWeeksLater.setDate(today.getDate() + 14);
+        return [today, twoWeeksLater];
+    }
+    
+    updateNavButtons() {
+        const [today, twoWeeksLater] = this.bookingWindow();
+        
+        const currentMonthYear = new Date(this.currentDate.getFullYear(), this.currentDate.getMonth(), 1);
+        
+        const prevBtn = document.getElementById('prev-month');
+        const nextBtn = document.getElementById('next-month');
+        
+        // Нельзя листать в прошлое (раньше текущего месяца)
+        const currentMonthStart = new Date(today.getFullYear(), today.getMonth(), 1);
+        if (currentMonthYear <= currentMonthStart) {
+            prevBtn.disabled = true;
+        } else {
+            prevBtn.disabled = false;
+        }
+        
+        // Нельзя листать дальше чем на 2 недели
+        const twoWeeksLaterMonthStart = new Date(twoWeeksLater.getFullYear(), twoWeeksLater.getMonth(), 1);
+        if (currentMonthYear >= twoWeeksLaterMonthStart) {
+            nextBtn.disabled = true;
+        } else {
+            nextBtn.disabled = false;
+        }
+    }
+    
+    getMonthName(month) {
+        const months = [
+            'Январь', 'Февраль', 'Март', 'Апрель', 'Май', 'Июнь',
+            'Июль', 'Август', 'Сентябрь', 'Октябрь', 'Ноябрь', 'Декабрь'
+        ];
+        return months[month];
+    }
+    
+    async refreshSlots() {
+        // Забираем актуальные слоты из API; браузер сам перепроверяет кеш по ETag
+        try {
+            const params = new URLSearchParams();
+            if (this.windowStart) params.set('start', this.windowStart);
+            if (this.windowEnd) params.set('end', this.windowEnd);
+            const response = await fetch(`${this.availabilityUrl}?${params}`);
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const data = await response.json();
+            this.slots = data.slots || {};
+        } catch (error) {
+            console.error('Ошибка загрузки слотов:', error);
+        }
+    }
+    
+    onDateClick(dateStr) {
+        // Сохраняем выбранную дату
+        this.selectedDate = dateStr;
+        document.getElementById('selected-date').value = dateStr;
+        this.renderCalendar(); // Перерисовываем календарь с выделенной датой
+        this.showTimeSlots(dateStr);
+    }
+    
+showTimeSlots(dateStr) {
+    const availableSlots = this.slots[dateStr] || [];
+    let slotsHtml = '';
+    if (availableSlots.length === 0) {
+        slotsHtml = '<p class="hol_no_slots">Нет доступного времени для этой даты</p>';
+    } else {
+        availableSlots.forEach(slot => {
+            const isAvailable = slot.free_halls > 0;
+            let remainingText = 'все залы заняты';
+            if (slot.free_halls === 1) {
+                remainingText = '1 зал свободен';
+            } else if (slot.free_halls > 1) {
+                remainingText = `${slot.free_halls} зала свободно`;
+            }
+            let btnClass = 'hol_time_slot_btn';
+            if (!isAvailable) btnClass += ' hol_disabled';
+            if (this.selectedTimeSlot === slot.value) btnClass += ' hol_selected';
+            slotsHtml += `
+                <button type="button" class="${btnClass}" 
+                        data-time="${slot.value}"
+                        ${isAvailable ? '' : 'disabled'}>
+                    ${slot.label}
+                    (${remainingText})
+                </button>
+            `;
+        });
+    }
+    
+    document.getElementById('time-slots').innerHTML = slotsHtml;
+    document.getElementById('time-slots-container').style.display = 'block';
+    
+    // Добавляем обработчики
+    document.querySelectorAll('.hol_time_slot_btn:not(.hol_disabled)').forEach(btn => {
+        btn.addEventListener('click', (e) => {
+            e.preventDefault();
+            document.querySelectorAll('.hol_time_slot_btn').forEach(b => 
+                b.classList.remove('hol_selected'));
+            btn.classList.add('hol_selected');
+            this.selectedTimeSlot = btn.dataset.time;
+            document.getElementById('selected-time').value = btn.dataset.time;
+        });
+    });
+}
+    setupEventListeners() {
+        // Клик по дням календаря
+        document.getElementById('calendar-days').addEventListener('click', (e) => {
+            const dayEl = e.target.closest('.hol_calendar_day');
+            if (!dayEl || dayEl.classList.contains('hol_empty') || 
+                dayEl.classList.contains('hol_disabled')) return;
+            
+            const date = dayEl.dataset.date;
+            this.onDateClick(date);
+        });
+        
+        // Навигация по месяцам
+        document.getElementById('prev-month').addEventListener('click', () => {
+            this.currentDate.setMonth(this.currentDate.getMonth() - 1);
+            this.renderCalendar();
+            // Скрываем слоты при смене месяца
+            document.getElementById('time-slots-container').style.display = 'none';
+            this.selectedDate = null;
+            this.selectedTimeSlot = null;
+            document.getElementById('selected-date').value = '';
+            document.getElementById('selected-time').value = '';
+        });
+        
+        document.getElementById('next-month').addEventListener('click', () => {
+            this.currentDate.setMonth(this.currentDate.getMonth() + 1);
+            this.renderCalendar();
+            // Скрываем слоты при смене месяца
+            document.getElementById('time-slots-container').style.display = 'none';
+            this.selectedDate = null;
+            this.selectedTimeSlot = null;
+            document.getElementById('selected-date').value = '';
+            document.getElementById('selected-time').value = '';
+        });
+    }
+    
+    setupFormHandlers() {
+        // Маска для телефона
+        document.querySelectorAll('input[type="tel"]').forEach(input => {
+            input.addEventListener('input', (e) => {
+                let value = e.target.value.replace(/\D/g, '');
+                if (value.length > 0) {
+                    if (value[0] === '7' || value[0] === '8') value = value.substring(1);
+                    let formatted = '+7 ';
+                    if (value.length > 0) formatted += '(' + value.substring(0, 3);
+                    if (value.length > 3) formatted += ') ' + value.substring(3, 6);
+                    if (value.length > 6) formatted += '-' + value.substring(6, 8);
+                    if (value.length > 8) formatted += '-' + value.substring(8, 10);
+                    e.target.value = formatted;
+                }
+            });
+        });
+        
+        // Валидация количества детей
+        document.getElementById('children-count').addEventListener('input', (e) => {
+            const value = parseInt(e.target.value);
+            if (value > this.maxChildren) {
+                e.target.value = this.maxChildren;
+                alert(`Максимальное количество детей: ${this.maxChildren}`);
+            }
+            if (value < 1) {
+                e.target.value = 1;
+            }
+        });
+        
+        // Валидация формы перед отправкой
+        document.getElementById('full-order-form').addEventListener('submit', async (e) => {
+            e.preventDefault();
+            
+            // Проверяем заполнение полей
+            const fullName = document.getElementById('full-name').value.trim();
+            const phone = document.getElementById('full-phone').value.trim();
+            const childrenCount = document.getElementById('children-count').value.trim();
+            const ageOfChildren = document.getElementById('age-of-children').value.trim();
+            
+            if (!fullName) {
+                alert('Пожалуйста, введите ФИО');
+                document.getElementById('full-name').focus();
+                return;
+            }
+            
+            if (!phone) {
+                alert('Пожалуйста, введите номер телефона');
+                document.getElementById('full-phone').focus();
+                return;
+            }
+            
+            if (!childrenCount) {
+                alert('Пожалуйста, укажите количество детей');
+                document.getElementById('children-count').focus();
+                return;
+            }
+            
+            if (!ageOfChildren) {
+                alert('Пожалуйста, укажите возраст детей');
+                document.getElementById('age-of-children').focus();
+                return;
+            }
+            
+            if (!this.selectedDate) {
+                alert('Пожалуйста, выберите дату');
+                return;
+            }
+            
+            if (!this.selectedTimeSlot) {
+                alert('Пожалуйста, выберите время');
+                return;
+            }
+            
+            const formData = new FormData(e.target);
+            
+            // Показываем индикатор загрузки
+            const submitBtn = e.target.querySelector('button[type="submit"]');
+            const originalText = submitBtn.textContent;
+            submitBtn.disabled = true;
+            submitBtn.textContent = 'Отправка...';
+            
+            try {
+                const response = await fetch('/api/create-full-order/', {
+                    method: 'POST',
+                    body: formData,
+                    headers: {
+                        'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
+                    }
+                });
+                
+                const data = await response.json();
+                const messageDiv = document.getElementById('full-order-message');
+                
+                if (data.success) {
+                    messageDiv.textContent = data.message;
+                    messageDiv.className = 'hol_message hol_success';
+                    e.target.reset();
+                    document.getElementById('selected-date').value = '';
+                    document.getElementById('selected-time').value = '';
+                    document.getElementById('time-slots-container').style.display = 'none';
+                    this.selectedDate = null;
+                    this.selectedTimeSlot = null;
+                    this.renderCalendar();
+                    this.refreshSlots();
+                    
+                    // Скрываем сообщение через 5 секунд
+                    setTimeout(() => {
+                        messageDiv.style.display = 'none';
+                    }, 5000);
+                } else {
+                    messageDiv.textContent = data.message || 'Ошибка при отправке';
+                    messageDiv.className = 'hol_message hol_error';
+                    messageDiv.style.display = 'block';
+                    
+                    // Слот могли занять, пока страница была открыта
+                    await this.refreshSlots();
+                    if (this.selectedDate) this.showTimeSlots(this.selectedDate);
+                    
+                    setTimeout(() => {
+                        messageDiv.style.display = 'none';
+                    }, 5000);
+                }
+            } catch (error) {
+                console.error('Error:', error);
+                alert('Произошла ошибка при отправке. Попробуйте позже.');
+            } finally {
+                // Возвращаем кнопку в исходное состояние
+                submitBtn.disabled = false;
+                submitBtn.textContent = originalText;
+            }
+        });
+        
+        // Быстрая заявка
+        document.getElementById('quick-order-form').addEventListener('submit', async (e) => {
+            e.preventDefault();
+            
+            const phone = document.getElementById('quick-phone').value.trim();
+            if (!phone) {
+                alert('Введите номер телефона');
+                document.getElementById('quick-phone').focus();
+                return;
+            }
+            
+            const formData = new FormData(e.target);
+            
+            // Показываем индикатор загрузки
+            const submitBtn = e.target.querySelector('button[type="submit"]');
+            const originalText = submitBtn.textContent;
+            submitBtn.disabled = true;
+            submitBtn.textContent = 'Отправка...';
+            
+            try {
+                const response = await fetch('/api/create-quick-order/', {
+                    method: 'POST',
+                    body: formData,
+                    headers: {
+                        'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
+                    }
+                });
+                
+                const data = await response.json();
+                const messageDiv = document.getElementById('quick-order-message');
+                
+                if (data.success) {
+                    messageDiv.textContent = data.message;
+                    messageDiv.className = 'hol_message hol_success';
+                    e.target.reset();
+                    
+                    setTimeout(() => {
+                        messageDiv.style.display = 'none';
+                    }, 5000);
+                } else {
+                    messageDiv.textContent = data.message || 'Ошибка при отправке';
+                    messageDiv.className = 'hol_message hol_error';
+                    messageDiv.style.display = 'block';
+                    
+                    setTimeout(() => {
+                        messageDiv.style.display = 'none';
+                    }, 5000);
+                }
+            } catch (error) {
+                console.error('Error:', error);
+                alert('Произошла ошибка при отправке. Попробуйте позже.');
+            } finally {
+                // Возвращаем кнопку в исходное состояние
+                submitBtn.disabled = false;
+                submitBtn.textContent = originalText;
+            }
+        });
+        
+        // Переключение вкладок
+        document.querySelectorAll('.hol_tab_btn').forEach(btn => {
+            btn.addEventListener('click', () => {
+                document.querySelectorAll('.hol_tab_btn').forEach(b => b.classList.remove('active'));
+                document.querySelectorAll('.hol_tab_content').forEach(c => c.classList.remove('active'));
+                
+                btn.classList.add('active');
+                const tabId = btn.dataset.tab;
+                document.getElementById(tabId + '-tab').classList.add('active');
+            });
+        });
+    }
+}
+
+// Инициализация: скрипт подключен с defer, но работает и без него
+function initHolidayBooking() {
+    const holidayData = document.getElementById('holiday-data');
+    if (holidayData) {
+        const data = holidayData.dataset;
+        const maxChildren = parseInt(data.maxChildren) || 10;
+        const availabilityUrl = data.availabilityUrl || `/api/v2/availability/${data.holidayId}/`;
+        
+        new HolidayBooking(data.holidayId, data.duration, availabilityUrl, data.start, data.end, maxChildren);
+    }
+}
+
+if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', initHolidayBooking);
+} else {
+    initHolidayBooking();
+}
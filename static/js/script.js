@@ -95,15 +95,38 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // ========== СЛАЙДЕР ОТЗЫВОВ ==========
     const track = document.getElementById('review-track');
-    const slides = document.querySelectorAll('.home-review-slide');
+    const slides = document.getElementsByClassName('home-review-slide');
     const prevBtn = document.getElementById('review-prev');
     const nextBtn = document.getElementById('review-next');
     
     if (track && slides.length > 0) {
         let currentIndex = 0;
         let slidesPerView = getSlidesPerView();
-        const totalSlides = slides.length;
-        const maxIndex = Math.max(0, totalSlides - slidesPerView);
+        let totalSlides = slides.length;
+        let maxIndex = Math.max(0, totalSlides - slidesPerView);
+        // Следующая страница отзывов: главная отдает только последние
+        let nextCursor = track.dataset.next || null;
+        let loadingMore = false;
+        
+        async function loadMoreReviews() {
+            if (!nextCursor || loadingMore) return;
+            loadingMore = true;
+            try {
+                const params = new URLSearchParams({ cursor: nextCursor });
+                const response = await fetch(`${track.dataset.url}?${params}`);
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                const data = await response.json();
+                track.insertAdjacentHTML('beforeend', data.html);
+                nextCursor = data.next;
+                totalSlides = slides.length;
+                maxIndex = Math.max(0, totalSlides - slidesPerView);
+                updateSlider();
+            } catch (error) {
+                console.error('Ошибка загрузки отзывов:', error);
+            } finally {
+                loadingMore = false;
+            }
+        }
         
         function getSlidesPerView() {
             if (window.innerWidth <= 768) return 1; 
@@ -119,7 +142,10 @@ document.addEventListener('DOMContentLoaded', function() {
             track.style.transform = `translateX(-${translateX}px)`;
             
             if (prevBtn) prevBtn.disabled = currentIndex === 0;
-            if (nextBtn) nextBtn.disabled = currentIndex >= maxIndex;
+            if (nextBtn) nextBtn.disabled = currentIndex >= maxIndex && !nextCursor;
+            
+            // Догружаем заранее, за одну прокрутку до конца ленты
+            if (currentIndex >= maxIndex - 1) loadMoreReviews();
         }
         
         if (prevBtn) {
@@ -136,6 +162,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (currentIndex < maxIndex) {
                     currentIndex++;
                     updateSlider();
+                } else {
+                    loadMoreReviews();
                 }
             });
         }
@@ -147,8 +175,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 const newSlidesPerView = getSlidesPerView();
                 if (newSlidesPerView !== slidesPerView) {
                     slidesPerView = newSlidesPerView;
-                    const newMaxIndex = Math.max(0, totalSlides - slidesPerView);
-                    currentIndex = Math.min(currentIndex, newMaxIndex);
+                    maxIndex = Math.max(0, totalSlides - slidesPerView);
+                    currentIndex = Math.min(currentIndex, maxIndex);
                     updateSlider();
                 } else {
                     updateSlider();